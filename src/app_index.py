@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+App Index
+===============
+
+This module contains the ApplicationIndex class which knows the applications installed on a
+Linux desktop, from the .desktop launchers of the XDG data directories and the executables
+on the PATH, and resolves a spoken application name to its launcher with a trigram index.
+Executables are only found by their exact name: close names of system tools differ in
+meaning, e.g. "reboot" is not "reboot notes", so only launchers are matched fuzzily.
+
+"""
+
+import configparser
+import json
+import os
+import re
+import shlex
+import threading
+from collections import defaultdict
+from typing import NamedTuple
+
+from infra import write_json_atomically
+from user_dirs import user_cache_dir
+
+INDEX_FILE = "applications.json"
+# Exec keys of .desktop files may contain field codes such as %U, which are not arguments
+FIELD_CODE = re.compile(r"%[a-zA-Z%]")
+
+
+class AppEntry(NamedTuple):
+    """An application which can be launched"""
+
+    name: str  # normalized name the entry is found by
+    command: list[str]  # arguments launching the application
+    source: str  # .desktop file or executable the entry was read from
+
+
+def __trigrams__(text: str) -> set[str]:
+    """Returns the character trigrams of the text, padded so short names have some too"""
+    padded = f"  {text} "
+    return {padded[index : index + 3] for index in range(len(padded) - 2)}
+
+
+def normalize(name: str) -> str:
+    """Returns the name lower cased, with anything but letters and digits as single spaces"""
+    return " ".join(re.sub(r"[^\w]+", " ", name.lower()).split())
+
+
+def default_sources() -> tuple[list[str], list[str]]:
+    """Returns the XDG applications directories and the PATH directories to index"""
+    data_home = os.environ.get("XDG_DATA_HOME") or os.path.join(
+        os.path.expanduser("~"), ".local", "share"
+    )
+    data_dirs = (
+        os.environ.get("XDG_DATA_DIRS") or "/usr/local/share:/usr/share"
+    ).split(":")
+    desktop_dirs = [
+        os.path.join(data_dir, "applications")
+        for data_dir in [data_home, *data_dirs]
+        if data_dir
+    ]
+    path_dirs = [path for path in os.environ.get("PATH", "").split(os.pathsep) if path]
+    return list(dict.fromkeys(desktop_dirs)), list(dict.fromkeys(path_dirs))
+
+
+def read_desktop_file(path: str) -> list[AppEntry]:
+    """Returns the entries of a .desktop launcher: its Name and its file name, both
+    launching its Exec command. Hidden launchers and non applications are skipped."""
+    parser = configparser.ConfigParser(interpolation=None, strict=False)
+    try:
+        parser.read(path, encoding="UTF-8")
+        section = parser["Desktop Entry"]
+    except (configparser.Error, UnicodeDecodeError, KeyError):
+        return []
+    if (
+        section.get("Type", "Application") != "Application"
+        or section.get("NoDisplay", "false").lower() == "true"
+        or section.get("Hidden", "false").lower() == "true"
+        or not section.get("Exec")
+    ):
+        return []
+    try:
+        command = shlex.split(FIELD_CODE.sub("", section["Exec"]))
+    except ValueError:
+        return []
+    if not command:
+        return []
+    names = {normalize(section.get("Name", "")), normalize(os.path.basename(path)[:-8])}
+    return [AppEntry(name, command, path) for name in names if name]
+
+
+class ApplicationIndex:
+    """
+    Index of the installed applications, persisted between runs. Every source directory is
+    stored with its modification time, so a refresh only rescans the directories in which
+    launchers or executables were added or removed since.
+    """
+
+    __instance = None
+    __instance_lock = threading.Lock()
+
+    def __init__(
+        self,
+        index_path: str | None = None,
+        desktop_dirs: list[str] | None = None,
+        path_dirs: list[str] | None = None,
+        min_score: float = 0.6,
+    ) -> None:
+        """
+        Args:
+            index_path (str | None, optional): json file persisting the index.
+                            Defaults to applications.json in the user cache directory.
+            desktop_dirs (list[str] | None, optional): directories of .desktop launchers.
+                            Defaults to the applications directories of the XDG data dirs.
+            path_dirs (list[str] | None, optional): directories of executables.
+                            Defaults to the directories on the PATH.
+            min_score (float, optional): similarity (0 to 1) a fuzzy match of a launcher needs.
+                            Defaults to 0.6.
+        """
+        default_desktop_dirs, default_path_dirs = default_sources()
+        self.index_path = index_path or os.path.join(user_cache_dir("apps"), INDEX_FILE)
+        self.desktop_dirs = (
+            default_desktop_dirs if desktop_dirs is None else desktop_dirs
+        )
+        self.path_dirs = default_path_dirs if path_dirs is None else path_dirs
+        self.min_score = min_score
+        self.__lock = threading.Lock()
+        self.__sources = self.__load()
+        self.__entries = list[AppEntry]()
+        self.__trigrams = dict[str, set[int]]()
+        self.__names = dict[str, int]()
+        self.__stale = True
+
+    @staticmethod
+    def instance() -> "ApplicationIndex":
+        """Returns the ApplicationIndex shared by the whole process"""
+        with ApplicationIndex.__instance_lock:
+            if ApplicationIndex.__instance is None:
+                ApplicationIndex.__instance = ApplicationIndex()
+            return ApplicationIndex.__instance
+
+    def __load(self) -> dict[str, dict]:
+        """Returns the persisted {directory: {"mtime", "entries"}} map, empty if there is none"""
+        try:
+            with open(self.index_path, "r", encoding="UTF-8") as index_file:
+                return json.load(index_file)
+        except (OSError, ValueError):
+            return {}
+
+    def __save(self) -> None:
+        try:
+            write_json_atomically(self.index_path, self.__sources)
+        except OSError as error:
+            print(f"Failed to save the application index: {error}")
+
+    @staticmethod
+    def __scan(directory: str, desktop: bool) -> list[AppEntry]:
+        entries = []
+        try:
+            with os.scandir(directory) as files:
+                for entry in files:
+                    if desktop and entry.name.endswith(".desktop"):
+                        entries.extend(read_desktop_file(entry.path))
+                    elif (
+                        not desktop
+                        and entry.is_file()
+                        and os.access(entry.path, os.X_OK)
+                    ):
+                        entries.append(
+                            AppEntry(normalize(entry.name), [entry.path], entry.path)
+                        )
+        except OSError:
+            return []
+        return entries
+
+    def refresh(self) -> bool:
+        """
+        Rescans the source directories modified since they were last indexed.
+
+        Returns:
+            bool: True if anything changed.
+        """
+        with self.__lock:
+            changed = False
+            directories = [(path, True) for path in self.desktop_dirs] + [
+                (path, False) for path in self.path_dirs
+            ]
+            for directory, desktop in directories:
+                try:
+                    mtime = os.stat(directory).st_mtime
+                except OSError:
+                    mtime = None
+                known = self.__sources.get(directory)
+                if known is not None and known["mtime"] == mtime:
+                    continue
+                entries = self.__scan(directory, desktop) if mtime is not None else []
+                self.__sources[directory] = {
+                    "mtime": mtime,
+                    "entries": [list(entry) for entry in entries],
+                }
+                changed = True
+            for directory in self.__sources.keys() - {path for path, _ in directories}:
+                del self.__sources[directory]
+                changed = True
+            if changed:
+                self.__save()
+            if changed or self.__stale:
+                self.__build()
+            return changed
+
+    def __build(self) -> None:
+        """Rebuilds the in-memory indexes (lock must be held). Launchers come before
+        executables and earlier directories before later ones, so they win ties.
+        Only launchers are added to the trigram index."""
+        ordered = [(path, True) for path in self.desktop_dirs] + [
+            (path, False) for path in self.path_dirs
+        ]
+        self.__entries = []
+        self.__names = {}
+        self.__trigrams = defaultdict(set)
+        for directory, desktop in ordered:
+            for name, command, source in self.__sources.get(directory, {}).get(
+                "entries", []
+            ):
+                if name in self.__names:  # shadowed, like a later PATH entry
+                    continue
+                self.__names[name] = len(self.__entries)
+                if desktop:
+                    for trigram in __trigrams__(name):
+                        self.__trigrams[trigram].add(len(self.__entries))
+                self.__entries.append(AppEntry(name, command, source))
+        self.__stale = False
+
+    def lookup(self, spoken_name: str) -> AppEntry | None:
+        """
+        Returns the application named exactly so, else the launcher most similar to the
+        spoken name, None if no launcher is similar enough.
+
+        Args:
+            spoken_name (str): the application name as recognized, e.g. "fire fox".
+        """
+        self.refresh()
+        name = normalize(spoken_name)
+        with self.__lock:
+            for candidate in (name, name.replace(" ", "")):
+                if candidate in self.__names:
+                    return self.__entries[self.__names[candidate]]
+
+            query = __trigrams__(name)
+            shared = defaultdict(int)
+            for trigram in query:
+                for index in self.__trigrams.get(trigram, ()):
+                    shared[index] += 1
+            best, best_score = None, self.min_score
+            for index, count in shared.items():
+                candidate = self.__entries[index]
+                score = count / (len(query) + len(__trigrams__(candidate.name)) - count)
+                if score > best_score or (
+                    score == best_score and best is not None and index < best
+                ):
+                    best, best_score = index, score
+            return None if best is None else self.__entries[best]
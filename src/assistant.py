@@ -8,12 +8,43 @@ This module contains the Assistant class, which listens to user queries and resp
 
 """
 
+import argparse
+import asyncio
+import contextlib
+import functools
 import re
+import sys
+import time
 from datetime import datetime
+from typing import Iterator
 
 import command_registery
 from infra import clear_screen, listen
-from voice_interface import VoiceInterface
+from prefetch import prefetch_scheduler_from_env
+from task_runner import TaskRunner
+from voice_interface import TextVoiceInterface, VoiceInterface
+
+CANCEL_PATTERN = re.compile(r"^(cancel|stop)\b")
+RUNNING_TASKS_PATTERN = re.compile(r"\b(running|active) tasks\b")
+SCROLL_SPEED_PATTERN = re.compile(
+    r"\bscroll(?:ing)? (faster|slower|slow|medium|fast)\b"
+)
+# Seconds after start-up before the first prefetch, so it does not compete with start-up
+PREFETCH_DELAY = 10.0
+
+# Phrases spoken verbatim on every run, rendered into the speech cache ahead of time
+STATIC_PHRASES = [
+    "Good Morning!",
+    "Good Afternoon!",
+    "Good Evening!",
+    "Say that again please...",
+    "Yes?",
+    "could not interpret the query",
+    "Fetching news from servers.",
+    "Here's what I can do...\n",
+    *[f"--> {feature}" for feature in command_registery.SUPPORTED_FEATURES],
+    "Have a Good Day !!!",
+]
 
 
 class Assistant:
@@ -21,21 +52,51 @@ class Assistant:
     Assistant class containing implementation of the Assistant to listen and respond to user queries
     """
 
-    def __init__(self):
-        """Creates an Assistant instance consisting of a VoiceInterface instance"""
-        self.__voice_interface = VoiceInterface()
-        self.__scrolling_thread = None
-        self.__stop_scrolling_event = None
+    def __init__(
+        self,
+        warm_up: bool = False,
+        voice_interface: VoiceInterface | None = None,
+        prefetch: bool = False,
+        registry: command_registery.CommandRegistery | None = None,
+    ):
+        """Creates an Assistant instance consisting of a VoiceInterface instance
+
+        Args:
+            warm_up (bool, optional): Import all command modules in a background thread
+                            instead of on their first use. Defaults to False.
+            voice_interface (VoiceInterface | None, optional): voice interface to speak and
+                            listen with. Defaults to one over the process-wide speech engine.
+            prefetch (bool, optional): Refresh the caches of network-backed commands in the
+                            background as configured in the .env file. Defaults to False.
+            registry (CommandRegistery | None, optional): commands the queries are routed to.
+                            Defaults to the commands of the manifest.
+        """
+        self.__voice_interface = voice_interface or VoiceInterface()
+        self.__registry = registry or command_registery.INSTANCE
+        self.__task_runner = TaskRunner(self.__voice_interface)
+        if warm_up:
+            self.__registry.warm_up()
+        self.__prefetcher = prefetch_scheduler_from_env() if prefetch else None
+        if self.__prefetcher is not None:
+            for command in self.__registry.prefetchable():
+                self.__prefetcher.add(
+                    command,
+                    functools.partial(self.__registry.prefetch, command),
+                    delay=PREFETCH_DELAY,
+                )
+            self.__prefetcher.start()
 
     def wish_user(self):
-        """Wishes user based on the hour of the day"""
+        """Wishes user based on the hour of the day, then renders the static phrases into
+        the speech cache in the background"""
         hour = int(datetime.now().hour)
         if 0 <= hour < 12:
-            self.__voice_interface.speak("Good Morning!")
+            self.__voice_interface.speak("Good Morning!", cache=True)
         elif 12 <= hour < 18:
-            self.__voice_interface.speak("Good Afternoon!")
+            self.__voice_interface.speak("Good Afternoon!", cache=True)
         else:
-            self.__voice_interface.speak("Good Evening!")
+            self.__voice_interface.speak("Good Evening!", cache=True)
+        self.__voice_interface.prerender(STATIC_PHRASES)
 
     def listen_for_query(self) -> str:
         """Listens for microphone input and return string of the input
@@ -43,7 +104,7 @@ class Assistant:
         Returns:
             str: the query string obtained from the speech input
         """
-        return listen
+        return listen(self.__voice_interface)
 
     def execute_query(self, query: str) -> None:
         """Processes the query string and runs the corresponding tasks
@@ -55,26 +116,25 @@ class Assistant:
 
         elif "scroll" in query:
             direction = re.search(r"(up|down|left|right|top|bottom)", query)
-            if direction is None:
-                print("Scroll direction not recognized")
-                return
-            direction = direction.group(0)
-
-            if re.search(r"start scrolling (up|down|left|right|top|bottom)", query):
-                if (
-                    self.__scrolling_thread is None
-                ):  # Only start if not already scrolling
-                    self.__scrolling_thread, self.__stop_scrolling_event = (
-                        command_registery.start_scrolling(direction)
+            direction = direction.group(0) if direction is not None else None
+            speed = SCROLL_SPEED_PATTERN.search(query)
+
+            if "stop scrolling" in query:
+                command_registery.stop_scrolling()
+            elif speed is not None:
+                command_registery.set_scroll_speed(speed.group(1))
+            elif "scrolling status" in query:
+                state = command_registery.scroll_state()
+                if state is None or not state.scrolling:
+                    self.__voice_interface.speak("Not scrolling")
+                else:
+                    self.__voice_interface.speak(
+                        f"Scrolling {state.direction} at {state.speed} speed"
                     )
-            elif "stop scrolling" in query:
-                if self.__scrolling_thread is None:  # Only stop if already scrolling
-                    return
-                command_registery.stop_scrolling(
-                    self.__scrolling_thread, self.__stop_scrolling_event
-                )
-                del self.__scrolling_thread
-                self.__scrolling_thread = None
+            elif direction is None:
+                print("Scroll direction not recognized")
+            elif re.search(r"start scrolling (up|down|left|right|top|bottom)", query):
+                command_registery.start_scrolling(direction)
             elif re.search(r"scroll to (up|down|left|right|top|bottom)", query):
                 command_registery.scroll_to(direction)
             elif re.search(r"scroll (up|down|left|right)", query):
@@ -82,38 +142,187 @@ class Assistant:
             else:
                 print("Scroll command not recognized")
 
+        elif CANCEL_PATTERN.search(query.strip().lower()):
+            cancelled = self.__task_runner.cancel_all()
+            self.__voice_interface.speak(f"Cancelling {cancelled} running tasks")
+
+        elif RUNNING_TASKS_PATTERN.search(query.lower()):
+            tasks = self.__task_runner.running()
+            self.__voice_interface.speak(f"{len(tasks)} tasks are running")
+            for task in tasks:
+                self.__voice_interface.speak(f"{task.command}: {task.query}")
+
         else:
-            command, executor = command_registery.INSTANCE.get_executor(query=query)
+            command, executor = self.__registry.get_executor(query=query)
 
             if command is None:
-                self.__voice_interface.speak("could not interpret the query")
-            else:
+                self.__voice_interface.speak(
+                    "could not interpret the query", cache=True
+                )
+            elif executor is None:
+                self.__voice_interface.speak(
+                    f"{command} is not available on this system"
+                )
+            elif self.__registry.runs_in_foreground(command):
                 executor(query, self.__voice_interface)
+            else:
+                self.__task_runner.submit(command, executor, query)
+
+    def wait_for_tasks(self, timeout: float | None = None) -> bool:
+        """Blocks until every command submitted to the worker pool has finished
+
+        Args:
+            timeout (float | None, optional): maximum seconds to wait. Defaults to no limit.
+
+        Returns:
+            bool: True if all commands finished within the timeout
+        """
+        return self.__task_runner.wait_all(timeout)
+
+    async def run_pipeline(self, queue_size: int = 2) -> None:
+        """Runs listen -> recognize -> dispatch -> speak as concurrent stages
+
+        Every stage is its own task connected to the next one by a bounded queue, so the
+        next utterance is captured while the previous one is still being recognized,
+        dispatched or spoken. Blocking audio and network calls run in worker threads.
+        The microphone is muted while the Assistant speaks, and an utterance overlapping
+        the speech is dropped, so prompts are never captured as queries.
+
+        Args:
+            queue_size (int, optional): maximum items buffered between two stages. Defaults to 2.
+        """
+        audio_queue = asyncio.Queue(maxsize=queue_size)
+        query_queue = asyncio.Queue(maxsize=queue_size)
+        speech_queue = asyncio.Queue(maxsize=queue_size)
+
+        async def capture_stage():
+            while True:
+                audio = await asyncio.to_thread(self.__voice_interface.capture, True)
+                await audio_queue.put(audio)
+
+        async def recognize_stage():
+            while True:
+                audio = await audio_queue.get()
+                query = await asyncio.to_thread(
+                    self.__voice_interface.recognize, audio, True
+                )
+                if query:
+                    await query_queue.put(query)
+                elif query == "":  # only the wake phrase was said
+                    await speech_queue.put("Yes?")
+                else:
+                    await speech_queue.put("Say that again please...")
+
+        async def dispatch_stage():
+            while True:
+                query = await query_queue.get()
+                print("User:")
+                await speech_queue.put(query)
+                await asyncio.to_thread(self.execute_query, query)
+
+        async def speak_stage():
+            while True:
+                text = await speech_queue.get()
+                await asyncio.to_thread(self.__voice_interface.speak, text)
+
+        await asyncio.gather(
+            capture_stage(), recognize_stage(), dispatch_stage(), speak_stage()
+        )
 
     def close(self):
         """Close the VoiceInterface instance and delete other variables"""
+        if self.__prefetcher is not None:
+            self.__prefetcher.stop()
+        self.__task_runner.shutdown()
+        del self.__task_runner
         self.__voice_interface.close()
         del self.__voice_interface
-        if self.__scrolling_thread:
-            command_registery.stop_scrolling(
-                self.__scrolling_thread, self.__stop_scrolling_event
-            )
-            del self.__scrolling_thread
-        if self.__stop_scrolling_event:
-            del self.__stop_scrolling_event
+        command_registery.stop_scrolling()
 
     def reset(self):
         """Re-instantiate VoiceInterface instance and other variables"""
+        voice_interface = self.__voice_interface
         self.close()
-        self.__voice_interface = VoiceInterface()
-        self.__scrolling_thread = None
-        self.__stop_scrolling_event = None
+        self.__voice_interface = voice_interface
+        self.__voice_interface.reset()
+        self.__task_runner = TaskRunner(self.__voice_interface)
+        if self.__prefetcher is not None:
+            self.__prefetcher.start()
+
+
+def run_text_queries(assistant: Assistant, lines: Iterator[str]) -> None:
+    """Executes every query line, printing its latency and the overall throughput
+
+    Empty lines and lines starting with '#' are skipped. Commands asking follow-up
+    questions read their answers from the following lines.
+
+    Args:
+        assistant (Assistant): assistant created with a TextVoiceInterface over the same lines
+        lines (Iterator[str]): the query lines
+    """
+    executed = 0
+    started = time.perf_counter()
+    try:
+        for line in lines:
+            query = line.strip()
+            if not query or query.startswith("#"):
+                continue
+            query_started = time.perf_counter()
+            assistant.execute_query(query)
+            assistant.wait_for_tasks()
+            elapsed = time.perf_counter() - query_started
+            executed += 1
+            print(f"[{elapsed * 1000:9.2f} ms] {query}")
+    except EOFError:
+        print("Text input ended while a command was waiting for an answer")
+    total = time.perf_counter() - started
+    if executed:
+        print(
+            f"{executed} queries in {total:.3f} s "
+            f"({executed / total:.1f} queries per second)"
+        )
 
 
 def __main__():
-    assistant = Assistant()
+    parser = argparse.ArgumentParser(description="Desktop Assistant")
+    parser.add_argument(
+        "--mode",
+        choices=["sync", "pipeline", "text"],
+        default="sync",
+        help="sync: listen, recognize, execute and speak one after another; "
+        "pipeline: run the stages concurrently with asyncio; "
+        "text: read queries from --input without audio hardware",
+    )
+    parser.add_argument(
+        "--input",
+        help="file with one query per line for the text mode, defaults to stdin",
+    )
+    parser.add_argument(
+        "--quiet",
+        action="store_true",
+        help="do not print what the assistant says in the text mode",
+    )
+    args = parser.parse_args()
+
+    if args.mode == "text":
+        with (
+            open(args.input, "r", encoding="UTF-8")
+            if args.input
+            else contextlib.nullcontext(sys.stdin)
+        ) as text:
+            lines = iter(text)
+            assistant = Assistant(
+                voice_interface=TextVoiceInterface(lines, echo=not args.quiet)
+            )
+            run_text_queries(assistant, lines)
+        return
+
+    assistant = Assistant(prefetch=True)
     assistant.wish_user()
     clear_screen()
+    if args.mode == "pipeline":
+        asyncio.run(assistant.run_pipeline())
+        return
     while True:
         query = assistant.listen_for_query()
         assistant.execute_query(query)
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Audio Capture
+===============
+
+This module contains the ContinuousCapture class which keeps a single microphone stream
+open for the lifetime of the process, records it into a ring buffer and segments the
+recording into utterances as soon as the speaker pauses.
+
+"""
+
+import array
+import math
+import queue
+import threading
+import time
+from collections import deque
+
+import speech_recognition as sr
+
+from noise_calibration import NoiseCalibrator
+
+# Seconds between two attempts to reopen a failed microphone stream
+REOPEN_DELAY_SECONDS = 1.0
+# Seconds between two checks that the capture thread is alive while waiting for an utterance
+POLL_SECONDS = 0.5
+
+
+def frame_energy(frame: bytes) -> float:
+    """Returns the RMS energy of a frame of 16-bit little endian samples"""
+    samples = array.array("h", frame[: len(frame) - len(frame) % 2])
+    if not samples:
+        return 0.0
+    return math.sqrt(sum(sample * sample for sample in samples) / len(samples))
+
+
+def device_name(device_index: int | None) -> str:
+    """Returns the name of a PyAudio input device, "default" for the system default"""
+    if device_index is None:
+        return "default"
+    names = sr.Microphone.list_microphone_names()
+    return names[device_index] if device_index < len(names) else str(device_index)
+
+
+class FrameRing:
+    """Fixed capacity buffer of audio frames addressed by their absolute frame number"""
+
+    def __init__(self, capacity: int) -> None:
+        self.__frames = deque[bytes](maxlen=capacity)
+        self.__end = 0  # absolute number of the next frame to be appended
+
+    @property
+    def end(self) -> int:
+        """Absolute number of the frame that will be appended next"""
+        return self.__end
+
+    @property
+    def start(self) -> int:
+        """Absolute number of the oldest frame still held in the buffer"""
+        return self.__end - len(self.__frames)
+
+    def append(self, frame: bytes) -> None:
+        """Appends a frame, overwriting the oldest one once the buffer is full"""
+        self.__frames.append(frame)
+        self.__end += 1
+
+    def slice(self, start: int, stop: int) -> bytes:
+        """Returns the audio of frames [start, stop) which are still held in the buffer"""
+        first = self.start
+        start, stop = max(start, first), min(stop, self.__end)
+        if start >= stop:
+            return b""
+        frames = list(self.__frames)
+        return b"".join(frames[start - first : stop - first])
+
+
+class ContinuousCapture:
+    """
+    Always open microphone stream feeding a FrameRing. An energy based segmenter, using
+    the thresholds of the given recognizer, emits every finished utterance as AudioData.
+    Segments never start while muted (e.g. while the Assistant speaks) and a segment still
+    open when muting starts is dropped, so the Assistant never hears its own voice. The audio
+    preceding the first loud frame is taken from the ring so first words are not clipped.
+    """
+
+    def __init__(
+        self,
+        recognizer: sr.Recognizer,
+        is_muted: callable = lambda: False,
+        device_index: int | None = None,
+        ring_seconds: float = 30.0,
+        max_pending: int = 8,
+        idle_grace: float = 1.0,
+        calibrator: NoiseCalibrator | None = None,
+        source_factory: callable = sr.Microphone,
+    ) -> None:
+        """
+        Args:
+            recognizer (sr.Recognizer): recognizer whose energy/pause/phrase thresholds drive segmentation.
+            is_muted (callable, optional): returns True while no utterance must be recorded.
+            device_index (int | None, optional): PyAudio input device. Defaults to the system default.
+            ring_seconds (float, optional): seconds of audio kept in the ring buffer. Defaults to 30.
+            max_pending (int, optional): finished utterances kept until read. Defaults to 8.
+            idle_grace (float, optional): seconds after the last read during which finished
+                            utterances are still kept. Utterances finished while nobody
+                            listens, e.g. while a command runs, are dropped. Defaults to 1.
+            calibrator (NoiseCalibrator | None, optional): adapts the energy threshold from
+                            background frames. Defaults to the fixed recognizer threshold.
+            source_factory (callable, optional): creates the audio source from a device_index,
+                            e.g. a recorded file stand-in. Defaults to sr.Microphone.
+        """
+        self.recognizer = recognizer
+        self.device_index = device_index
+        self.__is_muted = is_muted
+        self.__ring_seconds = ring_seconds
+        self.__calibrator = calibrator
+        self.__source_factory = source_factory
+        self.__utterances = queue.Queue(maxsize=max_pending)
+        self.__idle_grace = idle_grace
+        self.__readers = 0  # threads waiting in next_utterance
+        self.__last_read = time.monotonic()
+        self.__readers_lock = threading.Lock()
+        self.__source = None
+        self.__ring = None
+        self.__stop_event = threading.Event()
+        self.__thread = None
+        self.__lock = threading.Lock()
+
+    def start(self) -> None:
+        """Opens the microphone stream and starts the capture thread, again if it died"""
+        with self.__lock:
+            if self.__thread is not None and self.__thread.is_alive():
+                return
+            if self.__thread is not None:
+                print("The microphone capture stopped, restarting it")
+                self.__close_source()
+            self.__open()
+
+    def __open(self) -> None:
+        if self.__calibrator is not None:
+            self.__calibrator.load()
+        self.__source = self.__source_factory(device_index=self.device_index)
+        self.__source.__enter__()  # pylint: disable=unnecessary-dunder-call
+        frames_per_second = self.__source.SAMPLE_RATE / self.__source.CHUNK
+        self.__ring = FrameRing(int(self.__ring_seconds * frames_per_second))
+        self.__stop_event.clear()
+        self.__thread = threading.Thread(
+            target=self.__capture_loop, name="capture", daemon=True
+        )
+        self.__thread.start()
+
+    def stop(self) -> None:
+        """Stops the capture thread and closes the microphone stream"""
+        with self.__lock:
+            if self.__thread is None:
+                return
+            self.__stop_event.set()
+            self.__thread.join()
+            self.__thread = None
+            self.__close_source()
+
+    def __close_source(self) -> None:
+        source, self.__source = self.__source, None
+        if source is None:
+            return
+        try:
+            source.__exit__(None, None, None)
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            print(f"Failed to close the microphone: {error}")
+
+    def next_utterance(self, timeout: float | None = None) -> sr.AudioData | None:
+        """Returns the next finished utterance, None if none arrived within the timeout.
+        A capture thread found dead while waiting is restarted."""
+        self.start()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.__readers_lock:
+            self.__readers += 1
+        try:
+            while True:
+                poll = POLL_SECONDS
+                if deadline is not None:
+                    poll = max(0.0, min(poll, deadline - time.monotonic()))
+                try:
+                    return self.__utterances.get(timeout=poll)
+                except queue.Empty:
+                    pass
+                if deadline is not None and time.monotonic() >= deadline:
+                    return None
+                self.start()
+        finally:
+            with self.__readers_lock:
+                self.__readers -= 1
+                self.__last_read = time.monotonic()
+
+    def __is_listened(self) -> bool:
+        """Returns True if someone waits for an utterance or did so moments ago"""
+        with self.__readers_lock:
+            return (
+                self.__readers > 0
+                or time.monotonic() - self.__last_read < self.__idle_grace
+            )
+
+    def discard_pending(self) -> None:
+        """Drops utterances which were segmented but not read yet"""
+        while True:
+            try:
+                self.__utterances.get_nowait()
+            except queue.Empty:
+                return
+
+    def __emit(self, audio: sr.AudioData) -> None:
+        """Queues a finished utterance, dropping the oldest one if nobody is reading.
+        An utterance finished while nobody listens is stale and dropped right away."""
+        if not self.__is_listened():
+            return
+        while True:
+            try:
+                self.__utterances.put_nowait(audio)
+                return
+            except queue.Full:
+                try:
+                    self.__utterances.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def __capture_loop(self) -> None:
+        """Segments the stream until stopped, reopening it whenever reading fails"""
+        while not self.__stop_event.is_set():
+            try:
+                self.__segment(self.__source)
+            except Exception as error:  # pylint: disable=broad-exception-caught
+                print(f"Microphone capture failed: {error.__class__.__name__}: {error}")
+                self.__reopen()
+
+    def __reopen(self) -> None:
+        """Closes the failed stream and opens a new one, retrying until stopped"""
+        self.__close_source()
+        while not self.__stop_event.wait(REOPEN_DELAY_SECONDS):
+            try:
+                source = self.__source_factory(device_index=self.device_index)
+                source.__enter__()  # pylint: disable=unnecessary-dunder-call
+            except Exception as error:  # pylint: disable=broad-exception-caught
+                print(f"Failed to reopen the microphone: {error}")
+                continue
+            self.__source = source
+            return
+
+    def __segment(self, source) -> None:
+        """Emits the utterances of the stream until stopped"""
+        ring = self.__ring
+        seconds_per_frame = source.CHUNK / source.SAMPLE_RATE
+        max_frames = int(self.__ring_seconds / seconds_per_frame)
+
+        in_speech = False
+        start = speech_frames = silent_frames = 0
+        while not self.__stop_event.is_set():
+            frame = source.stream.read(source.CHUNK)
+            if not frame:  # source has nothing to offer right now
+                self.__stop_event.wait(seconds_per_frame)
+                continue
+            ring.append(frame)
+            energy = frame_energy(frame)
+            loud = energy > self.recognizer.energy_threshold
+            if self.__is_muted():
+                # the Assistant is speaking: a segment still open would record its voice
+                in_speech = False
+                continue
+            if not in_speech:
+                # background frames adapt the threshold, segmenting waits for a first calibration
+                if self.__calibrator is not None:
+                    calibrating = not self.__calibrator.calibrated
+                    if calibrating or not loud:
+                        self.__calibrator.observe(energy, seconds_per_frame)
+                    if calibrating:
+                        continue
+                if loud:
+                    preroll = math.ceil(
+                        self.recognizer.non_speaking_duration / seconds_per_frame
+                    )
+                    in_speech = True
+                    start = ring.end - 1 - preroll
+                    speech_frames, silent_frames = 1, 0
+                continue
+
+            if loud:
+                speech_frames += 1
+                silent_frames = 0
+            else:
+                silent_frames += 1
+
+            pause_frames = math.ceil(
+                self.recognizer.pause_threshold / seconds_per_frame
+            )
+            if silent_frames < pause_frames and ring.end - start < max_frames:
+                continue
+
+            in_speech = False
+            if silent_frames < pause_frames and self.__calibrator is not None:
+                # no pause for the whole ring: the noise floor rose above the threshold
+                self.__calibrator.recalibrate()
+            phrase_frames = math.ceil(
+                self.recognizer.phrase_threshold / seconds_per_frame
+            )
+            if speech_frames < phrase_frames:
+                continue
+            trailing = max(
+                0,
+                silent_frames
+                - math.ceil(self.recognizer.non_speaking_duration / seconds_per_frame),
+            )
+            self.__emit(
+                sr.AudioData(
+                    ring.slice(start, ring.end - trailing),
+                    source.SAMPLE_RATE,
+                    source.SAMPLE_WIDTH,
+                )
+            )
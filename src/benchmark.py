@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark
+===============
+
+This module replays a corpus of recorded WAV files through the Assistant turn loop without a
+microphone, speakers or network recognizer, and reports the latency distribution of every
+stage of a turn: capture, endpointing, recognition, dispatch, execution and speech.
+
+The corpus is a directory of WAV files, each holding one spoken query, with the expected
+transcript of "query.wav" in "query.txt" next to it. Commands are stubbed unless --execute
+is given, so the numbers do not depend on the network or the desktop. Usage:
+
+    python3 benchmark.py path/to/corpus [--realtime] [--recognizer google] [--execute]
+
+"""
+
+import argparse
+import functools
+import glob
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+import speech_recognition as sr
+
+from assistant import Assistant
+from audio_capture import ContinuousCapture
+from command_manifest import MANIFEST
+from command_registery import CommandRegistery
+from recognizers import RecognizerBackend, ReplayBackend, create_backend
+from speech_engine import NullTTSEngine, SpeechEngine
+from tts_cache import SpeechCache
+from voice_interface import VoiceInterface
+
+STAGES = ["capture", "endpointing", "recognition", "dispatch", "execution", "speech"]
+
+
+class ReplayMicrophone:
+    """
+    Audio source standing in for sr.Microphone. Queued recordings are served chunk by chunk,
+    each followed by silence so the segmenter can detect the end of the utterance.
+    """
+
+    CHUNK = 1024
+    SAMPLE_RATE = 16000
+    SAMPLE_WIDTH = 2
+
+    def __init__(self, device_index: int | None = None, realtime: bool = False) -> None:
+        self.device_index = device_index
+        self.realtime = realtime
+        self.stream = self
+        self.__buffer = bytearray()
+        self.__speech_bytes = 0  # bytes of the buffer holding the recording itself
+        self.__lock = threading.Lock()
+        self.speech_served = threading.Event()
+        self.speech_served_at = 0.0
+
+    def __enter__(self) -> "ReplayMicrophone":
+        return self
+
+    def __exit__(self, *_) -> None:
+        return None
+
+    def queue_recording(self, path: str, trailing_silence: float = 2.0) -> float:
+        """Queues a WAV file, converted to 16 kHz 16-bit mono, followed by silence.
+        Returns the seconds of audio queued."""
+        with sr.AudioFile(path) as source:
+            audio = sr.Recognizer().record(source)
+        data = audio.get_raw_data(convert_rate=self.SAMPLE_RATE, convert_width=2)
+        silence = bytes(int(trailing_silence * self.SAMPLE_RATE) * self.SAMPLE_WIDTH)
+        with self.__lock:
+            self.speech_served.clear()
+            self.__buffer.extend(data)
+            self.__speech_bytes = len(data)
+            self.__buffer.extend(silence)
+        return (len(data) + len(silence)) / (self.SAMPLE_RATE * self.SAMPLE_WIDTH)
+
+    def read(self, frames: int) -> bytes:
+        """Returns the next chunk of the queued audio, empty once everything was served"""
+        size = frames * self.SAMPLE_WIDTH
+        with self.__lock:
+            chunk = bytes(self.__buffer[:size])
+            del self.__buffer[:size]
+            if self.__speech_bytes > 0:
+                self.__speech_bytes -= len(chunk)
+                if self.__speech_bytes <= 0:
+                    self.speech_served_at = time.perf_counter()
+                    self.speech_served.set()
+        if chunk and self.realtime:
+            time.sleep(frames / self.SAMPLE_RATE)
+        return chunk
+
+
+class TimedBackend(RecognizerBackend):
+    """Recognition backend wrapper recording how long each recognition took"""
+
+    def __init__(self, backend: RecognizerBackend) -> None:
+        super().__init__(backend.recognizer, backend.language)
+        self.backend = backend
+        self.name = backend.name
+        self.min_confidence = backend.min_confidence
+        self.last_duration = 0.0
+
+    def recognize(self, audio: sr.AudioData):
+        start = time.perf_counter()
+        try:
+            return self.backend.recognize(audio)
+        finally:
+            self.last_duration = time.perf_counter() - start
+
+
+def load_corpus(corpus_dir: str) -> list[tuple[str, str]]:
+    """Returns the (wav path, transcript) pairs of a corpus directory, sorted by name"""
+    corpus = []
+    for wav_path in sorted(glob.glob(os.path.join(corpus_dir, "*.wav"))):
+        transcript_path = os.path.splitext(wav_path)[0] + ".txt"
+        transcript = ""
+        if os.path.isfile(transcript_path):
+            with open(transcript_path, "r", encoding="UTF-8") as transcript_file:
+                transcript = transcript_file.read().strip()
+        corpus.append((wav_path, transcript))
+    return corpus
+
+
+def __stub_executor__(command: str, query: str, vi: VoiceInterface) -> None:
+    """Stands in for the executor of a command by saying what it was asked"""
+    vi.speak(f"{command}: {query}")
+
+
+def stub_registry() -> CommandRegistery:
+    """
+    Returns a registry routing queries by the triggers of the manifest to stub commands,
+    which only speak the query instead of executing it. Validators are skipped, so no
+    command module is imported.
+    """
+    registry = CommandRegistery()
+    for spec in MANIFEST:
+        registry.register_command(
+            spec.name,
+            lambda query: True,
+            functools.partial(__stub_executor__, spec.name),
+            spec.triggers,
+            spec.priority,
+        )
+    return registry
+
+
+def run_benchmark(
+    corpus: list[tuple[str, str]],
+    realtime: bool = False,
+    recognizer: str = "replay",
+    execute: bool = False,
+    timeout: float = 5.0,
+) -> dict[str, list[float]]:
+    """
+    Replays every recording of the corpus through one Assistant turn.
+
+    Args:
+        corpus (list[tuple[str, str]]): (wav path, transcript) pairs.
+        realtime (bool, optional): serve audio at its real pace instead of as fast as possible.
+        recognizer (str, optional): recognition backend, "replay" answers with the transcripts.
+        execute (bool, optional): run the real commands instead of stubs. Defaults to False.
+        timeout (float, optional): seconds to wait for an utterance beyond the length of its
+                        recording. Recordings which are never segmented, e.g. because they
+                        stay below the energy threshold, are skipped. Defaults to 5.
+
+    Returns:
+        dict[str, list[float]]: seconds spent in every stage, one entry per turn.
+    """
+    with tempfile.TemporaryDirectory() as cache_dir:
+        engine = SpeechEngine(SpeechCache(cache_dir, 0), tts_engine=NullTTSEngine())
+        engine.wake_gate = None
+        microphone = ReplayMicrophone(realtime=realtime)
+        engine.set_microphone(
+            # recordings may be segmented before capture is called, they are never stale
+            ContinuousCapture(
+                engine.recognizer,
+                idle_grace=float("inf"),
+                source_factory=lambda device_index: microphone,
+            )
+        )
+        if recognizer == "replay":
+            backend = ReplayBackend(transcripts=[text for _, text in corpus])
+        else:
+            backend = create_backend(recognizer, engine.recognizer)
+        timed_backend = TimedBackend(backend)
+        engine.recognition_backend = timed_backend
+
+        voice_interface = VoiceInterface(engine)
+        assistant = Assistant(
+            voice_interface=voice_interface,
+            registry=None if execute else stub_registry(),
+        )
+        voice_interface.wait()  # speech queued while starting up
+
+        timings = {stage: [] for stage in STAGES}
+        for wav_path, _ in corpus:
+            start = time.perf_counter()
+            seconds = microphone.queue_recording(wav_path)
+            audio = voice_interface.capture(timeout=seconds + timeout)
+            if audio is None:
+                print(f"No utterance segmented from {wav_path}, skipped")
+                if isinstance(backend, ReplayBackend):
+                    backend.skip()
+                continue
+            query = voice_interface.recognize(audio)
+            listened = time.perf_counter()
+            microphone.speech_served.wait(timeout)
+
+            assistant.execute_query(query)
+            dispatched = time.perf_counter()
+            assistant.wait_for_tasks()
+            executed = time.perf_counter()
+            voice_interface.wait()
+            spoken = time.perf_counter()
+
+            recognition = timed_backend.last_duration
+            timings["capture"].append(microphone.speech_served_at - start)
+            timings["endpointing"].append(
+                listened - microphone.speech_served_at - recognition
+            )
+            timings["recognition"].append(recognition)
+            timings["dispatch"].append(dispatched - listened)
+            timings["execution"].append(executed - dispatched)
+            timings["speech"].append(spoken - executed)
+        return timings
+
+
+def report(timings: dict[str, list[float]]) -> str:
+    """Formats the latency distribution of every stage in milliseconds"""
+    lines = [
+        f"{'stage':<12}{'turns':>7}{'mean':>10}{'p50':>10}{'p90':>10}{'p99':>10}{'max':>10}"
+    ]
+    for stage, samples in timings.items():
+        if not samples:
+            continue
+        millis = sorted(sample * 1000 for sample in samples)
+        if len(millis) > 1:
+            percentiles = statistics.quantiles(millis, n=100, method="inclusive")
+        else:
+            percentiles = millis * 99
+        lines.append(
+            f"{stage:<12}{len(millis):>7}{statistics.fmean(millis):>10.2f}"
+            f"{percentiles[49]:>10.2f}{percentiles[89]:>10.2f}{percentiles[98]:>10.2f}"
+            f"{millis[-1]:>10.2f}"
+        )
+    return "\n".join(lines)
+
+
+def __main__():
+    parser = argparse.ArgumentParser(
+        description="Replay recorded queries through the Assistant turn loop"
+    )
+    parser.add_argument(
+        "corpus", help="directory of WAV files and their .txt transcripts"
+    )
+    parser.add_argument(
+        "--realtime",
+        action="store_true",
+        help="serve the recordings at real speed to measure true turn latency",
+    )
+    parser.add_argument(
+        "--recognizer",
+        default="replay",
+        help="recognition backend to use, 'replay' answers with the transcripts",
+    )
+    parser.add_argument(
+        "--execute",
+        action="store_true",
+        help="run the real commands, which may use the network and change the desktop",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=5.0,
+        help="seconds to wait for an utterance beyond the length of its recording",
+    )
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    if not corpus:
+        print(f"No WAV files found in {args.corpus}")
+        return
+    print(
+        report(
+            run_benchmark(
+                corpus, args.realtime, args.recognizer, args.execute, args.timeout
+            )
+        )
+    )
+
+
+if __name__ == "__main__":
+    __main__()
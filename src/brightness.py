@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Brightness
+===============
+
+This module contains the display brightness backends, which keep their handle to the display
+open between adjustments: WmiBrightness on Windows and SysfsBacklight over the Linux
+/sys/class/backlight devices, and the BrightnessController which coalesces quick successive
+adjustments into a single write made from one long-lived thread.
+
+"""
+
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+
+from dotenv import dotenv_values
+
+from infra import is_windows, lazy_import
+
+__ENV__ = dotenv_values(".env")
+
+SYSFS_BACKLIGHT = "/sys/class/backlight"
+# Backlight interfaces by preference, the firmware ones know the panel best
+BACKLIGHT_TYPES = ("firmware", "platform", "raw")
+
+
+class BrightnessUnavailable(RuntimeError):
+    """Raised when the brightness of the display cannot be read or changed"""
+
+
+class BrightnessBackend(ABC):
+    """Reads and writes the brightness of the display as a percentage (0 to 100)"""
+
+    @abstractmethod
+    def get(self) -> int:
+        """Returns the current brightness"""
+
+    @abstractmethod
+    def set(self, percent: int) -> None:
+        """Sets the brightness"""
+
+    def close(self) -> None:
+        """Releases the handle to the display"""
+
+
+class WmiBrightness(BrightnessBackend):
+    """
+    Brightness of the built-in monitor through WMI. The connection and the brightness
+    methods are looked up once, and looked up again only after a call failed. COM is
+    initialized for the thread creating the backend, so it must be created, used and
+    closed on that same thread.
+    """
+
+    def __init__(self) -> None:
+        self.__connection = None
+        self.__methods = None
+        try:
+            self.__com = lazy_import("pythoncom")
+            self.__com.CoInitialize()
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            raise BrightnessUnavailable(f"COM is not available: {error}") from error
+        try:
+            self.__connect()
+        except BrightnessUnavailable:
+            self.__com.CoUninitialize()
+            raise
+
+    def __connect(self) -> None:
+        try:
+            self.__connection = lazy_import("wmi").WMI(namespace="root\\wmi")
+            self.__methods = self.__connection.WmiMonitorBrightnessMethods()[0]
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            self.__connection = self.__methods = None
+            raise BrightnessUnavailable(
+                f"Monitor brightness is not available: {error}"
+            ) from error
+
+    def __call(self, action):
+        """Runs the action, reconnecting once if the connection went stale"""
+        try:
+            if self.__connection is None:
+                self.__connect()
+            return action()
+        except BrightnessUnavailable:
+            raise
+        except Exception:  # pylint: disable=broad-exception-caught
+            self.__connect()
+            return action()
+
+    def get(self) -> int:
+        return int(
+            self.__call(
+                lambda: self.__connection.WmiMonitorBrightness()[0].CurrentBrightness
+            )
+        )
+
+    def set(self, percent: int) -> None:
+        self.__call(lambda: self.__methods.WmiSetBrightness(percent, 0))
+
+    def close(self) -> None:
+        if self.__com is None:
+            return
+        self.__connection = self.__methods = None
+        self.__com.CoUninitialize()
+        self.__com = None
+
+
+def find_backlight(root: str = SYSFS_BACKLIGHT) -> str:
+    """
+    Returns the path of the preferred backlight device under root.
+
+    Raises:
+        BrightnessUnavailable: If there is no backlight device.
+    """
+    devices = []
+    try:
+        with os.scandir(root) as entries:
+            for entry in entries:
+                try:
+                    with open(
+                        os.path.join(entry.path, "type"), "r", encoding="UTF-8"
+                    ) as type_file:
+                        kind = type_file.read().strip()
+                except OSError:
+                    kind = ""
+                rank = (
+                    BACKLIGHT_TYPES.index(kind)
+                    if kind in BACKLIGHT_TYPES
+                    else len(BACKLIGHT_TYPES)
+                )
+                devices.append((rank, entry.name, entry.path))
+    except OSError as error:
+        raise BrightnessUnavailable(f"No backlight found in {root}") from error
+    if not devices:
+        raise BrightnessUnavailable(f"No backlight found in {root}")
+    return min(devices)[2]
+
+
+class SysfsBacklight(BrightnessBackend):
+    """
+    Brightness of a Linux backlight device, e.g. /sys/class/backlight/intel_backlight.
+    max_brightness is read once and the brightness attribute is kept open, so an adjustment
+    is a single read or write at offset 0 of an open descriptor.
+    """
+
+    def __init__(self, device: str | None = None, root: str = SYSFS_BACKLIGHT) -> None:
+        """
+        Args:
+            device (str | None, optional): name of the device under root.
+                            Defaults to the preferred device (see find_backlight).
+            root (str, optional): directory of the backlight devices.
+                            Defaults to /sys/class/backlight.
+
+        Raises:
+            BrightnessUnavailable: If the device is missing or not writable by this user.
+        """
+        self.path = os.path.join(root, device) if device else find_backlight(root)
+        try:
+            self.max_brightness = self.__read_value(
+                os.path.join(self.path, "max_brightness")
+            )
+            self.__fd = os.open(os.path.join(self.path, "brightness"), os.O_RDWR)
+        except PermissionError as error:
+            raise BrightnessUnavailable(
+                f"No permission to change the brightness of {self.path}"
+            ) from error
+        except (OSError, ValueError) as error:
+            raise BrightnessUnavailable(
+                f"Unusable backlight {self.path}: {error}"
+            ) from error
+        if self.max_brightness <= 0:
+            os.close(self.__fd)
+            raise BrightnessUnavailable(f"Unusable backlight {self.path}")
+
+    @staticmethod
+    def __read_value(path: str) -> int:
+        with open(path, "r", encoding="UTF-8") as value_file:
+            return int(value_file.read().split()[0])
+
+    def get(self) -> int:
+        # only the first token counts: a shorter value written over a longer one leaves
+        # the tail of the old one in a regular file, while sysfs replaces the whole value
+        raw = int(os.pread(self.__fd, 32, 0).split()[0])
+        return round(raw * 100 / self.max_brightness)
+
+    def set(self, percent: int) -> None:
+        raw = round(min(max(0, percent), 100) * self.max_brightness / 100)
+        os.pwrite(self.__fd, f"{raw}\n".encode(), 0)
+
+    def close(self) -> None:
+        if self.__fd is not None:
+            os.close(self.__fd)
+            self.__fd = None
+
+
+def brightness_backend_from_env() -> BrightnessBackend:
+    """
+    Creates the backend of this platform. BACKLIGHT_DEVICE names the device under
+    /sys/class/backlight on Linux, by default the preferred one is used.
+    """
+    if is_windows():
+        return WmiBrightness()
+    return SysfsBacklight(__ENV__.get("BACKLIGHT_DEVICE") or None)
+
+
+class BrightnessController:
+    """
+    Applies brightness changes on one writer thread, which creates, reads, writes and closes
+    the backend, so a backend bound to its thread, like WMI over COM, is only used there.
+    A change only moves the target, which is written once no other change came for
+    coalesce_seconds, so "increase brightness by 10" said three times in a row costs one
+    write of +30 instead of three read-modify-writes.
+    """
+
+    __instance = None
+    __instance_lock = threading.Lock()
+
+    def __init__(
+        self,
+        backend_factory: callable = brightness_backend_from_env,
+        coalesce_seconds: float = 0.2,
+    ) -> None:
+        """
+        Args:
+            backend_factory (callable, optional): creates the backend writing the brightness.
+                            Defaults to the backend of this platform.
+            coalesce_seconds (float, optional): quiet time before the target is written.
+                            Defaults to 0.2.
+
+        Raises:
+            BrightnessUnavailable: If the backend cannot be created or read.
+        """
+        self.coalesce_seconds = coalesce_seconds
+        self.__backend_factory = backend_factory
+        self.__condition = threading.Condition()
+        self.__target = None  # percent waiting to be written
+        self.__delta = 0  # change to add to the brightness read when writing
+        self.__current = 0  # brightness last read, or being written
+        self.__changed_at = 0.0
+        self.__writing = False
+        self.__closed = False
+        self.__error = None
+        self.__ready = threading.Event()
+        self.__thread = threading.Thread(
+            target=self.__run, name="brightness", daemon=True
+        )
+        self.__thread.start()
+        self.__ready.wait()
+        if self.__error is not None:
+            raise self.__error
+
+    @staticmethod
+    def instance() -> "BrightnessController":
+        """Returns the BrightnessController shared by the whole process"""
+        with BrightnessController.__instance_lock:
+            if BrightnessController.__instance is None:
+                BrightnessController.__instance = BrightnessController()
+            return BrightnessController.__instance
+
+    def get(self) -> int:
+        """Returns the brightness being applied, or the last one read or written"""
+        with self.__condition:
+            if self.__target is not None:
+                return self.__target
+            return self.__current + self.__delta
+
+    def set(self, percent: int) -> int:
+        """Moves the target to the percentage, returns the clamped target"""
+        with self.__condition:
+            self.__target = min(max(0, int(percent)), 100)
+            self.__delta = 0
+            self.__changed()
+            return self.__target
+
+    def adjust(self, delta: int) -> int:
+        """
+        Moves the target by delta from the pending target, else from the brightness read
+        right before writing. Returns the expected target, based on the last brightness
+        read or written.
+        """
+        with self.__condition:
+            if self.__target is not None:
+                self.__target = min(max(0, self.__target + int(delta)), 100)
+                self.__changed()
+                return self.__target
+            # clamped like successive adjustments: at 50, -90 then +10 ends at 10
+            expected = min(max(0, self.__current + self.__delta + int(delta)), 100)
+            self.__delta = expected - self.__current
+            self.__changed()
+            return expected
+
+    def __changed(self) -> None:
+        """Restarts the quiet time and wakes the writer (condition must be held)"""
+        self.__changed_at = time.monotonic()
+        self.__condition.notify_all()
+
+    def __pending(self) -> bool:
+        """Returns True if a change waits to be written (condition must be held)"""
+        return self.__target is not None or self.__delta != 0
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Waits until the pending target is written, returns False on timeout"""
+        with self.__condition:
+            return self.__condition.wait_for(
+                lambda: not self.__pending() and not self.__writing, timeout
+            )
+
+    def close(self) -> None:
+        """Writes the pending target at once, then stops the writer and closes the backend"""
+        with self.__condition:
+            self.__closed = True
+            self.__condition.notify_all()
+        self.__thread.join()
+
+    def __run(self) -> None:
+        try:
+            backend = self.__backend_factory()
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            self.__error = (
+                error
+                if isinstance(error, BrightnessUnavailable)
+                else BrightnessUnavailable(f"Brightness is not available: {error}")
+            )
+            self.__ready.set()
+            return
+        try:
+            self.__current = backend.get()
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            backend.close()
+            self.__error = BrightnessUnavailable(
+                f"Failed to read the brightness: {error}"
+            )
+            self.__ready.set()
+            return
+        self.__ready.set()
+        try:
+            while self.__write_next(backend):
+                pass
+        finally:
+            backend.close()
+
+    def __write_next(self, backend: BrightnessBackend) -> bool:
+        """Writes the next target once it settled, returns False once closed"""
+        with self.__condition:
+            self.__condition.wait_for(lambda: self.__pending() or self.__closed)
+            if not self.__pending():
+                return False
+            quiet = self.__changed_at + self.coalesce_seconds - time.monotonic()
+            if quiet > 0 and not self.__closed:
+                self.__condition.wait(quiet)
+                return True
+            relative = self.__target is None
+            self.__writing = True
+        try:
+            # only this thread writes, so the brightness read is never a write in flight
+            current = backend.get() if relative else None
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            print(f"Failed to read the brightness: {error}")
+            current = None
+        with self.__condition:
+            if self.__target is None:
+                if current is None:
+                    current = self.__current
+                self.__target = min(max(0, current + self.__delta), 100)
+            target, self.__target, self.__delta = self.__target, None, 0
+            self.__current = target
+        try:
+            backend.set(target)
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            print(f"Failed to set the brightness to {target}: {error}")
+        finally:
+            with self.__condition:
+                self.__writing = False
+                self.__condition.notify_all()
+        return True
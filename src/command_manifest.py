@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Command Manifest
+===============
+
+This module lists every command supported by the Assistant along with the keywords that
+route a query to it and the module implementing it. The CommandRegistery routes queries
+against this manifest and only imports a command module the first time it is dispatched.
+
+"""
+
+from typing import NamedTuple
+
+
+class CommandSpec(NamedTuple):
+    """Manifest entry describing a command without importing its implementation"""
+
+    name: str  # name of the command class, also used as the command name
+    module: str  # dotted path of the module defining the command class
+    triggers: tuple[str, ...]  # keywords routing a query to the command
+    priority: int = 0  # precedence when triggers of several commands match
+    foreground: bool = False  # run on the listening thread, e.g. for dialogs
+    prefetch: bool = False  # has a prefetch() warming its caches in the background
+
+
+MANIFEST = (
+    CommandSpec("GoogleSearch", "commands.google_search", ("search",)),
+    CommandSpec(
+        "WikipediaSearch",
+        "commands.wikipedia_search",
+        ("wikipedia",),
+        10,
+        prefetch=True,
+    ),
+    CommandSpec("OpenApplication", "commands.open_application", ("open",)),
+    CommandSpec("CurrentTime", "commands.current_time", ("the time", "time please")),
+    CommandSpec("BrightnessControl", "commands.brightness_control", ("brightness",)),
+    CommandSpec("VolumeControl", "commands.volume_control", ("volume", "sound")),
+    CommandSpec(
+        "ShutdownSystem", "commands.shutdown_system", ("shutdown", "shut down")
+    ),
+    CommandSpec("RestartSystem", "commands.restart_system", ("restart",)),
+    CommandSpec(
+        "WeatherReporter", "commands.weather_reporter", ("weather",), prefetch=True
+    ),
+    CommandSpec("FetchNews", "commands.fetch_news", ("news",), prefetch=True),
+    CommandSpec("SendEmail", "commands.send_email", ("email",), foreground=True),
+)
@@ -9,37 +9,29 @@ individual features of the Assistant.
 
 """
 
+import importlib
 import threading
-import time
 
-import pyautogui as pag
-import pygetwindow
 from dotenv import dotenv_values
-from PIL import ImageGrab
-
-from commands.brightness_control import BrightnessControl
-from commands.current_time import CurrentTime
-from commands.fetch_news import FetchNews
-from commands.google_search import GoogleSearch
-from commands.open_application import OpenApplication
-from commands.restart_system import RestartSystem
-from commands.send_email import SendEmail
-from commands.shutdown_system import ShutdownSystem
-from commands.volume_control import VolumeControl
-from commands.weather_reporter import WeatherReporter
-from commands.wikipedia_search import WikipediaSearch
+
+from command_manifest import MANIFEST, CommandSpec
+from intent_index import IntentIndex
+from scroll_engine import ScrollController, ScrollState
+from telemetry import TRACER
 from voice_interface import VoiceInterface
 
+ENVIRONMENT_VARIABLES = dotenv_values(".env")
+
 SUPPORTED_FEATURES = {
-    "search your query in google and return upto 10 results",
+    # same setting and default as GoogleSearch.MAX_RESULTS, without importing the command
+    "search your query in google and return upto "
+    f"{int(ENVIRONMENT_VARIABLES.get('SEARCH_MAX_RESULTS') or 5)} results",
     "get a wikipedia search summary of upto 3 sentences",
     "open applications or websites",
     "tell you the time of the day",
     "scroll the screen with active cursor",
 }
 
-ENVIRONMENT_VARIABLES = dotenv_values(".env")
-
 
 def explain_features(vi: VoiceInterface) -> None:
     """Explains the features available
@@ -47,80 +39,55 @@ def explain_features(vi: VoiceInterface) -> None:
     Args:
         vi (VoiceInterface): The voice interface instance used to speak the text
     """
-    vi.speak("Here's what I can do...\n")
-    for feature in SUPPORTED_FEATURES:
-        vi.speak(f"--> {feature}")
-
-
-def start_gradual_scroll(direction: str, stop_event: threading.Event) -> None:
-    """Gradually scroll in the given direction until stop_event is set."""
-    active_window = pygetwindow.getActiveWindow()
-    if not active_window:
-        return
-
-    # Capture a portion of the window to ensure scrolling
-    left, top, right, bottom = 0, 0, 100, 100
-    width = right - left
-    height = bottom - top
-    previous_image = ImageGrab.grab(bbox=(left, top, left + width, top + height))
-    while not stop_event.is_set():
-        pag.scroll(clicks=1)
-        current_image = ImageGrab.grab(bbox=(left, top, left + width, top + height))
-
-        if current_image.getdata() == previous_image.getdata():
-            print("Reached to extreme")
-            stop_event.set()
-            break
-        previous_image = current_image
-
-    print(f"Stopped scrolling {direction}.")
-
-
-def start_scrolling(direction: str) -> tuple[threading.Thread, threading.Event]:
-    """Start a new scroll thread."""
-    stop_scrolling_event = threading.Event()
-    scrolling_thread = threading.Thread(
-        target=start_gradual_scroll, args=(direction, stop_scrolling_event)
-    )
-    scrolling_thread.start()
-    return scrolling_thread, stop_scrolling_event
-
-
-def stop_scrolling(
-    scrolling_thread: threading.Thread, scrolling_thread_event: threading.Event
-) -> None:
-    """Stop the scrolling thread if not already stopped."""
-    if scrolling_thread is not None:
-        scrolling_thread_event.set()
-        scrolling_thread.join()
+    with vi.batch():
+        vi.speak("Here's what I can do...\n", cache=True)
+        for feature in SUPPORTED_FEATURES:
+            vi.speak(f"--> {feature}", cache=True)
+
+
+def start_scrolling(direction: str) -> None:
+    """Start scrolling in the given direction on the scroll controller thread."""
+    ScrollController.instance().start(direction)
+
+
+def stop_scrolling() -> None:
+    """Stop scrolling, without waiting for the scroll controller thread."""
+    ScrollController.instance().stop()
+
+
+def set_scroll_speed(speed: str) -> None:
+    """Change the speed of scrolling to a preset, or to "faster" or "slower"."""
+    ScrollController.instance().set_speed(speed)
+
+
+def scroll_state() -> ScrollState | None:
+    """Returns whether, in which direction and how fast the screen is being scrolled."""
+    return ScrollController.instance().state()
+
+
+# Upper bound of the key presses sent to reach the left or right end of a line
+MAX_SCROLL_TO_PRESSES = 5000
 
 
 def scroll_to(direction: str) -> None:
-    """Scroll to the extreme in the given direction."""
-    active_window = pygetwindow.getActiveWindow()
-    if not active_window:
-        return
-    time.sleep(0.5)
+    """Scroll to the extreme in the given direction, on the scroll controller thread."""
     if direction == "top":
-        pag.press("home")
+        ScrollController.instance().press("home", 1)
     elif direction == "bottom":
-        pag.press("end")
-    elif direction == "right":
-        pag.press("right", presses=9999)
-    elif direction == "left":
-        pag.press("left", presses=9999)
+        ScrollController.instance().press("end", 1)
+    elif direction in ["left", "right"]:
+        # stops as soon as the window no longer changes, "stop scrolling" cancels it
+        ScrollController.instance().press(
+            direction, MAX_SCROLL_TO_PRESSES, until_still=True
+        )
     else:
         print("Invalid Command")
 
 
 def simple_scroll(direction: str) -> None:
     """Simple scroll in the given direction by a fixed number of steps."""
-    active_window = pygetwindow.getActiveWindow()
-    if not active_window:
-        return
-    time.sleep(0.5)
     if direction in ["up", "down", "left", "right"]:
-        pag.press(keys=direction, presses=25)
+        ScrollController.instance().press(direction, 25)
     else:
         print("Invalid direction")
 
@@ -128,12 +95,23 @@ def simple_scroll(direction: str) -> None:
 class CommandRegistery:
     """Class to register and execute commands based on the query"""
 
-    def __init__(self, vi: VoiceInterface) -> None:
+    def __init__(self, vi: VoiceInterface | None = None) -> None:
         self.vi = vi
         self.__registery = dict[str, tuple[callable, callable]]()
+        self.__manifest = dict[str, CommandSpec]()
+        self.__index = IntentIndex()
+        self.__unindexed = list[str]()
+        # command -> why its module failed to import
+        self.__unavailable = dict[str, str]()
+        self.__load_lock = threading.Lock()
 
     def register_command(
-        self, command: str, validate_query: callable, execute_query: callable
+        self,
+        command: str,
+        validate_query: callable,
+        execute_query: callable,
+        triggers: tuple[str, ...] = (),
+        priority: int = 0,
     ) -> None:
         """
         Registers a command with the CommandRegistery.
@@ -142,8 +120,80 @@ class CommandRegistery:
             command (str): The command string to register.
             validate_query (callable): The function to validate the query for the command.
             execute_query (callable): The function to execute the query for the command.
+            triggers (tuple[str, ...], optional): Keywords which route a query to the command.
+                            Commands without triggers are validated one by one after the index.
+            priority (int, optional): Precedence of the command when the triggers of several
+                            commands occur in the same query. Defaults to 0.
         """
         self.__registery[command] = (validate_query, execute_query)
+        if triggers:
+            self.__index.add(command, triggers, priority)
+        elif command not in self.__unindexed:
+            self.__unindexed.append(command)
+
+    def register_manifest(self, manifest: tuple[CommandSpec, ...]) -> None:
+        """
+        Registers the commands listed in a manifest without importing their modules.
+        A command module is imported the first time a query is routed to it.
+
+        Args:
+            manifest (tuple[CommandSpec, ...]): The command manifest entries to register.
+        """
+        for spec in manifest:
+            self.__manifest[spec.name] = spec
+            self.__index.add(spec.name, spec.triggers, spec.priority)
+
+    def __load(self, command: str) -> tuple[callable, callable]:
+        """Returns the validator and executor of a command, importing its module if required.
+        A command whose module cannot be imported, e.g. for a missing platform dependency or
+        a library failing to initialize, is recorded as unavailable and returns (None, None).
+        """
+        handlers = self.__registery.get(command)
+        if handlers is not None or command not in self.__manifest:
+            return handlers or (None, None)
+
+        with self.__load_lock:
+            if command in self.__unavailable:
+                return None, None
+            if command not in self.__registery:
+                spec = self.__manifest[command]
+                try:
+                    module = importlib.import_module(spec.module)
+                    command_class = getattr(module, spec.name)
+                # pylint: disable-next=broad-exception-caught
+                except (Exception, SystemExit) as error:
+                    # some libraries exit the process when imported on another platform
+                    print(
+                        f"Failed to load {command}: {error.__class__.__name__}: {error}"
+                    )
+                    self.__unavailable[command] = str(error)
+                    return None, None
+                self.__registery[command] = (
+                    command_class.validate_query,
+                    command_class.execute_query,
+                )
+        return self.__registery[command]
+
+    def warm_up(self, commands: list[str] | None = None) -> threading.Thread:
+        """
+        Imports command modules in a background thread so the first dispatch does not pay for it.
+
+        Args:
+            commands (list[str] | None, optional): names of the commands to load.
+                            Defaults to all commands in the manifest.
+
+        Returns:
+            threading.Thread: the daemon thread loading the commands.
+        """
+        commands = list(self.__manifest) if commands is None else commands
+
+        def load_all():
+            for command in commands:
+                self.__load(command)
+
+        warm_up_thread = threading.Thread(target=load_all, daemon=True)
+        warm_up_thread.start()
+        return warm_up_thread
 
     def get_executor(self, query: str) -> tuple[str, callable]:
         """
@@ -154,11 +204,64 @@ class CommandRegistery:
 
         Returns:
             tuple[str, callable]: The command string and the executor function for the query.
+                            The executor is None if the query was routed to a command
+                            whose module failed to import on this system.
         """
-        for command, validate_query, execute_query in self.__registery:
+        with TRACER.span("get_executor") as span:
+            command, execute_query = self.__route(query)
+            span.set("command", command)
+        if command is None or execute_query is None:
+            return command, None
+        # every execution of the command is timed as an execute_query span
+        return command, TRACER.traced("execute_query", execute_query, command=command)
+
+    def __route(self, query: str) -> tuple[str, callable]:
+        """Returns the first command (and its executor) whose validator accepts the query.
+        If none does, the first unavailable command whose triggers matched is returned
+        without an executor, so the user learns why the query did nothing."""
+        unavailable = None
+        for command in self.__index.match(query):
+            validate_query, execute_query = self.__load(command)
+            if validate_query is None:
+                unavailable = unavailable or command
+            elif validate_query(query):
+                return command, execute_query
+
+        for command in self.__unindexed:
+            validate_query, execute_query = self.__registery[command]
             if validate_query(query):
                 return command, execute_query
-        return None, None
+        return unavailable, None
+
+    def runs_in_foreground(self, command: str) -> bool:
+        """Returns True if the command must run on the listening thread instead of a worker
+
+        Args:
+            command (str): name of the command
+
+        Returns:
+            bool: True if the manifest marks the command as foreground
+        """
+        spec = self.__manifest.get(command)
+        return spec is not None and spec.foreground
+
+    def prefetchable(self) -> list[str]:
+        """Returns the commands the manifest marks as having a prefetch function"""
+        return [spec.name for spec in self.__manifest.values() if spec.prefetch]
+
+    def prefetch(self, command: str) -> float | None:
+        """Runs the prefetch function of a command, importing its module if required
+
+        Args:
+            command (str): name of a command marked as prefetchable in the manifest
+
+        Returns:
+            float | None: seconds until the command wants to be prefetched again, if it cares
+        """
+        spec = self.__manifest[command]
+        if self.__load(command) == (None, None):
+            return None
+        return getattr(importlib.import_module(spec.module), spec.name).prefetch()
 
     def get_command(self, command: str) -> tuple[callable, callable]:
         """Get the query validator and query executor for given command name
@@ -172,55 +275,8 @@ class CommandRegistery:
         if self.__registery is None:
             return None, None
 
-        return self.__registery.get(key=command, default=(None, None))
-
-
-INSTANCE = CommandRegistery(VoiceInterface())
-
-INSTANCE.register_command(
-    GoogleSearch.command_name(), GoogleSearch.validate_query, GoogleSearch.execute_query
-)
-INSTANCE.register_command(
-    WikipediaSearch.command_name(),
-    WikipediaSearch.validate_query,
-    WikipediaSearch.execute_query,
-)
-INSTANCE.register_command(
-    OpenApplication.command_name(),
-    OpenApplication.validate_query,
-    OpenApplication.execute_query,
-)
-INSTANCE.register_command(
-    CurrentTime.command_name(), CurrentTime.validate_query, CurrentTime.execute_query
-)
-INSTANCE.register_command(
-    BrightnessControl.command_name(),
-    BrightnessControl.validate_query,
-    BrightnessControl.execute_query,
-)
-INSTANCE.register_command(
-    VolumeControl.command_name(),
-    VolumeControl.validate_query,
-    VolumeControl.execute_query,
-)
-INSTANCE.register_command(
-    ShutdownSystem.command_name(),
-    ShutdownSystem.validate_query,
-    ShutdownSystem.execute_query,
-)
-INSTANCE.register_command(
-    RestartSystem.command_name(),
-    RestartSystem.validate_query,
-    RestartSystem.execute_query,
-)
-INSTANCE.register_command(
-    WeatherReporter.command_name(),
-    WeatherReporter.validate_query,
-    WeatherReporter.execute_query,
-)
-INSTANCE.register_command(
-    FetchNews.command_name(), FetchNews.validate_query, FetchNews.execute_query
-)
-INSTANCE.register_command(
-    SendEmail.command_name(), SendEmail.validate_query, SendEmail.execute_query
-)
+        return self.__load(command)
+
+
+INSTANCE = CommandRegistery()
+INSTANCE.register_manifest(MANIFEST)
@@ -1,7 +1,6 @@
 import re
 
-import wmi
-
+from brightness import BrightnessController, BrightnessUnavailable
 from voice_interface import VoiceInterface
 
 
@@ -20,19 +19,23 @@ class BrightnessControl:
         query = query.lower()
 
         value = re.findall(r"\b(100|[1-9]?[0-9])\b", query)
-        if len(value) == 0 or not str(value).isnumeric():
+        if len(value) == 0:
             vi.speak("Please provide a valid brightness value between 0 and 100")
-        else:
-            value = min(max(0, int(value[0])), 100)
+            return
+        value = min(max(0, int(value[0])), 100)
+        try:
             if "set" in query:
                 brightness_control(value, False, False)
             else:
                 to_decrease = "decrease" in query or "reduce" in query
                 relative = "by" in query
                 brightness_control(value, relative, to_decrease)
+        except BrightnessUnavailable as error:
+            print(error)
+            vi.speak("Sorry, I can not change the brightness of this display")
 
 
-def brightness_control(value: int, relative: bool, to_decrease: bool):
+def brightness_control(value: int, relative: bool, to_decrease: bool) -> int:
     """
     Adjusts the brightness of the monitor.
 
@@ -44,23 +47,16 @@ def brightness_control(value: int, relative: bool, to_decrease: bool):
                             If False, increases the brightness by the specified value.
                             Only applicable when `relative` is True.
 
+    The change is applied in the background by the BrightnessController, together with
+    any other change following it closely.
+
     Raises:
-        RuntimeError: If there is an issue with accessing the brightness control methods.
+        BrightnessUnavailable: If the brightness of the display can not be changed.
 
     Returns:
-        None
+        int: the brightness being applied.
     """
-
-    brightness_ctrl = wmi.WMI(namespace="root\\wmi")
-    methods = brightness_ctrl.WmiMonitorBrightnessMethods()[0]
-
+    controller = BrightnessController.instance()
     if relative:
-        current_brightness = brightness_ctrl.WmiMonitorBrightness()[0].CurrentBrightness
-        set_brightness = (
-            current_brightness - int(value)
-            if to_decrease
-            else current_brightness + int(value)
-        )
-        methods.WmiSetBrightness(set_brightness, 0)
-    else:
-        methods.WmiSetBrightness(value, 0)
+        return controller.adjust(-value if to_decrease else value)
+    return controller.set(value)
@@ -1,12 +1,32 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain, zip_longest
+
 import feedparser
+import requests
+from dotenv import dotenv_values
 
+from feed_cache import FeedCache, FeedState
+from http_client import HttpClient
 from voice_interface import VoiceInterface
 
+__ENV__ = dotenv_values(".env")
+
 
 class FetchNews:
     # Maximum number of news headlines to fetch when news function is called
     MAX_FETCHED_HEADLINES = 10
     FEED_URL = "https://news.google.com/rss?hl=en-IN&gl=IN&ceid=IN:en"
+    # Comma separated feeds in NEWS_FEEDS replace the default feed
+    FEED_URLS = [
+        url.strip()
+        for url in (__ENV__.get("NEWS_FEEDS") or FEED_URL).split(",")
+        if url.strip()
+    ]
+    # Seconds the feed request may take, retries included
+    REQUEST_BUDGET = 8.0
+
+    feeds = FeedCache(freshness=float(__ENV__.get("NEWS_FRESHNESS_MINUTES") or 10) * 60)
 
     @staticmethod
     def command_name() -> str:
@@ -18,14 +38,77 @@ class FetchNews:
 
     @staticmethod
     def execute_query(_: str, vi: VoiceInterface) -> None:
-        vi.speak("Fetching news from servers.")
-        feed = feedparser.parse(FetchNews.FEED_URL)
-        if feed.status == 200:
-            headlines_list = []
-            for entry in feed.entries[: FetchNews.MAX_FETCHED_HEADLINES]:
-                headlines_list.append((entry.title).split(" -")[0])
+        vi.speak("Fetching news from servers.", cache=True)
+        headlines_list = fetch_headlines(FetchNews.FEED_URLS)
+        if headlines_list:
             vi.speak("Here are some recent news headlines.")
-            for headline in headlines_list:
-                vi.speak(headline)
+            vi.speak_many(headlines_list)
         else:
             vi.speak("Failed to fetch the news.")
+
+    @staticmethod
+    def prefetch() -> float:
+        """Revalidates the feeds shortly before the cached headlines would go stale"""
+        fetch_headlines(FetchNews.FEED_URLS, max_age=0)
+        return FetchNews.feeds.freshness * 0.9
+
+
+def fetch_feed(url: str, max_age: float | None = None) -> list[str] | None:
+    """
+    Returns the headlines of a feed. A fresh cached copy is served without a request, an
+    older one is revalidated with a conditional GET and kept when the server answers 304.
+    A stale copy is still returned if the feed cannot be downloaded.
+    """
+    state = FetchNews.feeds.load(url)
+    if state is not None and FetchNews.feeds.is_fresh(state, max_age):
+        return state.headlines
+
+    headers = {}
+    if state is not None and state.etag:
+        headers["If-None-Match"] = state.etag
+    if state is not None and state.modified:
+        headers["If-Modified-Since"] = state.modified
+    try:
+        response = HttpClient.instance().get(
+            url, headers=headers, budget=FetchNews.REQUEST_BUDGET
+        )
+    except requests.RequestException as error:
+        print(f"Failed to fetch {url}: {error}")
+        return state.headlines if state is not None else None
+
+    if response.status_code == 304 and state is not None:
+        FetchNews.feeds.store(state._replace(fetched_at=time.time()))
+        return state.headlines
+    if response.status_code != 200:
+        return state.headlines if state is not None else None
+
+    feed = feedparser.parse(response.content)
+    headlines = [
+        (entry.title).split(" -")[0]
+        for entry in feed.entries[: FetchNews.MAX_FETCHED_HEADLINES]
+    ]
+    FetchNews.feeds.store(
+        FeedState(
+            url,
+            headlines,
+            response.headers.get("ETag"),
+            response.headers.get("Last-Modified"),
+            time.time(),
+        )
+    )
+    return headlines
+
+
+def fetch_headlines(urls: list[str], max_age: float | None = None) -> list[str]:
+    """Fetches the feeds in parallel and interleaves their headlines, without duplicates"""
+    if len(urls) == 1:
+        feeds = [fetch_feed(urls[0], max_age)]
+    else:
+        with ThreadPoolExecutor(max_workers=len(urls)) as pool:
+            feeds = list(pool.map(lambda url: fetch_feed(url, max_age), urls))
+
+    interleaved = chain.from_iterable(
+        zip_longest(*(feed for feed in feeds if feed), fillvalue=None)
+    )
+    headlines = list(dict.fromkeys(title for title in interleaved if title))
+    return headlines[: FetchNews.MAX_FETCHED_HEADLINES]
@@ -1,11 +1,27 @@
 import re
+from itertools import islice
+from typing import Iterator
 
 import googlesearch
+from dotenv import dotenv_values
 
+from http_client import route_through
+from ttl_cache import TTLCache
 from voice_interface import VoiceInterface
 
+__ENV__ = dotenv_values(".env")
+
+# Let googlesearch reuse the pooled connections of the shared HTTP client
+route_through(googlesearch)
+
 
 class GoogleSearch:
+    QUERY_PATTERN = re.compile(r"search .* (in google)?")
+    # Maximum number of results fetched and read out per search
+    MAX_RESULTS = int(__ENV__.get("SEARCH_MAX_RESULTS") or 5)
+
+    # Recent (query, result cap) -> [(title, url), ...]
+    results_cache = TTLCache(ttl=15 * 60, max_entries=64)
 
     @staticmethod
     def command_name() -> str:
@@ -13,14 +29,39 @@ class GoogleSearch:
 
     @staticmethod
     def validate_query(query: str) -> bool:
-        return re.search(r"search .* (in google)?", query)
+        return GoogleSearch.QUERY_PATTERN.search(query) is not None
 
     @staticmethod
     def execute_query(query: str, vi: VoiceInterface) -> None:
         search_query = re.findall(r"search (.*)", query.replace("in google", ""))[0]
-        results = googlesearch.search(term=search_query)
-        if not results:
+        found = False
+        for position, (title, url) in enumerate(search(search_query), start=1):
+            if not found:
+                vi.speak("Found Following Results: ")
+                found = True
+            print(url)
+            vi.speak(f"{position}. {title or url}")
+        if not found:
             vi.speak("No Search Result Found!!")
-        else:
-            results = list(results)
-            vi.speak("Found Following Results: ")
+
+
+def search(search_query: str) -> Iterator[tuple[str, str]]:
+    """
+    Yields the (title, url) of the results as soon as each one is parsed, while the
+    following pages are still to be fetched. Complete result lists are cached, so a
+    repeated search is answered without a request.
+    """
+    key = (" ".join(search_query.lower().split()), GoogleSearch.MAX_RESULTS)
+    cached = GoogleSearch.results_cache.get(key)
+    if cached is not None:
+        yield from cached
+        return
+
+    results = []
+    hits = googlesearch.search(
+        term=search_query, num_results=GoogleSearch.MAX_RESULTS, advanced=True
+    )
+    for result in islice(hits, GoogleSearch.MAX_RESULTS):
+        results.append((result.title, result.url))
+        yield results[-1]
+    GoogleSearch.results_cache.put(key, results)
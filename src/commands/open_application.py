@@ -2,13 +2,15 @@ import re
 import subprocess
 from subprocess import CalledProcessError, TimeoutExpired
 
-from AppOpener import open as open_app
-
 import infra
+from app_index import ApplicationIndex
 from voice_interface import VoiceInterface
 
 
 class OpenApplication:
+    QUERY_PATTERN = re.compile("open .*")
+    # Domains and URLs are opened in the browser without looking for an application
+    WEBSITE_PATTERN = re.compile(r"://|\.[a-z]{2,}$")
 
     @staticmethod
     def command_name() -> str:
@@ -16,7 +18,7 @@ class OpenApplication:
 
     @staticmethod
     def validate_query(query: str) -> bool:
-        return re.search("open .*", query)
+        return OpenApplication.QUERY_PATTERN.search(query) is not None
 
     @staticmethod
     def execute_query(query: str, vi: VoiceInterface) -> None:
@@ -52,7 +54,7 @@ def open_application_website(vi: VoiceInterface, search_query: str) -> None:
     # use appopener to open the application only if os is windows
     if infra.is_windows():
         __open_application_website_windows(vi, search_query)
-    if infra.is_darwin():
+    elif infra.is_darwin():
         __open_application_website_darwin(vi, search_query)
     elif infra.is_posix():
         __open_application_website_posix(vi, search_query)
@@ -70,8 +72,13 @@ def __open_application_website_windows(vi: VoiceInterface, search_query: str) ->
     Raises:
         ValueError: Throws exception in case neither app nor web access-point is present.
     """
+    # AppOpener exits the whole process when it is imported on any other OS
+    import AppOpener  # pylint: disable=import-outside-toplevel
+
     try:
-        open_app(search_query, match_closest=True)  # attempt to open as application
+        AppOpener.open(
+            search_query, match_closest=True
+        )  # attempt to open as application
     except Exception as error:
         vi.speak(f"Error: {error}: Failed to open {search_query}")
 
@@ -114,7 +121,9 @@ def __open_application_website_darwin(vi: VoiceInterface, search_query: str) ->
 
 
 def __open_application_website_posix(vi: VoiceInterface, search_query: str) -> None:
-    """handle the opening of application/website for POSIX OS
+    """handle the opening of application/website for POSIX OS.
+    Installed applications are found in the ApplicationIndex. Websites and names matching no
+    application closely enough go to xdg-open.
 
     Args:
         vi (VoiceInterface): VoiceInterface instance used to speak.
@@ -123,10 +132,26 @@ def __open_application_website_posix(vi: VoiceInterface, search_query: str) -> N
     Raises:
         ValueError: Throws exception in case neither app nor web access-point is present.
     """
+    application = None
+    if OpenApplication.WEBSITE_PATTERN.search(search_query) is None:
+        application = ApplicationIndex.instance().lookup(search_query)
+    if application is not None:
+        try:
+            subprocess.Popen(  # pylint: disable=consider-using-with
+                application.command,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                start_new_session=True,  # keep running after the Assistant exits
+            )
+            return
+        except OSError as error:
+            print(f"Failed to launch {application.source}: {error}")
+
     try:
         subprocess.run(
             ["xdg-open", search_query], capture_output=True, check=True
-        )  # attempt to open website/application
+        )  # attempt to open website
     except CalledProcessError as error:
         vi.speak(
             f"Error: {error}: Failed to open {search_query}: error code {error.returncode}"
@@ -1,11 +1,28 @@
 import re
 
-import requests
-
+from geocode_store import GeocodeStore
+from http_client import HttpClient
+from ttl_cache import TTLCache
+from usage_history import UsageHistory
 from voice_interface import VoiceInterface
 
 
+class WeatherServiceError(Exception):
+    """Raised when a weather or geocoding API answers with an error instead of data"""
+
+
 class WeatherReporter:
+    # Seconds each of the two API requests may take, retries included
+    REQUEST_BUDGET = 8.0
+    # Open-Meteo refreshes current conditions every 15 minutes
+    FORECAST_TTL = 10 * 60
+    # Decimal places the coordinates are rounded to when caching forecasts (about 1 km)
+    COORDINATE_PRECISION = 2
+    # Number of frequently asked cities kept warm by the prefetch scheduler
+    PREFETCHED_CITIES = 3
+
+    geocodes = GeocodeStore()
+    forecasts = TTLCache(FORECAST_TTL, max_entries=64)
 
     @staticmethod
     def command_name() -> str:
@@ -21,31 +38,119 @@ class WeatherReporter:
         cities = re.findall(r"\b(?:of|in|at)\s+(\w+)", query)
         weather_reporter(vi, cities[0])
 
+    @staticmethod
+    def prefetch() -> float:
+        """Refreshes the forecasts of the cities asked about most often"""
+        for city_name in UsageHistory.instance().frequent(
+            WeatherReporter.command_name(), WeatherReporter.PREFETCHED_CITIES
+        ):
+            try:
+                coordinates = geocode(city_name)
+                if coordinates is not None:
+                    current_weather(*coordinates, refresh=True)
+            except WeatherServiceError as error:
+                print(f"Failed to prefetch the weather of {city_name}: {error}")
+        # run again shortly before the refreshed forecasts expire
+        return WeatherReporter.FORECAST_TTL * 0.9
+
+
+def geocode(city_name: str) -> tuple[float, float] | None:
+    """Returns the (latitude, longitude) of the city, looked up online only once per city
+
+    Raises:
+        WeatherServiceError: If the geocoding API answered with an error.
+    """
+    coordinates = WeatherReporter.geocodes.get(city_name)
+    if coordinates is not None:
+        return coordinates
 
-def weather_reporter(vi: VoiceInterface, city_name: str) -> None:
     # Fetch latitude and longitude for the given city to be used by open-metro api
     params = {
         "name": city_name,
     }
-    geo_codes = requests.get(
-        "https://api.api-ninjas.com/v1/city",
-        params=params,
-        headers={"origin": "https://www.api-ninjas.com"},
-        timeout=60,  # 60 second timeout
-    ).json()
+    geo_codes = (
+        HttpClient.instance()
+        .get(
+            "https://api.api-ninjas.com/v1/city",
+            params=params,
+            headers={"origin": "https://www.api-ninjas.com"},
+            budget=WeatherReporter.REQUEST_BUDGET,
+        )
+        .json()
+    )
+    # api-ninjas answers errors, e.g. an exhausted quota, with an object instead of a list
+    if not isinstance(geo_codes, list):
+        reason = geo_codes.get("error") if isinstance(geo_codes, dict) else geo_codes
+        raise WeatherServiceError(f"city lookup failed: {reason}")
+    if not geo_codes:
+        return None
+    coordinates = (geo_codes[0].get("latitude"), geo_codes[0].get("longitude"))
+    if not all(isinstance(value, (int, float)) for value in coordinates):
+        raise WeatherServiceError(
+            f"city lookup returned no coordinates for {city_name}"
+        )
+    WeatherReporter.geocodes.put(city_name, *coordinates)
+    return coordinates
+
+
+def current_weather(latitude: float, longitude: float, refresh: bool = False) -> dict:
+    """Returns the Open-Meteo forecast response, shared by nearby coordinates for a few minutes.
+    With refresh the forecast is downloaded even if a cached one is still valid.
+
+    Raises:
+        WeatherServiceError: If the forecast API answered with an error.
+    """
+    key = (
+        round(latitude, WeatherReporter.COORDINATE_PRECISION),
+        round(longitude, WeatherReporter.COORDINATE_PRECISION),
+    )
+    weather_data_response = None if refresh else WeatherReporter.forecasts.get(key)
+    if weather_data_response is not None:
+        return weather_data_response
 
     query_params = {
-        "latitude": geo_codes[0].get("latitude"),
-        "longitude": geo_codes[0].get("longitude"),
+        "latitude": key[0],
+        "longitude": key[1],
         "current": "temperature_2m,relative_humidity_2m,apparent_temperature,rain,showers,cloud_cover,wind_speed_10m",
         "forecast_days": 1,
     }
 
     # Fetch weather data from Open-Meteo using the obtained coordinates.
-    # Time out after 60 seeconds of no response
-    weather_data_response = requests.get(
-        "https://api.open-meteo.com/v1/forecast", params=query_params, timeout=60
-    ).json()
+    weather_data_response = (
+        HttpClient.instance()
+        .get(
+            "https://api.open-meteo.com/v1/forecast",
+            params=query_params,
+            budget=WeatherReporter.REQUEST_BUDGET,
+        )
+        .json()
+    )
+    if not isinstance(weather_data_response, dict) or not isinstance(
+        weather_data_response.get("current"), dict
+    ):
+        reason = (
+            weather_data_response.get("reason")
+            if isinstance(weather_data_response, dict)
+            else weather_data_response
+        )
+        raise WeatherServiceError(f"forecast failed: {reason}")
+    WeatherReporter.forecasts.put(key, weather_data_response)
+    return weather_data_response
+
+
+def weather_reporter(vi: VoiceInterface, city_name: str) -> None:
+    try:
+        coordinates = geocode(city_name)
+        if coordinates is None:
+            vi.speak(f"Could not find a city named {city_name}.")
+            return
+        # only cities which exist are worth prefetching
+        UsageHistory.instance().record(WeatherReporter.command_name(), city_name)
+        weather_data_response = current_weather(*coordinates)
+    except WeatherServiceError as error:
+        print(error)
+        vi.speak(f"Sorry, I could not get the weather of {city_name} right now.")
+        return
 
     data = weather_data_response.get("current")
     unit = weather_data_response.get("current_units")
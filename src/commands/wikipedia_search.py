@@ -1,11 +1,31 @@
+import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
 import wikipedia
 
+from disk_cache import DiskCache
+from http_client import route_through
+from usage_history import UsageHistory
 from voice_interface import VoiceInterface
 
+# Let the wikipedia library reuse the pooled connections of the shared HTTP client
+route_through(wikipedia.wikipedia)
+
 
 class WikipediaSearch:
 
     sentence_count = 3
+    # Number of frequently searched topics kept warm by the prefetch scheduler
+    PREFETCHED_TOPICS = 5
+    # Number of disambiguation options read out, and fetched ahead of the follow-up query
+    SPOKEN_OPTIONS = 6
+
+    summaries = DiskCache("wikipedia", ttl=7 * 24 * 60 * 60)
+    # Summaries being downloaded in the background, by cache key
+    pending = dict[str, Future]()
+    pending_lock = threading.Lock()
+    pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="wikipedia")
 
     @staticmethod
     def command_name() -> str:
@@ -20,19 +40,78 @@ class WikipediaSearch:
         search_query = query.replace("wikipedia", "", 1).replace("search", "", 1)
         try:
             vi.speak("Searching Wikipedia...")
-            results = wikipedia.summary(
-                search_query, sentences=WikipediaSearch.sentence_count
-            )
+            results = summary(search_query)
+            UsageHistory.instance().record(WikipediaSearch.command_name(), search_query)
 
             vi.speak("According to wikipedia...")
             vi.speak(results)
         except wikipedia.DisambiguationError as de:
+            # fetch the options while they are read out, so picking one answers at once
+            prefetch_options(de.options[: WikipediaSearch.SPOKEN_OPTIONS])
             vi.speak(f"\n{de.__class__.__name__}")
-            options = str(de).split("\n")
-            if len(options) < 7:
-                for option in options:
-                    vi.speak(option)
-            else:
-                for option in options[0:6]:
-                    vi.speak(option)
+            for option in de.options[: WikipediaSearch.SPOKEN_OPTIONS]:
+                vi.speak(option)
+            if len(de.options) > WikipediaSearch.SPOKEN_OPTIONS:
                 vi.speak("... and more")
+
+    @staticmethod
+    def prefetch() -> None:
+        """Refreshes the summaries of the topics searched most often"""
+        for topic in UsageHistory.instance().frequent(
+            WikipediaSearch.command_name(), WikipediaSearch.PREFETCHED_TOPICS
+        ):
+            try:
+                summary(topic, refresh=True)
+            except wikipedia.WikipediaException as error:
+                print(f"Failed to prefetch {topic}: {error}")
+
+
+def cache_key(title: str) -> str:
+    """Returns the cache key of a title, ignoring case, punctuation and spacing, so
+    the spoken option "mercury planet" finds the prefetched "Mercury (planet)" """
+    words = re.sub(r"[^\w\s]", " ", title.lower()).split()
+    return f"{' '.join(words)}|{WikipediaSearch.sentence_count}"
+
+
+def summary(search_query: str, refresh: bool = False) -> str:
+    """Returns the wikipedia summary of the topic, from the cache unless refresh is set.
+    A summary still being prefetched is awaited instead of requested a second time."""
+    key = cache_key(search_query)
+    if not refresh:
+        results = WikipediaSearch.summaries.get(key)
+        if results is not None:
+            return results
+        with WikipediaSearch.pending_lock:
+            pending = WikipediaSearch.pending.get(key)
+        if pending is not None and pending.exception() is None:
+            return pending.result()
+
+    results = wikipedia.summary(search_query, sentences=WikipediaSearch.sentence_count)
+    WikipediaSearch.summaries.put(key, results)
+    return results
+
+
+def prefetch_options(titles: list[str]) -> None:
+    """Downloads the summaries of the exact page titles concurrently in the background"""
+
+    def fetch(title: str, key: str) -> str:
+        results = wikipedia.summary(
+            title, sentences=WikipediaSearch.sentence_count, auto_suggest=False
+        )
+        WikipediaSearch.summaries.put(key, results)
+        return results
+
+    def done(key: str) -> None:
+        with WikipediaSearch.pending_lock:
+            WikipediaSearch.pending.pop(key, None)
+
+    for title in titles:
+        key = cache_key(title)
+        if WikipediaSearch.summaries.get(key) is not None:
+            continue
+        with WikipediaSearch.pending_lock:
+            if key in WikipediaSearch.pending:
+                continue
+            future = WikipediaSearch.pool.submit(fetch, title, key)
+            WikipediaSearch.pending[key] = future
+        future.add_done_callback(lambda _, key=key: done(key))
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Disk Cache
+===============
+
+This module contains the DiskCache class, a two level cache of JSON serializable answers:
+an in-memory LRU in front of one file per entry on disk, so answers survive restarts while
+repeated lookups within a run never touch the disk.
+
+"""
+
+import hashlib
+import json
+import os
+import time
+
+from infra import write_json_atomically
+from ttl_cache import TTLCache
+from user_dirs import user_cache_dir
+
+
+class DiskCache:
+    """
+    Persistent LRU cache with expiry. Like the SpeechCache, the modification time of a file
+    marks its last use, and the least recently used files are deleted beyond max_entries.
+    Nothing is created on disk until an entry is first read or written.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str,
+        ttl: float,
+        max_entries: int = 1024,
+        memory_entries: int = 128,
+    ) -> None:
+        """
+        Args:
+            cache_dir (str): directory holding the entries, a relative one is taken below
+                            the user cache directory.
+            ttl (float): seconds an entry stays valid after it was stored.
+            max_entries (int, optional): entries kept on disk. Defaults to 1024.
+            memory_entries (int, optional): entries also kept in memory. Defaults to 128.
+        """
+        self.__cache_dir = cache_dir
+        self.__created = False
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.__memory = TTLCache(ttl, memory_entries)
+
+    @property
+    def cache_dir(self) -> str:
+        """The directory holding the entries, created on first access"""
+        if not self.__created:
+            if os.path.isabs(self.__cache_dir):
+                os.makedirs(self.__cache_dir, exist_ok=True)
+            else:
+                self.__cache_dir = user_cache_dir(self.__cache_dir)
+            self.__created = True
+        return self.__cache_dir
+
+    def __path(self, key: str) -> str:
+        digest = hashlib.sha1(key.encode("UTF-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.json")
+
+    def get(self, key: str):
+        """Returns the value stored under the key, None if it is missing or expired"""
+        value = self.__memory.get(key)
+        if value is not None:
+            return value
+
+        path = self.__path(key)
+        try:
+            with open(path, "r", encoding="UTF-8") as entry_file:
+                entry = json.load(entry_file)
+            age = time.time() - entry["stored_at"]
+            if age >= self.ttl:
+                os.remove(path)
+                return None
+            os.utime(path)
+        except (OSError, ValueError, KeyError):
+            return None
+        self.__memory.put(key, entry["value"], self.ttl - age)
+        return entry["value"]
+
+    def put(self, key: str, value) -> None:
+        """Stores the value under the key in memory and on disk"""
+        self.__memory.put(key, value)
+        path = self.__path(key)
+        try:
+            write_json_atomically(path, {"stored_at": time.time(), "value": value})
+        except OSError as error:
+            print(f"Failed to write cache entry: {error}")
+            return
+        self.evict(keep=path)
+
+    def evict(self, keep: str | None = None) -> None:
+        """Deletes the least recently used files beyond max_entries
+
+        Args:
+            keep (str | None, optional): path of a file which must not be evicted.
+        """
+        with os.scandir(self.cache_dir) as files:
+            entries = [
+                (entry.stat().st_mtime, entry.path)
+                for entry in files
+                if entry.is_file()
+                and entry.name.endswith(".json")
+                and entry.path != keep
+            ]
+        for _, path in sorted(entries)[: max(0, len(entries) + 1 - self.max_entries)]:
+            try:
+                os.remove(path)
+            except OSError:
+                continue
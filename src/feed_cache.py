@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Feed Cache
+===============
+
+This module contains the FeedCache class which keeps the headlines of the news feeds on disk
+together with the ETag and Last-Modified validators of the response they were parsed from,
+so feeds can be revalidated with conditional requests and served without a download.
+
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import NamedTuple
+
+from infra import write_json_atomically
+from user_dirs import user_cache_dir
+
+
+class FeedState(NamedTuple):
+    """Headlines of a feed as of its last download, with the validators of that response"""
+
+    url: str
+    headlines: list[str]
+    etag: str | None = None
+    modified: str | None = None
+    fetched_at: float = 0.0  # time.time() of the last download or revalidation
+
+
+class FeedCache:
+    """
+    Disk backed store of one FeedState per feed URL, mirrored in memory. A state younger
+    than the freshness window is served as is; older ones are revalidated by the caller.
+    The directory is created on first use, so creating a cache touches neither disk nor
+    directories.
+    """
+
+    def __init__(self, cache_dir: str | None = None, freshness: float = 600.0) -> None:
+        """
+        Args:
+            cache_dir (str | None, optional): directory of the feed files.
+                            Defaults to the "news" directory in the user cache directory.
+            freshness (float, optional): seconds a feed is served without revalidation. Defaults to 600.
+        """
+        self.__cache_dir = cache_dir
+        self.__created = False
+        self.freshness = freshness
+        self.__states = dict[str, FeedState]()
+        self.__lock = threading.Lock()
+
+    @property
+    def cache_dir(self) -> str:
+        """The directory of the feed files, created on first access"""
+        if not self.__created:
+            if self.__cache_dir is None:
+                self.__cache_dir = user_cache_dir("news")
+            else:
+                os.makedirs(self.__cache_dir, exist_ok=True)
+            self.__created = True
+        return self.__cache_dir
+
+    def __path(self, url: str) -> str:
+        return os.path.join(
+            self.cache_dir, hashlib.sha1(url.encode("UTF-8")).hexdigest() + ".json"
+        )
+
+    def load(self, url: str) -> FeedState | None:
+        """Returns the cached state of the feed, None if it was never downloaded"""
+        with self.__lock:
+            state = self.__states.get(url)
+        if state is not None:
+            return state
+        try:
+            with open(self.__path(url), "r", encoding="UTF-8") as feed_file:
+                state = FeedState(**json.load(feed_file))
+        except (OSError, ValueError, TypeError):
+            return None
+        with self.__lock:
+            self.__states.setdefault(url, state)
+        return state
+
+    def store(self, state: FeedState) -> None:
+        """Remembers the state of the feed and writes it to disk"""
+        with self.__lock:
+            self.__states[state.url] = state
+        try:
+            write_json_atomically(self.__path(state.url), state._asdict())
+        except OSError as error:
+            print(f"Failed to cache feed {state.url}: {error}")
+
+    def is_fresh(self, state: FeedState, max_age: float | None = None) -> bool:
+        """Returns True if the state is younger than max_age (defaults to the freshness window)"""
+        max_age = self.freshness if max_age is None else max_age
+        return time.time() - state.fetched_at < max_age
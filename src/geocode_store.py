@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Geocode Store
+===============
+
+This module contains the GeocodeStore class which persists the coordinates of the cities the
+Assistant was asked about in a SQLite database, since they never change and looking them up
+costs a network round trip.
+
+"""
+
+import os
+import sqlite3
+import threading
+
+from user_dirs import user_cache_dir
+
+GEOCODE_FILE = "geocodes.sqlite3"
+
+
+class GeocodeStore:
+    """
+    Persistent mapping from a normalized city name to its (latitude, longitude). The
+    database is opened on first use, so creating a store touches neither disk nor directories.
+    """
+
+    def __init__(self, path: str | None = None) -> None:
+        """
+        Args:
+            path (str | None, optional): SQLite database file.
+                            Defaults to geocodes.sqlite3 in the user cache directory.
+        """
+        self.__path = path
+        self.__lock = threading.Lock()
+        self.__connection = None
+
+    @property
+    def path(self) -> str:
+        """The SQLite database file"""
+        if self.__path is None:
+            self.__path = os.path.join(user_cache_dir("weather"), GEOCODE_FILE)
+        return self.__path
+
+    def __connect(self) -> sqlite3.Connection:
+        """Returns the database connection, opening it on first use (lock must be held)"""
+        if self.__connection is None:
+            connection = sqlite3.connect(self.path, check_same_thread=False)
+            with connection:
+                connection.execute(
+                    "CREATE TABLE IF NOT EXISTS geocodes ("
+                    "city TEXT PRIMARY KEY, latitude REAL NOT NULL, longitude REAL NOT NULL)"
+                )
+            self.__connection = connection
+        return self.__connection
+
+    @staticmethod
+    def normalize(city: str) -> str:
+        """Returns the key of a city name, independent of case and surrounding whitespace"""
+        return " ".join(city.lower().split())
+
+    def get(self, city: str) -> tuple[float, float] | None:
+        """Returns the stored (latitude, longitude) of the city, None if it is unknown"""
+        with self.__lock:
+            row = (
+                self.__connect()
+                .execute(
+                    "SELECT latitude, longitude FROM geocodes WHERE city = ?",
+                    (self.normalize(city),),
+                )
+                .fetchone()
+            )
+        return None if row is None else (row[0], row[1])
+
+    def put(self, city: str, latitude: float, longitude: float) -> None:
+        """Stores the coordinates of the city"""
+        with self.__lock:
+            connection = self.__connect()
+            with connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO geocodes (city, latitude, longitude) VALUES (?, ?, ?)",
+                    (self.normalize(city), latitude, longitude),
+                )
+
+    def close(self) -> None:
+        """Closes the database connection"""
+        with self.__lock:
+            if self.__connection is not None:
+                self.__connection.close()
+                self.__connection = None
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HTTP Client
+===============
+
+This module contains the HttpClient class, the single process-wide HTTP transport of the
+network-backed commands. It keeps connections alive in a pool per host, caches DNS answers,
+retries transient failures with exponential backoff and enforces a latency budget on every
+request, so repeated queries skip the TCP/TLS setup and a slow server cannot stall a turn.
+
+"""
+
+import socket
+import threading
+import time
+from types import ModuleType
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from telemetry import TRACER
+
+# Responses worth another attempt, everything else is returned to the caller as is
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class BudgetExceeded(requests.Timeout):
+    """Raised when a request (including its retries) did not finish within its latency budget"""
+
+
+class DnsCache:
+    """
+    Time and size bounded cache of host addresses for the connections of an HttpClient.
+    Pooled connections rarely resolve, but every new connection (and every retry on a
+    dropped one) would otherwise pay for a lookup.
+    """
+
+    def __init__(self, ttl: float = 300.0, max_entries: int = 128) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.__entries = dict[tuple[str, int], tuple[float, str]]()
+        self.__lock = threading.Lock()
+
+    def resolve(self, host: str, port: int) -> str:
+        """Returns the address to connect to for host, answered from the cache while fresh"""
+        key = (host, port)
+        now = time.monotonic()
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is not None and entry[0] > now:
+                return entry[1]
+        address = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)[0][4][0]
+        with self.__lock:
+            self.__entries.pop(key, None)
+            for stale, (expires, _) in list(self.__entries.items()):
+                if expires <= now:
+                    del self.__entries[stale]
+            while len(self.__entries) >= self.max_entries:
+                # entries are kept in insertion order, the oldest goes first
+                del self.__entries[next(iter(self.__entries))]
+            self.__entries[key] = (now + self.ttl, address)
+        return address
+
+    def forget(self, host: str, port: int) -> None:
+        """Drops the cached address of host, e.g. after connecting to it failed"""
+        with self.__lock:
+            self.__entries.pop((host, port), None)
+
+    def clear(self) -> None:
+        """Forgets every cached answer"""
+        with self.__lock:
+            self.__entries.clear()
+
+
+def __resolving_pool__(pool_class: type, dns_cache: DnsCache) -> type:
+    """Subclass of a urllib3 connection pool whose new connections resolve through dns_cache"""
+
+    class ResolvingConnection(pool_class.ConnectionCls):
+        """Connection dialling the cached address, TLS still verifies the original host"""
+
+        # pylint: disable=access-member-before-definition,attribute-defined-outside-init
+        def _new_conn(self):
+            host = self._dns_host
+            self._dns_host = dns_cache.resolve(host, self.port)
+            try:
+                return super()._new_conn()
+            except Exception:
+                dns_cache.forget(host, self.port)
+                raise
+            finally:
+                self._dns_host = host
+
+    return type(
+        pool_class.__name__, (pool_class,), {"ConnectionCls": ResolvingConnection}
+    )
+
+
+class DnsCachingAdapter(HTTPAdapter):
+    """HTTPAdapter whose connection pools look their hosts up in a DnsCache"""
+
+    def __init__(self, dns_cache: DnsCache, **kwargs) -> None:
+        self.dns_cache = dns_cache
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            scheme: __resolving_pool__(pool_class, self.dns_cache)
+            for scheme, pool_class in self.poolmanager.pool_classes_by_scheme.items()
+        }
+
+
+class HttpClient:
+    """
+    Shared requests.Session with keep-alive connection pools per host, bounded retries
+    with exponential backoff and a latency budget per request. The signature of get
+    matches requests.get, so libraries calling requests can be routed through it.
+    """
+
+    __instance = None
+    __instance_lock = threading.Lock()
+
+    def __init__(
+        self,
+        pool_hosts: int = 16,
+        connections_per_host: int = 4,
+        retries: int = 2,
+        backoff: float = 0.25,
+        budget: float = 10.0,
+        connect_timeout: float = 3.0,
+        dns_cache: DnsCache | None = None,
+    ) -> None:
+        """
+        Args:
+            pool_hosts (int, optional): hosts whose connection pools are kept alive. Defaults to 16.
+            connections_per_host (int, optional): idle connections kept per host. Defaults to 4.
+            retries (int, optional): extra attempts after a transient failure. Defaults to 2.
+            backoff (float, optional): seconds before the first retry, doubled after each. Defaults to 0.25.
+            budget (float, optional): default seconds a request may take, retries included. Defaults to 10.
+            connect_timeout (float, optional): maximum seconds to establish a connection. Defaults to 3.
+            dns_cache (DnsCache | None, optional): resolver cache of the connections of the client.
+                            Defaults to a DnsCache with a 5 minute TTL.
+        """
+        self.retries = retries
+        self.backoff = backoff
+        self.budget = budget
+        self.connect_timeout = connect_timeout
+        self.dns_cache = dns_cache or DnsCache()
+
+        self.session = requests.Session()
+        adapter = DnsCachingAdapter(
+            self.dns_cache,
+            pool_connections=pool_hosts,
+            pool_maxsize=connections_per_host,
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    @staticmethod
+    def instance() -> "HttpClient":
+        """Returns the HttpClient shared by the whole process"""
+        with HttpClient.__instance_lock:
+            if HttpClient.__instance is None:
+                HttpClient.__instance = HttpClient()
+            return HttpClient.__instance
+
+    def get(self, url: str, params=None, **kwargs) -> requests.Response:
+        """Sends a GET request, see request"""
+        return self.request("GET", url, params=params, **kwargs)
+
+    def request(
+        self, method: str, url: str, budget: float | None = None, **kwargs
+    ) -> requests.Response:
+        """
+        Sends a request over the pooled connections, retrying connection errors, timeouts
+        and the statuses in RETRY_STATUSES while the latency budget allows it.
+
+        Args:
+            method (str): HTTP method.
+            url (str): URL to request.
+            budget (float | None, optional): seconds the request may take, retries included.
+                            Defaults to the budget of the client.
+            kwargs: passed on to requests.Session.request; a timeout caps every attempt.
+
+        Raises:
+            BudgetExceeded: If no attempt finished within the budget.
+            requests.RequestException: If the last attempt failed.
+
+        Returns:
+            requests.Response: the response of the last attempt.
+        """
+        budget = self.budget if budget is None else budget
+        attempt_cap = kwargs.pop("timeout", None)
+        if isinstance(attempt_cap, tuple):
+            attempt_cap = attempt_cap[-1]
+        deadline = time.monotonic() + budget
+
+        with TRACER.span("http", host=urlsplit(url).hostname) as span:
+            attempt = 0
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise BudgetExceeded(f"{method} {url} exceeded {budget}s budget")
+                read_timeout = min(remaining, attempt_cap or remaining)
+                timeout = (min(self.connect_timeout, read_timeout), read_timeout)
+                try:
+                    response = self.session.request(
+                        method, url, timeout=timeout, **kwargs
+                    )
+                except (requests.ConnectionError, requests.Timeout):
+                    if not self.__backoff(attempt, deadline):
+                        raise
+                else:
+                    span.set("status", response.status_code)
+                    if (
+                        response.status_code not in RETRY_STATUSES
+                        or not self.__backoff(attempt, deadline)
+                    ):
+                        span.set("attempts", attempt + 1)
+                        return response
+                attempt += 1
+
+    def __backoff(self, attempt: int, deadline: float) -> bool:
+        """Sleeps before the next attempt, returns False if no attempt is left or fits the budget"""
+        delay = self.backoff * 2**attempt
+        if attempt >= self.retries or time.monotonic() + delay >= deadline:
+            return False
+        time.sleep(delay)
+        return True
+
+
+class RoutedRequests:
+    """Stand-in for the requests module whose get goes through an HttpClient"""
+
+    def __init__(self, client: HttpClient) -> None:
+        self.get = client.get
+
+    def __getattr__(self, name: str):
+        return getattr(requests, name)
+
+
+def route_through(module: ModuleType, client: HttpClient | None = None) -> None:
+    """
+    Makes a library which calls requests.get (via "import requests" or "from requests
+    import get") send its requests through the shared client instead of a new connection.
+
+    Args:
+        module (ModuleType): the library module doing the requests.
+        client (HttpClient | None, optional): client to use. Defaults to the shared instance.
+    """
+    client = client or HttpClient.instance()
+    if getattr(module, "requests", None) is requests:
+        module.requests = RoutedRequests(client)
+    if getattr(module, "get", None) is requests.get:
+        module.get = client.get
@@ -8,11 +8,17 @@ This module contains implementations for various support functions and features
 
 """
 
+import contextlib
+import importlib.util
 import json
 import os
 import sys
+import tempfile
+from types import ModuleType
+from typing import TYPE_CHECKING
 
-from voice_interface import VoiceInterface
+if TYPE_CHECKING:  # the voice layer imports infra, so only import it for annotations
+    from voice_interface import VoiceInterface
 
 __CONFIG_DIR = os.path.join(os.path.abspath(__file__), "config")
 
@@ -37,6 +43,76 @@ def system_os() -> str:
     return sys.platform
 
 
+def lazy_import(module_name: str) -> ModuleType:
+    """Returns a module whose code only executes on first attribute access
+
+    Args:
+        module_name (str): dotted name of the module to import
+
+    Raises:
+        ModuleNotFoundError: If the module cannot be located
+
+    Returns:
+        ModuleType: the lazily loaded module
+    """
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+
+    spec = importlib.util.find_spec(module_name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named '{module_name}'", name=module_name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    loader.exec_module(module)
+    return module
+
+
+def write_atomically(path: str, content: str) -> None:
+    """Replaces the file with the content in one step, so readers never see a partial file.
+    Every call writes its own temporary file next to it, so concurrent writers of the same
+    file cannot mix their contents: the last one to finish wins.
+
+    Args:
+        path (str): file to replace
+        content (str): text written to the file
+
+    Raises:
+        OSError: If the file cannot be written
+    """
+    temp_file = tempfile.NamedTemporaryFile(  # pylint: disable=consider-using-with
+        "w",
+        encoding="UTF-8",
+        dir=os.path.dirname(os.path.abspath(path)),
+        prefix=f"{os.path.basename(path)}.",
+        suffix=".tmp",
+        delete=False,
+    )
+    try:
+        with temp_file:
+            temp_file.write(content)
+        os.replace(temp_file.name, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(temp_file.name)
+        raise
+
+
+def write_json_atomically(path: str, document, **kwargs) -> None:
+    """Replaces the file with the document serialized as JSON (see write_atomically)
+
+    Args:
+        path (str): file to replace
+        document: JSON serializable object
+        kwargs: keyword arguments of json.dumps, e.g. indent
+
+    Raises:
+        OSError: If the file cannot be written
+    """
+    write_atomically(path, json.dumps(document, **kwargs))
+
+
 def clear_screen() -> None:
     """Clears the screen based on the operating system"""
     if is_windows():
@@ -45,7 +121,7 @@ def clear_screen() -> None:
         os.system("clear")
 
 
-def listen(vi: VoiceInterface) -> str:
+def listen(vi: "VoiceInterface") -> str:
     """Listens for microphone input and return string of the input
 
     Returns:
@@ -56,7 +132,7 @@ def listen(vi: VoiceInterface) -> str:
         print("User:")
         vi.speak(query)
     else:
-        vi.speak("Say that again please...")
+        vi.speak("Say that again please...", cache=True)
     return query
 
 
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Intent Index
+===============
+
+This module contains the IntentIndex class, a compiled keyword automaton used by the
+CommandRegistery to route a query to its command in a single pass over the query.
+
+"""
+
+from collections import deque
+
+# Endings a trigger may carry and still match, e.g. "emails" for the trigger "email"
+INFLECTIONS = ("s", "es", "d", "ed", "ing")
+
+
+class IntentIndex:
+    """
+    Aho-Corasick automaton over the trigger keywords of all registered commands.
+
+    Every keyword is tagged with the command it belongs to, an explicit priority and the
+    order in which the command was registered. Matching walks the query once and returns
+    the matched commands ordered by (priority desc, registration order asc), so routing
+    stays linear in the query length and precedence never depends on dictionary order.
+    """
+
+    def __init__(self) -> None:
+        self.__goto: list[dict[str, int]] = [{}]
+        self.__fail: list[int] = [0]
+        self.__output: list[list[tuple[str, int]]] = [[]]
+        self.__rank = dict[str, tuple[int, int]]()
+        self.__compiled = True
+
+    def add(self, command: str, triggers: tuple[str, ...], priority: int = 0) -> None:
+        """
+        Adds the trigger keywords of a command to the index.
+
+        Args:
+            command (str): name of the command the triggers resolve to.
+            triggers (tuple[str, ...]): keywords or phrases which select the command.
+            priority (int, optional): higher priority commands win when several match. Defaults to 0.
+        """
+        if command not in self.__rank:
+            self.__rank[command] = (-priority, len(self.__rank))
+        else:
+            self.__rank[command] = (-priority, self.__rank[command][1])
+
+        for trigger in triggers:
+            keyword = trigger.strip().lower()
+            if not keyword:
+                continue
+            state = 0
+            for char in keyword:
+                if char not in self.__goto[state]:
+                    self.__goto.append({})
+                    self.__fail.append(0)
+                    self.__output.append([])
+                    self.__goto[state][char] = len(self.__goto) - 1
+                state = self.__goto[state][char]
+            self.__output[state].append((command, len(keyword)))
+        self.__compiled = False
+
+    def __compile(self) -> None:
+        """Computes the failure links of the automaton (breadth first over the trie)."""
+        queue = deque[int]()
+        for state in self.__goto[0].values():
+            self.__fail[state] = 0
+            queue.append(state)
+
+        while queue:
+            current = queue.popleft()
+            for char, state in self.__goto[current].items():
+                queue.append(state)
+                fallback = self.__fail[current]
+                while fallback and char not in self.__goto[fallback]:
+                    fallback = self.__fail[fallback]
+                self.__fail[state] = self.__goto[fallback].get(char, 0)
+                if self.__fail[state] == state:
+                    self.__fail[state] = 0
+        self.__compiled = True
+
+    def match(self, query: str) -> list[str]:
+        """
+        Returns the commands whose triggers occur in the query as whole (possibly inflected)
+        words.
+
+        Args:
+            query (str): The query to route.
+
+        Returns:
+            list[str]: matched command names ordered by precedence, best first.
+        """
+        if not self.__compiled:
+            self.__compile()
+
+        text = query.lower()
+        matched = set[str]()
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in self.__goto[state]:
+                state = self.__fail[state]
+            state = self.__goto[state].get(char, 0)
+
+            suffix = state
+            while suffix:
+                for command, length in self.__output[suffix]:
+                    if command not in matched and __is_whole_word__(
+                        text, position - length + 1, position + 1
+                    ):
+                        matched.add(command)
+                suffix = self.__fail[suffix]
+
+        return sorted(matched, key=self.__rank.__getitem__)
+
+
+def __is_whole_word__(text: str, start: int, end: int) -> bool:
+    """
+    Returns True if text[start:end] starts a word and ends it, optionally followed by one
+    of the INFLECTIONS, so "send emails" matches "email" but "gmail" and "emailer" do not
+    """
+    if start > 0 and text[start - 1].isalnum():
+        return False
+    rest = end
+    while rest < len(text) and text[rest].isalnum():
+        rest += 1
+    return rest == end or text[end:rest] in INFLECTIONS
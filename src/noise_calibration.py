@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Noise Calibration
+===============
+
+This module contains the NoiseCalibrator class which measures the ambient noise floor of an
+input device once, persists it, and keeps adapting the recognizer energy threshold from the
+quiet frames seen by the capture thread, unless the threshold was pinned by turning off
+dynamic_energy_threshold on the recognizer.
+
+"""
+
+import json
+import os
+import time
+
+import speech_recognition as sr
+
+from infra import write_json_atomically
+from user_dirs import user_state_dir
+
+CALIBRATION_FILE = "calibration.json"
+
+
+class NoiseCalibrator:
+    """
+    Tracks the noise floor of one input device and derives the energy threshold from it.
+    All work happens in observe(), called by the capture thread for every frame, so
+    calibration never runs on the path of a listen() call.
+    """
+
+    def __init__(
+        self,
+        recognizer: sr.Recognizer,
+        device_name: str,
+        store_path: str | None = None,
+        ratio: float = 1.5,
+        damping: float = 0.15,
+        calibration_seconds: float = 1.0,
+        min_threshold: float = 50.0,
+        save_interval: float = 60.0,
+    ) -> None:
+        """
+        Args:
+            recognizer (sr.Recognizer): recognizer whose energy_threshold is adapted while
+                            its dynamic_energy_threshold is on.
+            device_name (str): name of the input device the calibration belongs to.
+            store_path (str | None, optional): json file holding the calibrations of all devices.
+            ratio (float, optional): threshold as a multiple of the noise floor. Defaults to 1.5.
+            damping (float, optional): fraction of the floor kept per second of new audio. Defaults to 0.15.
+            calibration_seconds (float, optional): audio measured for a first calibration. Defaults to 1.
+            min_threshold (float, optional): lowest threshold ever applied. Defaults to 50.
+            save_interval (float, optional): seconds between saves of the adapted floor. Defaults to 60.
+        """
+        self.recognizer = recognizer
+        self.device_name = device_name
+        self.store_path = store_path or os.path.join(user_state_dir(), CALIBRATION_FILE)
+        self.ratio = ratio
+        self.damping = damping
+        self.calibration_seconds = calibration_seconds
+        self.min_threshold = min_threshold
+        self.save_interval = save_interval
+
+        self.noise_floor = None
+        self.__samples = list[float]()
+        self.__measured_seconds = 0.0
+        self.__last_save = 0.0
+
+    @property
+    def calibrated(self) -> bool:
+        """True once a noise floor was loaded or measured for the device"""
+        return self.noise_floor is not None
+
+    def load(self) -> bool:
+        """Applies the persisted calibration of the device, returns False if there is none"""
+        try:
+            with open(self.store_path, "r", encoding="UTF-8") as store:
+                floor = json.load(store).get(self.device_name, {}).get("noise_floor")
+        except (OSError, ValueError):
+            return False
+        if floor is None:
+            return False
+        self.noise_floor = float(floor)
+        self.__apply()
+        return True
+
+    def recalibrate(self) -> None:
+        """Discards the current noise floor so the next quiet second is measured again"""
+        self.noise_floor = None
+        self.__samples.clear()
+        self.__measured_seconds = 0.0
+
+    def observe(self, energy: float, seconds: float) -> None:
+        """
+        Feeds the energy of one background noise frame (no user or assistant speech).
+
+        Args:
+            energy (float): RMS energy of the frame.
+            seconds (float): duration of the frame.
+        """
+        if self.noise_floor is None:
+            self.__samples.append(energy)
+            self.__measured_seconds += seconds
+            if self.__measured_seconds >= self.calibration_seconds:
+                self.noise_floor = sum(self.__samples) / len(self.__samples)
+                self.__samples.clear()
+                self.__apply()
+                self.save()
+            return
+
+        damping = self.damping**seconds
+        self.noise_floor = self.noise_floor * damping + energy * (1 - damping)
+        self.__apply()
+        if time.monotonic() - self.__last_save >= self.save_interval:
+            self.save()
+
+    def __apply(self) -> None:
+        if not self.recognizer.dynamic_energy_threshold:
+            return
+        self.recognizer.energy_threshold = max(
+            self.min_threshold, self.noise_floor * self.ratio
+        )
+
+    def save(self) -> None:
+        """Persists the noise floor of the device next to the calibrations of other devices"""
+        self.__last_save = time.monotonic()
+        try:
+            with open(self.store_path, "r", encoding="UTF-8") as store:
+                calibrations = json.load(store)
+        except (OSError, ValueError):
+            calibrations = {}
+        calibrations[self.device_name] = {
+            "noise_floor": self.noise_floor,
+            "updated": time.time(),
+        }
+
+        try:
+            write_json_atomically(self.store_path, calibrations, indent=4)
+        except OSError as error:
+            print(f"Failed to save noise calibration: {error}")
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Prefetch
+===============
+
+This module contains the PrefetchScheduler which refreshes the caches of network-backed
+commands on its own background thread, so the questions users ask every day are answered
+from warm caches instead of waiting for the network.
+
+"""
+
+import heapq
+import itertools
+import threading
+import time
+
+from dotenv import dotenv_values
+
+from telemetry import TRACER
+
+__ENV__ = dotenv_values(".env")
+
+
+class PrefetchScheduler:
+    """
+    Runs refresh jobs periodically on a single daemon thread. Jobs never run closer than
+    min_gap seconds to each other, so prefetching cannot flood the network, and a failing
+    job is retried with a doubling delay capped at its interval.
+    """
+
+    def __init__(self, interval: float = 1800.0, min_gap: float = 5.0) -> None:
+        """
+        Args:
+            interval (float, optional): default seconds between two runs of a job. Defaults to 30 minutes.
+            min_gap (float, optional): minimum seconds between two job runs. Defaults to 5.
+        """
+        self.interval = interval
+        self.min_gap = min_gap
+        self.__jobs = dict[str, tuple[callable, float]]()
+        self.__failures = dict[str, int]()
+        self.__queue = list[tuple[float, int, str]]()
+        self.__order = itertools.count()
+        self.__condition = threading.Condition()
+        self.__stopped = False
+        self.__thread = None
+
+    def add(
+        self,
+        name: str,
+        refresh: callable,
+        interval: float | None = None,
+        delay: float = 0.0,
+    ) -> None:
+        """
+        Schedules a refresh job.
+
+        Args:
+            name (str): unique name of the job, e.g. the command it warms up.
+            refresh (callable): function without arguments refreshing the cache. It may
+                            return the seconds until it wants to run again.
+            interval (float | None, optional): seconds between runs. Defaults to the scheduler interval.
+            delay (float, optional): seconds before the first run. Defaults to 0.
+        """
+        with self.__condition:
+            self.__jobs[name] = (refresh, interval or self.interval)
+            self.__push(name, time.monotonic() + delay)
+
+    def run_soon(self, name: str) -> None:
+        """Moves the next run of the job to now, subject to the rate limit"""
+        with self.__condition:
+            if name in self.__jobs:
+                self.__push(name, time.monotonic())
+
+    def __push(self, name: str, due: float) -> None:
+        """Queues a run of the job (condition must be held); superseded runs are skipped"""
+        heapq.heappush(self.__queue, (due, next(self.__order), name))
+        self.__condition.notify()
+
+    def start(self) -> None:
+        """Starts the scheduler thread, or resumes the one a timed out stop left running"""
+        with self.__condition:
+            if self.__thread is not None and not self.__stopped:
+                return
+            self.__stopped = False
+            # jobs whose next run was dropped by an earlier stop
+            queued = {entry[2] for entry in self.__queue}
+            for name in self.__jobs.keys() - queued:
+                self.__push(name, time.monotonic())
+            if self.__thread is not None:
+                return
+            self.__thread = threading.Thread(
+                target=self.__run, name="prefetch", daemon=True
+            )
+            self.__thread.start()
+
+    def stop(self, timeout: float | None = 5.0) -> None:
+        """
+        Stops the scheduler thread after the job running at the moment, if any. A thread
+        still running its job after the timeout exits on its own once the job is done.
+        """
+        with self.__condition:
+            self.__stopped = True
+            self.__condition.notify()
+            thread = self.__thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def __next_job(self) -> str | None:
+        """Blocks until a job is due and the rate limit allows running it, None once stopped"""
+        with self.__condition:
+            while not self.__stopped:
+                if not self.__queue:
+                    self.__condition.wait()
+                    continue
+                due, _, name = self.__queue[0]
+                now = time.monotonic()
+                if due > now:
+                    self.__condition.wait(due - now)
+                    continue
+                heapq.heappop(self.__queue)
+                # a job queued twice (run_soon) only runs for its earliest entry
+                self.__queue = [entry for entry in self.__queue if entry[2] != name]
+                heapq.heapify(self.__queue)
+                return name
+            # decided under the condition, so start() never counts on an exiting thread
+            self.__thread = None
+            return None
+
+    def __run(self) -> None:
+        last_run = 0.0
+        while True:
+            name = self.__next_job()
+            if name is None:
+                return
+            gap = last_run + self.min_gap - time.monotonic()
+            if gap > 0:
+                time.sleep(gap)
+            refresh, interval = self.__jobs[name]
+            last_run = time.monotonic()
+            try:
+                with TRACER.span("prefetch", command=name):
+                    wanted = refresh()
+            except Exception as error:  # pylint: disable=broad-exception-caught
+                failures = self.__failures.get(name, 0) + 1
+                self.__failures[name] = failures
+                print(f"Prefetching {name} failed: {error}")
+                retry_in = min(interval, self.min_gap * 2**failures)
+            else:
+                self.__failures.pop(name, None)
+                retry_in = interval if wanted is None else max(wanted, self.min_gap)
+            with self.__condition:
+                if not self.__stopped:
+                    self.__push(name, time.monotonic() + retry_in)
+
+
+def prefetch_scheduler_from_env() -> PrefetchScheduler | None:
+    """
+    Creates the scheduler configured in the .env file. PREFETCH_INTERVAL_MINUTES sets how
+    often caches are refreshed (0 disables prefetching) and PREFETCH_MIN_GAP_SECONDS the
+    minimum time between two refreshes.
+    """
+    interval = float(__ENV__.get("PREFETCH_INTERVAL_MINUTES") or 30) * 60
+    if interval <= 0:
+        return None
+    return PrefetchScheduler(
+        interval, float(__ENV__.get("PREFETCH_MIN_GAP_SECONDS") or 5)
+    )
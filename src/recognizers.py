@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Recognizers
+===============
+
+This module contains the speech recognition backends used by the VoiceInterface, a registry
+to create them by name and the RacingRecognizer which runs several backends on the same
+audio concurrently and answers with the first confident transcript.
+
+"""
+
+from abc import ABC, abstractmethod
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import NamedTuple
+
+import speech_recognition as sr
+from dotenv import dotenv_values
+
+__ENV__ = dotenv_values(".env")
+
+
+class RecognitionResult(NamedTuple):
+    """Transcript of an utterance as returned by a recognition backend"""
+
+    text: str
+    confidence: float
+    backend: str
+
+
+class RecognizerBackend(ABC):
+    """
+    Base class of the recognition backends.
+    recognize raises sr.UnknownValueError if the audio could not be understood
+    and sr.RequestError if the backend itself is unavailable.
+    """
+
+    name = "base"
+    # confidence at which a race accepts a transcript of this backend without waiting
+    # for the others, None for the threshold of the race
+    min_confidence: float | None = None
+
+    def __init__(self, recognizer: sr.Recognizer, language: str = "en-in") -> None:
+        self.recognizer = recognizer
+        self.language = language
+
+    @abstractmethod
+    def recognize(self, audio: sr.AudioData) -> RecognitionResult:
+        """Returns the transcript of the audio"""
+
+
+class GoogleBackend(RecognizerBackend):
+    """Google Web Speech API, the most accurate backend but a network round trip per utterance"""
+
+    name = "google"
+
+    def recognize(self, audio: sr.AudioData) -> RecognitionResult:
+        response = self.recognizer.recognize_google(
+            audio_data=audio, language=self.language, show_all=True
+        )
+        alternatives = response.get("alternative") if response else None
+        if not alternatives:
+            raise sr.UnknownValueError()
+        best = alternatives[0]
+        # Google only scores the best alternative when it is unsure of it
+        return RecognitionResult(
+            best["transcript"], best.get("confidence", 1.0), self.name
+        )
+
+
+class SphinxBackend(RecognizerBackend):
+    """
+    Offline CMU Sphinx recognizer (requires pocketsphinx). Less accurate than Google, but it
+    answers short commands without leaving the machine and keeps working when offline.
+    The confidence of a transcript is its posterior probability in the lattice of the
+    decoder, so a race answers with a transcript sphinx is sure of (SPHINX_MIN_CONFIDENCE)
+    as soon as it is ready, and waits for a network backend otherwise.
+    """
+
+    name = "sphinx"
+
+    def __init__(self, recognizer: sr.Recognizer, language: str = "en-US") -> None:
+        super().__init__(recognizer, language)
+        self.min_confidence = float(__ENV__.get("SPHINX_MIN_CONFIDENCE") or 0.5)
+
+    def recognize(self, audio: sr.AudioData) -> RecognitionResult:
+        decoder = self.recognizer.recognize_sphinx(
+            audio, language=self.language, show_all=True
+        )
+        hypothesis = decoder.hyp()
+        if hypothesis is None or not hypothesis.hypstr:
+            raise sr.UnknownValueError()
+        confidence = min(max(hypothesis.prob, 0.0), 1.0)
+        return RecognitionResult(hypothesis.hypstr, confidence, self.name)
+
+
+class ReplayBackend(RecognizerBackend):
+    """
+    Returns scripted transcripts in order instead of recognizing the audio, for tests and
+    benchmarks. Transcripts come from a list or a text file with one transcript per line;
+    empty lines stand for audio which could not be understood.
+    """
+
+    name = "replay"
+
+    def __init__(
+        self,
+        recognizer: sr.Recognizer | None = None,
+        language: str = "en-in",
+        transcripts: list[str] | None = None,
+        path: str | None = None,
+    ) -> None:
+        super().__init__(recognizer, language)
+        if path is not None:
+            with open(path, "r", encoding="UTF-8") as script:
+                transcripts = [line.rstrip("\n") for line in script]
+        self.__transcripts = list(transcripts or [])
+        self.__position = 0
+
+    def skip(self) -> None:
+        """Skips the next transcript, e.g. the one of a recording which was never captured"""
+        self.__position += 1
+
+    def recognize(self, audio: sr.AudioData) -> RecognitionResult:
+        if self.__position >= len(self.__transcripts):
+            raise sr.RequestError("replay script exhausted")
+        text = self.__transcripts[self.__position]
+        self.__position += 1
+        if not text:
+            raise sr.UnknownValueError()
+        return RecognitionResult(text, 1.0, self.name)
+
+
+BACKENDS = dict[str, type[RecognizerBackend]]()
+
+
+def register_backend(backend: type[RecognizerBackend]) -> None:
+    """Makes a backend class available to create_backend under its name"""
+    BACKENDS[backend.name] = backend
+
+
+def create_backend(name: str, recognizer: sr.Recognizer, **kwargs) -> RecognizerBackend:
+    """
+    Creates a registered backend.
+
+    Args:
+        name (str): name of the backend, e.g. "google", "sphinx" or "replay".
+        recognizer (sr.Recognizer): recognizer providing the recognize_* implementations.
+
+    Raises:
+        ValueError: If no backend is registered under the name.
+
+    Returns:
+        RecognizerBackend: the backend instance
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown recognizer backend: {name}")
+    return BACKENDS[name](recognizer, **kwargs)
+
+
+register_backend(GoogleBackend)
+register_backend(SphinxBackend)
+register_backend(ReplayBackend)
+
+
+class RacingRecognizer(RecognizerBackend):
+    """
+    Runs several backends on the same audio concurrently. The first transcript whose
+    confidence reaches the threshold of its backend (or of the race) wins; otherwise the
+    most confident one is returned once every backend has answered.
+    """
+
+    name = "race"
+
+    def __init__(
+        self,
+        backends: list[RecognizerBackend],
+        min_confidence: float = 0.8,
+        timeout: float | None = 10.0,
+    ) -> None:
+        """
+        Args:
+            backends (list[RecognizerBackend]): backends racing on every utterance.
+            min_confidence (float, optional): confidence accepted without waiting for the
+                            remaining backends, unless a backend has a threshold of its
+                            own. Defaults to 0.8.
+            timeout (float | None, optional): seconds to wait for the backends. Defaults to 10.
+        """
+        super().__init__(None)
+        self.backends = backends
+        self.min_confidence = min_confidence
+        self.timeout = timeout
+        self.__pool = ThreadPoolExecutor(
+            max_workers=len(backends), thread_name_prefix="recognizer"
+        )
+
+    def recognize(self, audio: sr.AudioData) -> RecognitionResult:
+        if len(self.backends) == 1:
+            return self.backends[0].recognize(audio)
+
+        thresholds = {}
+        for backend in self.backends:
+            future = self.__pool.submit(backend.recognize, audio)
+            thresholds[future] = (
+                self.min_confidence
+                if backend.min_confidence is None
+                else backend.min_confidence
+            )
+        pending = set(thresholds)
+        best = None
+        request_error = None
+        while pending:
+            done, pending = wait(pending, self.timeout, return_when=FIRST_COMPLETED)
+            if not done:  # timed out, answer with what we have
+                break
+            for future in done:
+                try:
+                    result = future.result()
+                except sr.RequestError as error:
+                    request_error = error
+                    continue
+                except sr.UnknownValueError:
+                    continue
+                if result.confidence >= thresholds[future]:
+                    return result
+                if best is None or result.confidence > best.confidence:
+                    best = result
+
+        if best is not None:
+            return best
+        if request_error is not None:
+            raise request_error
+        raise sr.UnknownValueError()
+
+
+def recognizer_from_env(recognizer: sr.Recognizer) -> RecognizerBackend:
+    """
+    Creates the recognizer configured in the .env file. RECOGNIZER_BACKENDS is a comma
+    separated list of backend names, raced when more than one is given, and
+    RECOGNIZER_MIN_CONFIDENCE is the confidence accepted from the fastest backend
+    (SPHINX_MIN_CONFIDENCE for the local sphinx backend).
+    """
+    names = [
+        name.strip()
+        for name in (__ENV__.get("RECOGNIZER_BACKENDS") or "google").split(",")
+        if name.strip()
+    ]
+    backends = [create_backend(name, recognizer) for name in names]
+    if len(backends) == 1:
+        return backends[0]
+    min_confidence = float(__ENV__.get("RECOGNIZER_MIN_CONFIDENCE") or 0.8)
+    return RacingRecognizer(backends, min_confidence=min_confidence)
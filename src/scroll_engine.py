@@ -0,0 +1,413 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Scroll Engine
+===============
+
+This module contains the ScrollEngine class which scrolls the active window step by step and
+detects when the end of the content is reached by comparing small fingerprints of a region
+of the window, sampled at a fixed rate instead of after every scroll click, and the
+ScrollController which drives the engine from one long-lived thread fed by a message queue.
+
+"""
+
+import queue
+import threading
+import time
+from typing import NamedTuple
+
+from dotenv import dotenv_values
+
+from infra import lazy_import
+
+# GUI automation modules are only needed while scrolling, so they are loaded on first use
+pag = lazy_import("pyautogui")
+pygetwindow = lazy_import("pygetwindow")
+ImageGrab = lazy_import("PIL.ImageGrab")
+
+__ENV__ = dotenv_values(".env")
+
+# Speed presets as (scroll clicks per second, screen samples per second). The sample rate
+# bounds the CPU spent on screenshots whatever the scroll speed is.
+SPEEDS = {
+    "slow": (4, 2.0),
+    "medium": (10, 4.0),
+    "fast": (25, 5.0),
+}
+# Fraction (left, top, right, bottom) of the active window compared between samples
+DEFAULT_REGION = (0.25, 0.25, 0.75, 0.75)
+
+
+class InputInjector:
+    """
+    Sends key and scroll events to the active window in batches. A batch is one pyautogui
+    call without its pause, so pressing a key a hundred times costs one call instead of a
+    hundred pauses. events_per_second is the rate at which batches are sized.
+    """
+
+    def __init__(self, events_per_second: float = 60.0) -> None:
+        self.events_per_second = events_per_second
+
+    def batch_size(self, seconds: float) -> int:
+        """Returns the number of events to send for a batch spanning the given seconds"""
+        return max(1, round(self.events_per_second * seconds))
+
+    @staticmethod
+    def press(key: str, presses: int) -> None:
+        """Presses the key the given number of times"""
+        pag.press(key, presses=presses, _pause=False)
+
+    @staticmethod
+    def scroll(direction: str, clicks: int) -> None:
+        """Sends one scroll event of the given clicks"""
+        if direction in ("up", "top"):
+            pag.scroll(clicks, _pause=False)
+        elif direction in ("down", "bottom"):
+            pag.scroll(-clicks, _pause=False)
+        elif direction == "left":
+            pag.hscroll(-clicks, _pause=False)
+        elif direction == "right":
+            pag.hscroll(clicks, _pause=False)
+        else:
+            raise ValueError(f"Unknown scroll direction: {direction}")
+
+
+class ScrollEngine:
+    """
+    Scrolls the active window in a direction one tick at a time. Every tick sends the
+    clicks due for it as one scroll event and fingerprints the sampled region, a tiny
+    grayscale thumbnail; the end is reached once the fingerprint stops changing.
+    """
+
+    def __init__(
+        self,
+        speed: str = "medium",
+        region: tuple[float, float, float, float] = DEFAULT_REGION,
+        thumbnail_size: int = 16,
+        still_samples: int = 2,
+        injector: InputInjector | None = None,
+    ) -> None:
+        """
+        Args:
+            speed (str, optional): one of the SPEEDS presets. Defaults to "medium".
+            region (tuple[float, float, float, float], optional): fractions (left, top, right,
+                            bottom) of the active window which are sampled. Defaults to the center.
+            thumbnail_size (int, optional): width and height of the fingerprint. Defaults to 16.
+            still_samples (int, optional): unchanged samples in a row which mean the end was
+                            reached. Defaults to 2.
+            injector (InputInjector | None, optional): sends the scroll events.
+                            Defaults to an InputInjector with the default rate.
+        """
+        self.speed = speed
+        self.region = region
+        self.thumbnail_size = thumbnail_size
+        self.still_samples = still_samples
+        self.injector = injector or InputInjector()
+        self.direction = None
+        self.__box = None
+        self.__fingerprint = None
+        self.__still = 0
+
+    @property
+    def speed(self) -> str:
+        """Name of the speed preset"""
+        return self.__speed
+
+    @speed.setter
+    def speed(self, speed: str) -> None:
+        if speed not in SPEEDS:
+            raise ValueError(f"Unknown scroll speed: {speed}")
+        self.__speed = speed
+
+    @property
+    def tick_seconds(self) -> float:
+        """Seconds between two ticks, i.e. between two samples of the screen"""
+        return 1.0 / SPEEDS[self.speed][1]
+
+    @property
+    def clicks_per_tick(self) -> int:
+        """Scroll clicks sent at every tick"""
+        clicks_per_second, samples_per_second = SPEEDS[self.speed]
+        return max(1, round(clicks_per_second / samples_per_second))
+
+    def window_box(self) -> tuple[int, int, int, int] | None:
+        """Returns the screen box of the sampled region of the active window, None without one"""
+        window = pygetwindow.getActiveWindow()
+        if not window or window.width <= 0 or window.height <= 0:
+            return None
+        left, top, right, bottom = self.region
+        return (
+            int(window.left + window.width * left),
+            int(window.top + window.height * top),
+            int(window.left + window.width * right),
+            int(window.top + window.height * bottom),
+        )
+
+    def fingerprint(self, box: tuple[int, int, int, int]) -> bytes:
+        """Returns a downsampled grayscale copy of the screen box, cheap to compare"""
+        size = (self.thumbnail_size, self.thumbnail_size)
+        return ImageGrab.grab(bbox=box).convert("L").resize(size).tobytes()
+
+    def begin(self, direction: str) -> bool:
+        """
+        Starts scrolling the active window in the direction.
+
+        Returns:
+            bool: False if there is no active window to scroll.
+        """
+        self.__box = self.window_box()
+        if self.__box is None:
+            return False
+        self.direction = direction
+        self.__fingerprint = self.fingerprint(self.__box)
+        self.__still = 0
+        self.injector.scroll(direction, self.clicks_per_tick)
+        return True
+
+    def step(self) -> bool:
+        """
+        Samples the window and scrolls again, to be called every tick_seconds after begin.
+
+        Returns:
+            bool: False once the content stopped moving, i.e. the end was reached.
+        """
+        current = self.fingerprint(self.__box)
+        if current == self.__fingerprint:
+            self.__still += 1
+            if self.__still >= self.still_samples:
+                return False
+        else:
+            self.__still = 0
+            self.__fingerprint = current
+        self.injector.scroll(self.direction, self.clicks_per_tick)
+        return True
+
+    def run(self, direction: str, stop_event: threading.Event) -> bool:
+        """
+        Scrolls until the end is reached or stop_event is set.
+
+        Returns:
+            bool: True if the end was reached.
+        """
+        if not self.begin(direction):
+            return False
+        next_tick = time.monotonic() + self.tick_seconds
+        while not stop_event.wait(max(0.0, next_tick - time.monotonic())):
+            if not self.step():
+                return True
+            next_tick += self.tick_seconds
+        return False
+
+
+class KeyBurst:
+    """
+    Presses a key a number of times in batches, one batch per tick of the engine. With
+    until_still the burst ends early once the sampled window region stops changing, e.g.
+    when "right" reached the end of the line.
+    """
+
+    def __init__(
+        self, engine: ScrollEngine, key: str, presses: int, until_still: bool = False
+    ) -> None:
+        """
+        Args:
+            engine (ScrollEngine): engine providing the tick rate, the window fingerprints
+                            and the input injector.
+            key (str): pyautogui name of the key to press.
+            presses (int): maximum number of presses.
+            until_still (bool, optional): stop once the window stops changing. Defaults to False.
+        """
+        self.engine = engine
+        self.direction = key
+        self.remaining = presses
+        self.until_still = until_still
+        self.__box = None
+        self.__fingerprint = None
+        self.__still = 0
+
+    @property
+    def tick_seconds(self) -> float:
+        """Seconds between two batches"""
+        return self.engine.tick_seconds
+
+    def begin(self) -> bool:
+        """Sends the first batch, returns False if there is nothing to press or no window"""
+        if self.until_still:
+            self.__box = self.engine.window_box()
+            if self.__box is None:
+                return False
+            self.__fingerprint = self.engine.fingerprint(self.__box)
+        elif not pygetwindow.getActiveWindow():
+            return False
+        return self.__send_batch()
+
+    def step(self) -> bool:
+        """Sends the next batch, returns False once the burst is over"""
+        if self.until_still:
+            current = self.engine.fingerprint(self.__box)
+            if current == self.__fingerprint:
+                self.__still += 1
+                if self.__still >= self.engine.still_samples:
+                    return False
+            else:
+                self.__still = 0
+                self.__fingerprint = current
+        return self.__send_batch()
+
+    def __send_batch(self) -> bool:
+        if self.remaining <= 0:
+            return False
+        presses = min(
+            self.remaining, self.engine.injector.batch_size(self.tick_seconds)
+        )
+        self.engine.injector.press(self.direction, presses)
+        self.remaining -= presses
+        return self.remaining > 0 or self.until_still
+
+
+def scroll_engine_from_env() -> ScrollEngine:
+    """
+    Creates the engine configured in the .env file. SCROLL_SPEED is one of the SPEEDS
+    presets, SCROLL_SAMPLE_REGION the sampled "left,top,right,bottom" window fractions and
+    SCROLL_KEY_RATE the key presses sent per second.
+    """
+    region = DEFAULT_REGION
+    if __ENV__.get("SCROLL_SAMPLE_REGION"):
+        region = tuple(
+            float(fraction) for fraction in __ENV__["SCROLL_SAMPLE_REGION"].split(",")
+        )
+    injector = InputInjector(float(__ENV__.get("SCROLL_KEY_RATE") or 60))
+    return ScrollEngine(
+        __ENV__.get("SCROLL_SPEED") or "medium", region, injector=injector
+    )
+
+
+class ScrollState(NamedTuple):
+    """What the ScrollController is doing"""
+
+    scrolling: bool
+    direction: str | None
+    speed: str
+
+
+class ScrollController:
+    """
+    Owns the ScrollEngine and the one thread driving it, which either scrolls or presses a
+    KeyBurst. Scroll commands are messages on a queue, so they return immediately, never
+    join a thread and never start a new one; a new command replaces the one in progress.
+    """
+
+    __instance = None
+    __instance_lock = threading.Lock()
+
+    def __init__(self, engine: ScrollEngine | None = None) -> None:
+        """
+        Args:
+            engine (ScrollEngine | None, optional): engine to drive.
+                            Defaults to the engine configured in the .env file.
+        """
+        self.engine = engine or scroll_engine_from_env()
+        self.__messages = queue.Queue()
+        self.__thread = None
+        self.__lock = threading.Lock()
+
+    @staticmethod
+    def instance() -> "ScrollController":
+        """Returns the ScrollController shared by the whole process"""
+        with ScrollController.__instance_lock:
+            if ScrollController.__instance is None:
+                ScrollController.__instance = ScrollController()
+            return ScrollController.__instance
+
+    def __send(self, *message) -> None:
+        with self.__lock:
+            if self.__thread is None or not self.__thread.is_alive():
+                self.__thread = threading.Thread(
+                    target=self.__run, name="scroll", daemon=True
+                )
+                self.__thread.start()
+        self.__messages.put(message)
+
+    def start(self, direction: str) -> None:
+        """Starts scrolling in the direction, or turns around if already scrolling"""
+        self.__send("start", direction)
+
+    def stop(self) -> None:
+        """Stops scrolling"""
+        self.__send("stop", None)
+
+    def set_speed(self, speed: str) -> None:
+        """Switches to a speed preset, or to the neighbouring one with "faster" or "slower"."""
+        self.__send("speed", speed)
+
+    def set_direction(self, direction: str) -> None:
+        """Changes the direction of the scrolling in progress"""
+        self.__send("direction", direction)
+
+    def press(self, key: str, presses: int, until_still: bool = False) -> None:
+        """Presses the key in batches, replacing any scrolling in progress (see KeyBurst)"""
+        self.__send("keys", (key, presses, until_still))
+
+    def state(self, timeout: float | None = 1.0) -> ScrollState | None:
+        """Returns the state after every message sent before, None if the thread is busy"""
+        reply = queue.Queue(maxsize=1)
+        self.__send("state", reply)
+        try:
+            return reply.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def __run(self) -> None:
+        job = None  # the engine while scrolling, or a KeyBurst
+        next_tick = 0.0
+        while True:
+            timeout = max(0.0, next_tick - time.monotonic()) if job else None
+            try:
+                kind, value = self.__messages.get(timeout=timeout)
+            except queue.Empty:
+                try:
+                    active = job.step()
+                except Exception as error:  # pylint: disable=broad-exception-caught
+                    print(f"Scrolling failed: {error}")
+                    active = False
+                if not active and job is self.engine:
+                    print(f"Reached to extreme, stopped scrolling {job.direction}.")
+                next_tick += job.tick_seconds
+                job = job if active else None
+                continue
+
+            try:
+                if kind == "start" or (kind == "direction" and job is self.engine):
+                    job = None
+                    if self.engine.begin(value):
+                        job = self.engine
+                elif kind == "keys":
+                    job = KeyBurst(self.engine, *value)
+                    job = job if job.begin() else None
+                elif kind == "stop":
+                    if job is not None:
+                        print(f"Stopped scrolling {job.direction}.")
+                    job = None
+                elif kind == "speed":
+                    self.engine.speed = __next_speed__(self.engine.speed, value)
+                elif kind == "state":
+                    direction = (job or self.engine).direction
+                    value.put(
+                        ScrollState(job is not None, direction, self.engine.speed)
+                    )
+                if job is not None and kind in ("start", "direction", "keys"):
+                    next_tick = time.monotonic() + job.tick_seconds
+            except Exception as error:  # pylint: disable=broad-exception-caught
+                print(f"Scroll command {kind} failed: {error}")
+                if kind in ("start", "direction", "keys"):
+                    job = None
+
+
+def __next_speed__(current: str, requested: str) -> str:
+    """Resolves "faster" and "slower" to the neighbouring preset of the current speed"""
+    presets = list(SPEEDS)
+    if requested == "faster":
+        return presets[min(presets.index(current) + 1, len(presets) - 1)]
+    if requested == "slower":
+        return presets[max(presets.index(current) - 1, 0)]
+    return requested
@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Speech Engine
+===============
+
+This module contains the SpeechEngine class, the single process-wide owner of the pyttsx3
+engine, the speech recognizer and the speech thread. VoiceInterface instances are
+lightweight facades over it, so creating one no longer initializes a new audio driver.
+
+"""
+
+import platform
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import pyttsx3
+import speech_recognition as sr
+from dotenv import dotenv_values
+
+from audio_capture import ContinuousCapture, device_name
+from noise_calibration import NoiseCalibrator
+from recognizers import RecognizerBackend, recognizer_from_env
+from telemetry import TRACER
+from tts_cache import SpeechCache, play_audio
+from wake_word import WakeWordGate, wake_word_gate_from_env
+
+__ENV__ = dotenv_values(".env")
+
+# Default settings of the recognizer, restored by SpeechEngine.reset
+RECOGNIZER_DEFAULTS = {
+    "energy_threshold": 150,
+    "pause_threshold": 1,
+    "phrase_threshold": 0.3,
+    "non_speaking_duration": 0.5,
+}
+# Seconds after speaking during which the microphone may still pick up the speakers
+ECHO_TAIL_SECONDS = 0.3
+# Seconds between two checks that the speech thread is still alive while waiting on it
+WAIT_POLL_SECONDS = 0.5
+
+
+def __get_driver_name__() -> str:
+    """Returns the driver name for the pyttsx3 engine based on operating system"""
+    os_name = platform.system()
+    if os_name == "Windows":
+        return "sapi5"
+    if os_name == "Darwin":  # macOS
+        return "nsss"
+    return "espeak"  # default for other systems
+
+
+def __default_voice__(voices: list) -> str | None:
+    """Returns the id of the voice whose id or name is TTS_VOICE, else of the first voice.
+    The voice is part of the speech cache key, so it must not change between runs."""
+    wanted = (__ENV__.get("TTS_VOICE") or "").strip().lower()
+    if wanted:
+        for candidate in voices:
+            if wanted in (str(candidate.id).lower(), str(candidate.name).lower()):
+                return candidate.id
+        print(f"Voice {wanted} not found, using the default voice")
+    return voices[0].id if voices else None
+
+
+class NullTTSEngine:
+    """Silent stand-in for the pyttsx3 engine"""
+
+    def __init__(self) -> None:
+        self.__properties = {"voice": "null", "rate": 200, "voices": []}
+
+    def getProperty(self, name: str):  # pylint: disable=invalid-name
+        """Returns an engine property"""
+        return self.__properties.get(name)
+
+    def setProperty(self, name: str, value) -> None:  # pylint: disable=invalid-name
+        """Sets an engine property"""
+        self.__properties[name] = value
+
+    def say(self, text: str) -> None:
+        """Discards the text"""
+
+    def save_to_file(self, text: str, path: str) -> None:
+        """Renders nothing, so every phrase falls back to say()"""
+
+    def runAndWait(self) -> None:  # pylint: disable=invalid-name
+        """Returns immediately"""
+
+
+class SpeechEngine:
+    """
+    Process-wide text-to-speech engine and speech recognizer, both created on first use.
+    Utterances are spoken by a single speech thread which owns all engine runs.
+    """
+
+    __instance = None
+    __instance_lock = threading.Lock()
+
+    def __init__(
+        self, speech_cache: SpeechCache | None = None, tts_engine=None
+    ) -> None:
+        """
+        Args:
+            speech_cache (SpeechCache | None, optional): cache of rendered phrases.
+                            Defaults to the cache configured in the .env file.
+            tts_engine (optional): object with the pyttsx3 Engine interface used instead of
+                            the platform driver, e.g. a silent stand-in for benchmarks.
+        """
+        self.driver_name = __get_driver_name__()
+        self.__speech_cache = speech_cache
+        self.__engine = tts_engine
+        self.__recognizer = None
+        self.__recognition_backend = None
+        self.__wake_gate = None
+        self.__wake_gate_loaded = False
+        self.__lock = threading.RLock()
+        self.__speech_queue = queue.Queue()
+        self.__speech_thread = None
+        self.__prerender_queue = deque[
+            str
+        ]()  # phrases rendered while nothing is spoken
+        self.__microphone = None
+        self.__spoken_at = 0.0  # time.monotonic() at which the last utterances ended
+        self.speaking = threading.Event()
+
+    @staticmethod
+    def instance() -> "SpeechEngine":
+        """Returns the SpeechEngine shared by the whole process"""
+        with SpeechEngine.__instance_lock:
+            if SpeechEngine.__instance is None:
+                SpeechEngine.__instance = SpeechEngine()
+            return SpeechEngine.__instance
+
+    def is_speaking(self) -> bool:
+        """Returns True while speaking and for ECHO_TAIL_SECONDS after it"""
+        return (
+            self.speaking.is_set()
+            or time.monotonic() - self.__spoken_at < ECHO_TAIL_SECONDS
+        )
+
+    @property
+    def engine(self) -> pyttsx3.Engine:
+        """The pyttsx3 engine, initialized with the configured voice on first access.
+        Only the speech thread may use it, other threads go through submit()."""
+        with self.__lock:
+            if self.__engine is None:
+                self.__engine = pyttsx3.init(self.driver_name)
+                voice_id = __default_voice__(self.__engine.getProperty("voices"))
+                if voice_id is not None:
+                    self.__engine.setProperty("voice", voice_id)
+            return self.__engine
+
+    @property
+    def recognizer(self) -> sr.Recognizer:
+        """The speech recognizer, created with the default settings on first access"""
+        with self.__lock:
+            if self.__recognizer is None:
+                self.__recognizer = sr.Recognizer()
+                self.__apply_recognizer_defaults()
+            return self.__recognizer
+
+    @property
+    def recognition_backend(self) -> RecognizerBackend:
+        """The backend transcribing captured audio, configured from the .env file on first access"""
+        with self.__lock:
+            if self.__recognition_backend is None:
+                self.__recognition_backend = recognizer_from_env(self.recognizer)
+            return self.__recognition_backend
+
+    @recognition_backend.setter
+    def recognition_backend(self, backend: RecognizerBackend) -> None:
+        with self.__lock:
+            self.__recognition_backend = backend
+
+    @property
+    def wake_gate(self) -> WakeWordGate | None:
+        """The wake word gate configured in the .env file, None if disabled"""
+        with self.__lock:
+            if not self.__wake_gate_loaded:
+                self.__wake_gate = wake_word_gate_from_env()
+                self.__wake_gate_loaded = True
+            return self.__wake_gate
+
+    @wake_gate.setter
+    def wake_gate(self, gate: WakeWordGate | None) -> None:
+        with self.__lock:
+            self.__wake_gate = gate
+            self.__wake_gate_loaded = True
+
+    def microphone(self, device_index: int | None = None) -> ContinuousCapture:
+        """The always open microphone stream, started on first access
+
+        Args:
+            device_index (int | None, optional): input device used when the stream is first
+                            opened. Defaults to the system default device.
+        """
+        with self.__lock:
+            if self.__microphone is None:
+                self.__microphone = ContinuousCapture(
+                    self.recognizer,
+                    is_muted=self.is_speaking,
+                    device_index=device_index,
+                    calibrator=NoiseCalibrator(
+                        self.recognizer, device_name(device_index)
+                    ),
+                )
+            self.__microphone.start()
+            return self.__microphone
+
+    def set_microphone(self, capture: ContinuousCapture) -> None:
+        """Replaces the microphone stream, e.g. with one fed from recorded audio"""
+        with self.__lock:
+            if self.__microphone is not None:
+                self.__microphone.stop()
+            self.__microphone = capture
+
+    def __apply_recognizer_defaults(self) -> None:
+        for name, value in RECOGNIZER_DEFAULTS.items():
+            setattr(self.__recognizer, name, value)
+
+    def __ensure_speech_thread(self) -> None:
+        with self.__lock:
+            if self.__speech_thread is None:
+                if self.__speech_cache is None:
+                    self.__speech_cache = SpeechCache.from_env()
+                self.__speech_thread = threading.Thread(
+                    target=self.__speech_loop, name="tts", daemon=True
+                )
+                self.__speech_thread.start()
+
+    def enqueue(self, item) -> None:
+        """
+        Queues an item for the speech thread: a list of (text, cache) utterances,
+        a threading.Event set once everything before it was spoken, or a callable
+        to run on the speech thread.
+        """
+        self.__ensure_speech_thread()
+        self.__speech_queue.put(item)
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """Blocks until everything queued before this call has been spoken
+
+        Args:
+            timeout (float | None, optional): maximum seconds to wait. Defaults to no limit.
+
+        Returns:
+            bool: True if the speech queue drained within the timeout, False on timeout
+                            or if the speech thread died
+        """
+        barrier = threading.Event()
+        self.enqueue(barrier)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            poll = WAIT_POLL_SECONDS
+            if deadline is not None:
+                poll = max(0.0, min(poll, deadline - time.monotonic()))
+            if barrier.wait(poll):
+                return True
+            if not self.__speech_thread.is_alive():
+                print("The speech thread stopped, speech was not played")
+                return False
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+
+    def submit(self, function: callable) -> Future:
+        """Runs the function on the speech thread after everything queued before it,
+        since the pyttsx3 engine must only be used by the thread driving it
+
+        Returns:
+            Future: resolved with the result of the function
+        """
+        future = Future()
+
+        def run():
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(function())
+                except Exception as error:  # pylint: disable=broad-exception-caught
+                    future.set_exception(error)
+
+        self.enqueue(run)
+        return future
+
+    def voices(self, timeout: float | None = 10.0) -> list:
+        """Returns the voices of the pyttsx3 engine, read on the speech thread"""
+        return self.submit(lambda: self.engine.getProperty("voices")).result(timeout)
+
+    def set_voice(self, voice_id: str) -> None:
+        """Switches the voice of the pyttsx3 engine for everything queued after this call"""
+        self.submit(lambda: self.engine.setProperty("voice", voice_id))
+
+    def prerender(self, phrases: list[str]) -> None:
+        """Renders the phrases into the speech cache on the speech thread, without speaking
+        them. Phrases are rendered one at a time while nothing else is queued, so queued
+        speech waits for one rendering at most."""
+        self.__prerender_queue.extend(phrases)
+        self.enqueue([])  # wakes the speech thread
+
+    def reset(self) -> None:
+        """Drops unspoken utterances and restores the recognizer defaults, keeping the driver alive"""
+        while True:
+            try:
+                item = self.__speech_queue.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(item, threading.Event):
+                item.set()
+        with self.__lock:
+            if self.__recognizer is not None:
+                self.__apply_recognizer_defaults()
+
+    def __speech_loop(self) -> None:
+        """Speaks queued utterances, combining everything queued so far into one engine run.
+        A failing batch is logged and skipped, so the thread and the waiters survive it.
+        """
+        while True:
+            try:
+                items = [self.__speech_queue.get(block=not self.__prerender_queue)]
+            except queue.Empty:
+                self.__prerender_next()
+                continue
+            while True:
+                try:
+                    items.append(self.__speech_queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            barriers = [item for item in items if isinstance(item, threading.Event)]
+            try:
+                self.__run_batch(items)
+            except Exception as error:  # pylint: disable=broad-exception-caught
+                print(f"Speech failed: {error.__class__.__name__}: {error}")
+            finally:
+                for barrier in barriers:
+                    barrier.set()
+
+    def __prerender_next(self) -> None:
+        """Renders the next phrase waiting to be prerendered, if it is not cached yet"""
+        try:
+            text = self.__prerender_queue.popleft()
+        except IndexError:
+            return
+        try:
+            self.__cached_audio(text)
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            print(f"Failed to prerender {text!r}: {error.__class__.__name__}: {error}")
+
+    def __run_batch(self, items: list) -> None:
+        """Runs the queued items in order. Consecutive utterances are spoken in one engine run,
+        and utterances queued before a callable are spoken before it runs, so a voice change
+        only affects what was queued after it."""
+        utterances = []
+        for item in items:
+            if isinstance(item, threading.Event):
+                continue
+            if callable(item):
+                self.__speak(utterances)
+                utterances = []
+                try:
+                    item()
+                except Exception as error:  # pylint: disable=broad-exception-caught
+                    print(f"Speech task failed: {error.__class__.__name__}: {error}")
+            else:
+                utterances.extend(item)
+        self.__speak(utterances)
+
+    def __speak(self, utterances: list[tuple[str, bool]]) -> None:
+        """Speaks the utterances in one engine run, muting the microphone meanwhile"""
+        if not utterances:
+            return
+        self.speaking.set()
+        try:
+            with TRACER.span("speak", utterances=len(utterances)):
+                self.__speak_utterances(utterances)
+        finally:
+            self.__spoken_at = time.monotonic()
+            self.speaking.clear()
+
+    def __speak_utterances(self, utterances: list[tuple[str, bool]]) -> None:
+        """Speaks the utterances in order, playing cached ones from disk between engine runs"""
+        pending = False
+        for text, cache in utterances:
+            if not cache:
+                self.engine.say(text)
+                pending = True
+                continue
+            if pending:
+                self.engine.runAndWait()
+                pending = False
+            path = self.__cached_audio(text)
+            if path is None or not play_audio(path):
+                self.engine.say(text)
+                pending = True
+        if pending:
+            self.engine.runAndWait()
+
+    def __cached_audio(self, text: str) -> str | None:
+        """Returns the rendered audio of the text, rendering it on a cache miss"""
+        key = SpeechCache.key(
+            self.driver_name,
+            self.engine.getProperty("voice"),
+            self.engine.getProperty("rate"),
+            text,
+        )
+        return self.__speech_cache.get(key) or self.__speech_cache.render(
+            self.engine, key, text
+        )
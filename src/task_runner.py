@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Task Runner
+===============
+
+This module contains the TaskRunner class which executes commands on a bounded worker pool
+so that the Assistant can go back to listening while a command is still running.
+
+"""
+
+import itertools
+import threading
+import time
+from collections import deque
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from typing import Iterator
+
+from voice_interface import VoiceInterface
+
+# Seconds between two checks for cancellation while a task waits for its turn to talk
+POLL_SECONDS = 0.2
+
+
+class TaskCancelled(Exception):
+    """Raised inside a running command once its task has been cancelled"""
+
+
+class TaskVoiceInterface:
+    """
+    VoiceInterface proxy handed to commands running on the worker pool. Only the oldest
+    unreported task talks to the user right away: what the tasks behind it say is held
+    back and spoken once they reach the front, so the output of concurrent tasks never
+    interleaves and comes out in the order they were submitted. Listening waits for the
+    turn of the task. Any use after the task was cancelled raises TaskCancelled, which
+    aborts the command at its next interaction with the user.
+    """
+
+    def __init__(
+        self, vi: VoiceInterface, cancel_event: threading.Event, live: bool = False
+    ) -> None:
+        """
+        Args:
+            vi (VoiceInterface): voice interface of the Assistant.
+            cancel_event (threading.Event): set once the task is cancelled.
+            live (bool, optional): the task is at the front already. Defaults to False.
+        """
+        self.__vi = vi
+        self.__cancel_event = cancel_event
+        self.__held = list[tuple[str, bool]]()  # spoken before the turn of the task
+        self.__live = threading.Event()
+        if live:
+            self.__live.set()
+        self.__lock = threading.Lock()
+
+    def __check_cancelled(self) -> None:
+        if self.__cancel_event.is_set():
+            raise TaskCancelled()
+
+    def __await_turn(self, timeout: float | None = None) -> bool:
+        """Blocks until the task is at the front, returns False on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            self.__check_cancelled()
+            poll = POLL_SECONDS
+            if deadline is not None:
+                poll = max(0.0, min(poll, deadline - time.monotonic()))
+            if self.__live.wait(poll):
+                self.__check_cancelled()
+                return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+
+    def release(self) -> None:
+        """Speaks what was held back, unless cancelled, and lets the task speak directly"""
+        with self.__lock:
+            held, self.__held = self.__held, []
+            if held and not self.__cancel_event.is_set():
+                with self.__vi.batch():
+                    for text, cache in held:
+                        self.__vi.speak(text, cache)
+            self.__live.set()
+
+    def speak(self, text: str, cache: bool = False) -> None:
+        """Speaks the text, or holds it back until the turn of the task"""
+        self.__check_cancelled()
+        with self.__lock:
+            if self.__live.is_set():
+                self.__vi.speak(text, cache)
+            else:
+                self.__held.append((text, cache))
+
+    def speak_many(self, texts: list[str]) -> None:
+        """Speaks several utterances in a single engine run (see speak)"""
+        self.__check_cancelled()
+        with self.__lock:
+            if self.__live.is_set():
+                self.__vi.speak_many(texts)
+            else:
+                self.__held.extend((text, False) for text in texts)
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """Collects everything spoken inside the block into one engine run (see speak)"""
+        self.__check_cancelled()
+        if not self.__live.is_set():  # held back output is released in one run anyway
+            yield
+            return
+        with self.__vi.batch():
+            yield
+
+    def flush(self) -> None:
+        """Hands the batched utterances to the speech thread once it is the task's turn"""
+        self.__check_cancelled()
+        if self.__live.is_set():
+            self.__vi.flush()
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """Blocks until the turn of the task and everything it said has been spoken"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        if not self.__await_turn(timeout):
+            return False
+        remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+        return self.__vi.wait(remaining)
+
+    def listen(self, print_statement: bool = False):
+        """Listens for input once it is the task's turn"""
+        self.__await_turn()
+        return self.__vi.listen(print_statement)
+
+    def capture(self, print_statement: bool = False, timeout: float | None = None):
+        """Captures an utterance once it is the task's turn"""
+        self.__await_turn()
+        return self.__vi.capture(print_statement, timeout)
+
+    def recognize(self, audio, print_statement: bool = False):
+        """Transcribes the audio, printing what was heard once it is the task's turn"""
+        self.__await_turn()
+        return self.__vi.recognize(audio, print_statement)
+
+    def __getattr__(self, name: str):
+        self.__check_cancelled()
+        return getattr(self.__vi, name)
+
+
+class Task:
+    """A command submitted to the TaskRunner"""
+
+    def __init__(self, task_id: int, command: str, query: str) -> None:
+        self.task_id = task_id
+        self.command = command
+        self.query = query
+        self.cancel_event = threading.Event()
+        self.vi: TaskVoiceInterface | None = None
+        self.future: Future | None = None
+
+    def cancel(self) -> None:
+        """Cancels the task if queued, or asks the running command to abort"""
+        self.cancel_event.set()
+        if self.future is not None:
+            self.future.cancel()
+
+    def done(self) -> bool:
+        """Returns True once the task has finished, failed or was cancelled"""
+        return self.future is not None and self.future.done()
+
+    def __repr__(self) -> str:
+        return f"Task({self.task_id}, {self.command}, {self.query!r})"
+
+
+class TaskRunner:
+    """
+    Runs command executors on a bounded pool of worker threads. What the commands say and
+    the reports of their failure or cancellation reach the voice interface in the order
+    the commands were submitted (see TaskVoiceInterface).
+    """
+
+    def __init__(
+        self, vi: VoiceInterface, max_workers: int = 4, max_pending: int = 16
+    ) -> None:
+        """
+        Args:
+            vi (VoiceInterface): voice interface used by the commands and for reporting.
+            max_workers (int, optional): number of commands running at once. Defaults to 4.
+            max_pending (int, optional): number of unreported tasks accepted before new ones
+                            are rejected. Defaults to 16.
+        """
+        self.__vi = vi
+        self.__max_pending = max_pending
+        self.__pool = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="command"
+        )
+        self.__tasks = deque[Task]()
+        self.__lock = threading.RLock()
+        self.__report_lock = threading.Lock()
+        self.__task_ids = itertools.count(1)
+
+    def submit(self, command: str, executor: callable, query: str) -> Task | None:
+        """
+        Submits a command executor to the worker pool.
+
+        Args:
+            command (str): name of the command being executed.
+            executor (callable): the execute_query function of the command.
+            query (str): the query to execute.
+
+        Returns:
+            Task | None: the submitted task, or None if too many tasks are pending.
+        """
+        with self.__lock:
+            rejected = len(self.__tasks) >= self.__max_pending
+            if not rejected:
+                task = Task(next(self.__task_ids), command, query)
+                task.vi = TaskVoiceInterface(
+                    self.__vi, task.cancel_event, live=not self.__tasks
+                )
+                self.__tasks.append(task)
+                task.future = self.__pool.submit(executor, query, task.vi)
+        if rejected:
+            self.__vi.speak("Too many tasks are running. Please try again later.")
+            return None
+        task.future.add_done_callback(lambda _: self.__report_completed())
+        return task
+
+    def running(self) -> list[Task]:
+        """Returns the tasks which have not finished yet"""
+        with self.__lock:
+            return [task for task in self.__tasks if not task.done()]
+
+    def wait_all(self, timeout: float | None = None) -> bool:
+        """Blocks until every submitted task has finished, returns False on timeout"""
+        futures = [task.future for task in self.running()]
+        _, not_done = wait(futures, timeout)
+        return not not_done
+
+    def cancel_all(self) -> int:
+        """Cancels every unfinished task and returns the number of tasks cancelled"""
+        tasks = self.running()
+        for task in tasks:
+            task.cancel()
+        return len(tasks)
+
+    def __report_completed(self) -> None:
+        """Reports finished tasks from the front of the queue so reports stay in order,
+        each after the output it held back, then gives the turn to the new front task.
+        Speaking happens after the task list is released, under a lock of its own which
+        only keeps concurrent reports in order."""
+        with self.__report_lock:
+            with self.__lock:
+                finished = []
+                while self.__tasks and self.__tasks[0].done():
+                    finished.append(self.__tasks.popleft())
+                front = self.__tasks[0] if self.__tasks else None
+            for task in finished:
+                task.vi.release()
+                report = self.__report(task)
+                if report is not None:
+                    self.__vi.speak(report)
+            if front is not None:
+                front.vi.release()
+
+    @staticmethod
+    def __report(task: Task) -> str | None:
+        """Returns what to tell the user about a finished task, None if it succeeded"""
+        try:
+            task.future.result()
+        except (CancelledError, TaskCancelled):
+            return f"{task.command} was cancelled."
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            return f"{task.command} failed: {error.__class__.__name__}: {error}"
+        if task.cancel_event.is_set():
+            return f"{task.command} was cancelled."
+        return None
+
+    def shutdown(self, cancel: bool = True) -> None:
+        """Stops the worker pool, cancelling unfinished tasks if requested"""
+        if cancel:
+            self.cancel_all()
+        self.__pool.shutdown(wait=not cancel, cancel_futures=cancel)
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Telemetry
+===============
+
+This module contains the Tracer which times the stages of an Assistant turn (listen,
+recognize, get_executor, execute_query, speak) in spans, writes every span to a rotating
+JSONL trace file and aggregates them into a Prometheus text-format metrics file.
+
+Tracing is enabled by setting TELEMETRY_DIR in the .env file.
+
+"""
+
+import atexit
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+from typing import Iterator
+
+from dotenv import dotenv_values
+
+from infra import write_atomically
+
+__ENV__ = dotenv_values(".env")
+
+TRACE_FILE = "trace.jsonl"
+METRICS_FILE = "assistant.prom"
+# Upper bounds (seconds) of the duration histogram buckets
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Exceptions which mean the work was aborted on purpose rather than failing
+CANCELLATION_ERRORS = {"TaskCancelled", "CancelledError"}
+
+
+class Span:
+    """A timed stage of a turn together with its attributes"""
+
+    def __init__(self, name: str, attributes: dict) -> None:
+        self.name = name
+        self.attributes = attributes
+        self.start = time.time()
+        self.duration = 0.0
+        self.outcome = "ok"
+        self.error = None
+
+    def set(self, key: str, value) -> None:
+        """Adds or replaces an attribute, e.g. the command once it is known"""
+        self.attributes[key] = value
+
+    def to_dict(self) -> dict:
+        """Returns the span as a JSON serializable dictionary"""
+        return {
+            "span": self.name,
+            "start": self.start,
+            "duration": self.duration,
+            "outcome": self.outcome,
+            "error": self.error,
+            **self.attributes,
+        }
+
+
+class Tracer:
+    """
+    Records spans to a rotating JSONL file and keeps per (stage, command, outcome)
+    duration histograms which are periodically written in the Prometheus text format.
+    Without paths the spans are timed but not recorded anywhere.
+    """
+
+    def __init__(
+        self,
+        trace_path: str | None = None,
+        metrics_path: str | None = None,
+        max_bytes: int = 10 * 1024 * 1024,
+        backup_count: int = 5,
+        metrics_interval: float = 15.0,
+    ) -> None:
+        """
+        Args:
+            trace_path (str | None, optional): JSONL file receiving every span.
+            metrics_path (str | None, optional): Prometheus text file with the aggregates.
+            max_bytes (int, optional): size at which the trace file is rotated. Defaults to 10 MB.
+            backup_count (int, optional): rotated trace files kept. Defaults to 5.
+            metrics_interval (float, optional): minimum seconds between metric writes. Defaults to 15.
+        """
+        self.metrics_path = metrics_path
+        self.metrics_interval = metrics_interval
+        self.__lock = threading.Lock()
+        self.__histograms = dict[tuple[str, str, str], list]()
+        self.__errors = dict[tuple[str, str, str], int]()
+        self.__last_metrics_write = time.monotonic()
+
+        self.__trace_logger = None
+        if trace_path is not None:
+            handler = RotatingFileHandler(
+                trace_path, maxBytes=max_bytes, backupCount=backup_count
+            )
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self.__trace_logger = logging.getLogger(f"{__name__}.{id(self)}")
+            self.__trace_logger.propagate = False
+            self.__trace_logger.setLevel(logging.INFO)
+            self.__trace_logger.addHandler(handler)
+
+    @property
+    def enabled(self) -> bool:
+        """True if spans are recorded anywhere"""
+        return self.__trace_logger is not None or self.metrics_path is not None
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Span]:
+        """
+        Times the enclosed block as a span. Exceptions are recorded and re-raised.
+
+        Args:
+            name (str): stage name, e.g. "recognize".
+            attributes: extra attributes such as command="FetchNews".
+        """
+        current = Span(name, attributes)
+        started = time.perf_counter()
+        try:
+            yield current
+        except BaseException as error:
+            current.error = error.__class__.__name__
+            current.outcome = (
+                "cancelled" if current.error in CANCELLATION_ERRORS else "error"
+            )
+            raise
+        finally:
+            current.duration = time.perf_counter() - started
+            if self.enabled:
+                self.__record(current)
+
+    def traced(self, name: str, function: callable, **attributes) -> callable:
+        """Returns the function wrapped so that every call is recorded as a span"""
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with self.span(name, **attributes):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    def __record(self, span: Span) -> None:
+        if self.__trace_logger is not None:
+            self.__trace_logger.info(json.dumps(span.to_dict(), default=str))
+        if self.metrics_path is None:
+            return
+
+        key = (span.name, str(span.attributes.get("command") or ""), span.outcome)
+        with self.__lock:
+            histogram = self.__histograms.setdefault(key, [0] * len(BUCKETS) + [0, 0.0])
+            for index, bound in enumerate(BUCKETS):
+                if span.duration <= bound:
+                    histogram[index] += 1
+            histogram[-2] += 1  # count
+            histogram[-1] += span.duration  # sum
+            if span.error is not None:
+                error_key = (key[0], key[1], span.error)
+                self.__errors[error_key] = self.__errors.get(error_key, 0) + 1
+            due = time.monotonic() - self.__last_metrics_write >= self.metrics_interval
+        if due:
+            self.write_metrics()
+
+    def write_metrics(self) -> None:
+        """Writes the aggregated spans to the metrics file in the Prometheus text format"""
+        if self.metrics_path is None:
+            return
+        with self.__lock:
+            self.__last_metrics_write = time.monotonic()
+            lines = [
+                "# HELP assistant_stage_duration_seconds Duration of the stages of an assistant turn.",
+                "# TYPE assistant_stage_duration_seconds histogram",
+            ]
+            for (stage, command, outcome), histogram in sorted(
+                self.__histograms.items()
+            ):
+                labels = f'stage="{stage}",command="{command}",outcome="{outcome}"'
+                for bound, count in zip(BUCKETS, histogram):
+                    lines.append(
+                        f'assistant_stage_duration_seconds_bucket{{{labels},le="{bound}"}} {count}'
+                    )
+                lines.append(
+                    f'assistant_stage_duration_seconds_bucket{{{labels},le="+Inf"}} {histogram[-2]}'
+                )
+                lines.append(
+                    f"assistant_stage_duration_seconds_count{{{labels}}} {histogram[-2]}"
+                )
+                lines.append(
+                    f"assistant_stage_duration_seconds_sum{{{labels}}} {histogram[-1]}"
+                )
+            lines.append(
+                "# HELP assistant_stage_errors_total Stages which ended with an exception."
+            )
+            lines.append("# TYPE assistant_stage_errors_total counter")
+            for (stage, command, error), count in sorted(self.__errors.items()):
+                lines.append(
+                    f'assistant_stage_errors_total{{stage="{stage}",command="{command}",error="{error}"}} {count}'
+                )
+
+        try:
+            write_atomically(self.metrics_path, "\n".join(lines) + "\n")
+        except OSError as error:
+            print(f"Failed to write metrics: {error}")
+
+
+def tracer_from_env() -> Tracer:
+    """Creates the Tracer configured by TELEMETRY_DIR in the .env file, inactive if unset"""
+    telemetry_dir = (__ENV__.get("TELEMETRY_DIR") or "").strip()
+    if not telemetry_dir:
+        return Tracer()
+    os.makedirs(telemetry_dir, exist_ok=True)
+    tracer = Tracer(
+        os.path.join(telemetry_dir, TRACE_FILE),
+        os.path.join(telemetry_dir, METRICS_FILE),
+    )
+    atexit.register(tracer.write_metrics)
+    return tracer
+
+
+TRACER = tracer_from_env()
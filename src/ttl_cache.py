@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+TTL Cache
+===============
+
+This module contains the TTLCache class, a small thread-safe in-memory cache whose entries
+expire after a fixed time and which drops the least recently used entry when full. Commands
+use it for answers of web services which stay valid for a few minutes.
+
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Hashable
+
+
+class TTLCache:
+    """Thread-safe LRU mapping whose entries expire ttl seconds after they were stored"""
+
+    def __init__(self, ttl: float, max_entries: int = 128) -> None:
+        """
+        Args:
+            ttl (float): seconds an entry stays valid.
+            max_entries (int, optional): entries kept before the least recently used is dropped.
+                            Defaults to 128.
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.__entries = OrderedDict[Hashable, tuple[float, object, float]]()
+        self.__lock = threading.Lock()
+
+    def get(self, key: Hashable, default=None):
+        """Returns the value stored under the key, or default if it is missing or expired"""
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is None:
+                return default
+            if entry[0] <= time.monotonic():
+                del self.__entries[key]
+                return default
+            self.__entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: Hashable, value, ttl: float | None = None) -> None:
+        """Stores the value under the key, valid for ttl seconds (defaults to the cache ttl)"""
+        now = time.monotonic()
+        expires = now + (self.ttl if ttl is None else ttl)
+        with self.__lock:
+            self.__entries[key] = (expires, value, now)
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.max_entries:
+                self.__entries.popitem(last=False)
+
+    def age(self, key: Hashable) -> float | None:
+        """Returns the seconds since the value under the key was stored, None if it is not cached"""
+        with self.__lock:
+            entry = self.__entries.get(key)
+        now = time.monotonic()
+        if entry is None or entry[0] <= now:
+            return None
+        return now - entry[2]
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, self) is not self
+
+    def __len__(self) -> int:
+        with self.__lock:
+            return len(self.__entries)
+
+    def clear(self) -> None:
+        """Drops every entry"""
+        with self.__lock:
+            self.__entries.clear()
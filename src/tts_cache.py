@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+TTS Cache
+===============
+
+This module contains the SpeechCache class which stores synthesized speech on disk so that
+phrases the Assistant repeats often are rendered once and played back directly afterwards.
+
+"""
+
+import hashlib
+import os
+import platform
+import subprocess
+
+from dotenv import dotenv_values
+
+from user_dirs import user_cache_dir
+
+__ENV__ = dotenv_values(".env")
+
+DEFAULT_MAX_MEGABYTES = 64
+
+
+class SpeechCache:
+    """
+    Disk backed LRU cache of rendered utterances keyed by (driver, voice id, rate, text).
+    The modification time of a file is its last use, so the LRU order survives restarts.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int) -> None:
+        """
+        Args:
+            cache_dir (str): directory holding the rendered audio files.
+            max_bytes (int): total size of the cache after which least recently used files are deleted.
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def from_env() -> "SpeechCache":
+        """Creates a cache configured by TTS_CACHE_DIR and TTS_CACHE_MAX_MB from the .env file"""
+        cache_dir = __ENV__.get("TTS_CACHE_DIR") or user_cache_dir("tts")
+        max_megabytes = int(__ENV__.get("TTS_CACHE_MAX_MB") or DEFAULT_MAX_MEGABYTES)
+        return SpeechCache(cache_dir, max_megabytes * 1024 * 1024)
+
+    @staticmethod
+    def key(driver: str, voice_id: str, rate: int, text: str) -> str:
+        """Returns the cache key of an utterance rendered with the given engine settings"""
+        identity = "\0".join([driver, str(voice_id), str(rate), text])
+        return hashlib.sha1(identity.encode("utf-8")).hexdigest()
+
+    def __path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.wav")
+
+    def get(self, key: str) -> str | None:
+        """Returns the audio file for the key and marks it as recently used, None if missing"""
+        path = self.__path(key)
+        try:
+            os.utime(path)
+        except OSError:
+            return None
+        return path
+
+    def render(self, engine, key: str, text: str) -> str | None:
+        """
+        Renders the text to an audio file with the given pyttsx3 engine and stores it in the cache.
+
+        Returns:
+            str | None: path of the rendered audio file, None if the engine produced nothing.
+        """
+        path = self.__path(key)
+        temp_path = f"{path}.{os.getpid()}.tmp.wav"
+        engine.save_to_file(text, temp_path)
+        engine.runAndWait()
+        if not os.path.isfile(temp_path) or os.path.getsize(temp_path) == 0:
+            return None
+        os.replace(temp_path, path)
+        self.evict(keep=path)
+        return path
+
+    def evict(self, keep: str | None = None) -> None:
+        """Deletes the least recently used files until the cache fits within max_bytes
+
+        Args:
+            keep (str | None, optional): path of a file which must not be evicted.
+        """
+        entries = []
+        total = 0
+        with os.scandir(self.cache_dir) as files:
+            for entry in files:
+                if (
+                    entry.is_file()
+                    and entry.name.endswith(".wav")
+                    and entry.path != keep
+                ):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                continue
+
+
+def play_audio(path: str) -> bool:
+    """Plays an audio file synchronously, returns False if no player is available"""
+    os_name = platform.system()
+    try:
+        if os_name == "Windows":
+            import winsound  # pylint: disable=import-outside-toplevel
+
+            winsound.PlaySound(path, winsound.SND_FILENAME)
+            return True
+        player = ["afplay", path] if os_name == "Darwin" else ["aplay", "-q", path]
+        subprocess.run(player, capture_output=True, check=True)
+        return True
+    except (OSError, subprocess.CalledProcessError):
+        return False
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Usage History
+===============
+
+This module contains the UsageHistory class which remembers what the user asked the
+commands about (cities for the weather, topics for Wikipedia, ...) so the prefetch
+scheduler can keep the answers to the most frequent questions warm.
+
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+from collections import Counter
+
+from infra import write_json_atomically
+from user_dirs import user_state_dir
+
+USAGE_FILE = "usage.json"
+
+
+class UsageHistory:
+    """
+    Persistent log of (command, subject, time) events. Only events of the last
+    window_days are counted and at most max_events are kept. Events are saved in batches,
+    save_delay seconds after the first unsaved one and when the process exits.
+    """
+
+    __instance = None
+    __instance_lock = threading.Lock()
+
+    def __init__(
+        self,
+        path: str | None = None,
+        window_days: float = 14.0,
+        max_events: int = 2000,
+        save_delay: float = 5.0,
+    ) -> None:
+        """
+        Args:
+            path (str | None, optional): json file holding the events.
+                            Defaults to usage.json in the user state directory.
+            window_days (float, optional): age after which events are forgotten. Defaults to 14.
+            max_events (int, optional): events kept, the oldest are dropped first. Defaults to 2000.
+            save_delay (float, optional): seconds unsaved events are collected before the
+                            file is rewritten. Defaults to 5.
+        """
+        self.path = path or os.path.join(user_state_dir(), USAGE_FILE)
+        self.window_days = window_days
+        self.max_events = max_events
+        self.save_delay = save_delay
+        self.__events = None
+        self.__save_timer = None  # pending save of the recorded events
+        self.__lock = threading.Lock()
+        atexit.register(self.save)
+
+    @staticmethod
+    def instance() -> "UsageHistory":
+        """Returns the UsageHistory shared by the whole process"""
+        with UsageHistory.__instance_lock:
+            if UsageHistory.__instance is None:
+                UsageHistory.__instance = UsageHistory()
+            return UsageHistory.__instance
+
+    def __load(self) -> list[list]:
+        """Returns the events, reading them from disk on first use (lock must be held)"""
+        if self.__events is None:
+            try:
+                with open(self.path, "r", encoding="UTF-8") as usage_file:
+                    self.__events = json.load(usage_file)
+            except (OSError, ValueError):
+                self.__events = []
+        return self.__events
+
+    def record(self, command: str, subject: str) -> None:
+        """Remembers that the command was asked about the subject"""
+        subject = " ".join(subject.lower().split())
+        if not subject:
+            return
+        with self.__lock:
+            events = self.__load()
+            events.append([command, subject, time.time()])
+            del events[: -self.max_events]
+            if self.__save_timer is None:
+                self.__save_timer = threading.Timer(self.save_delay, self.save)
+                self.__save_timer.daemon = True
+                self.__save_timer.start()
+
+    def save(self) -> None:
+        """Writes the events recorded since the last save to disk"""
+        with self.__lock:
+            if self.__save_timer is None:
+                return
+            self.__save_timer.cancel()
+            self.__save_timer = None
+            try:
+                write_json_atomically(self.path, self.__events)
+            except OSError as error:
+                print(f"Failed to save the usage history: {error}")
+
+    def frequent(self, command: str, limit: int = 3) -> list[str]:
+        """Returns the subjects most often asked of the command recently, most frequent first"""
+        since = time.time() - self.window_days * 24 * 60 * 60
+        with self.__lock:
+            subjects = [
+                subject
+                for name, subject, asked_at in self.__load()
+                if name == command and asked_at >= since
+            ]
+        return [subject for subject, _ in Counter(subjects).most_common(limit)]
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+User Dirs
+===============
+
+This module contains helpers locating the per-user directories in which the Assistant
+keeps state between runs, such as caches and calibration data.
+
+"""
+
+import os
+import sys
+
+APP_NAME = "desktop-assistant"
+
+
+def user_cache_dir(*parts: str) -> str:
+    """Returns (and creates) a directory for data which can be deleted at any time
+
+    Args:
+        parts (str): sub directories below the cache directory of the Assistant
+
+    Returns:
+        str: absolute path of the directory
+    """
+    if sys.platform in ["win32", "cygwin"]:
+        root = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    else:
+        root = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+            os.path.expanduser("~"), ".cache"
+        )
+    path = os.path.join(root, APP_NAME, *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def user_state_dir(*parts: str) -> str:
+    """Returns (and creates) a directory for data which should survive restarts
+
+    Args:
+        parts (str): sub directories below the state directory of the Assistant
+
+    Returns:
+        str: absolute path of the directory
+    """
+    if sys.platform in ["win32", "cygwin"]:
+        root = os.environ.get("APPDATA") or os.path.expanduser("~")
+    else:
+        root = os.environ.get("XDG_STATE_HOME") or os.path.join(
+            os.path.expanduser("~"), ".local", "state"
+        )
+    path = os.path.join(root, APP_NAME, *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
@@ -9,23 +9,23 @@ that allow speech-to-text and text-to-speech conversions.
 
 """
 
-import platform
-import random
-from typing import Any
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator
 
-import pyttsx3
 import speech_recognition as sr
 from pyttsx3 import voice
 
+from recognizers import RecognizerBackend
+from speech_engine import NullTTSEngine, SpeechEngine
+from telemetry import TRACER
+from wake_word import WakeWordGate
 
-def __get_driver_name__() -> str:
-    """Returns the driver name for the pyttsx3 engine based on operating system"""
-    os_name = platform.system()
-    if os_name == "Windows":
-        return "sapi5"
-    if os_name == "Darwin":  # macOS
-        return "nsss"
-    return "espeak"  # default for other systems
+
+def __audio_duration__(audio: sr.AudioData) -> float:
+    """Returns the length of the audio in seconds"""
+    return len(audio.frame_data) / (audio.sample_rate * audio.sample_width)
 
 
 class VoiceInterface:
@@ -34,50 +34,134 @@ class VoiceInterface:
     and text-to-speech conversions.
     """
 
-    def __init__(self) -> None:
+    def __init__(self, speech_engine: SpeechEngine | None = None) -> None:
         """
-        Creates VoiceInterface instance consisting of a voice engine,
-        sets the voice of the engine, and creates a voice recognizer instance.
+        Creates VoiceInterface instance as a lightweight facade over the voice engine
+        and voice recognizer shared by the whole process.
+
+        Args:
+            speech_engine (SpeechEngine | None, optional): engine to speak and listen with.
+                            Defaults to the process-wide SpeechEngine instance.
         """
-        self.__engine = pyttsx3.init(__get_driver_name__())
-        voices = self.__engine.getProperty("voices")
-        self.__engine.setProperty("voice", random.choice(voices).id)
-
-        self.__recognizer = sr.Recognizer()
-        self.__recognizer.energy_threshold = 150
-        self.__recognizer.pause_threshold = 1
-        self.__recognizer.phrase_threshold = 0.3
-        self.__recognizer.non_speaking_duration = 0.5
-
-    def speak(self, text: str) -> None:
-        """Tells Assistant to speak the given 'text' and also prints on the console."""
-        self.__engine.say(text)
+        self.__speech_engine = speech_engine or SpeechEngine.instance()
+        self.__batch = threading.local()
+
+    def prerender(self, phrases: list[str]) -> None:
+        """Renders the phrases into the speech cache in the background, without speaking them"""
+        self.__speech_engine.prerender(phrases)
+
+    def speak(self, text: str, cache: bool = False) -> None:
+        """Tells Assistant to speak the given 'text' and also prints on the console.
+        The text is queued for the speech thread and the call returns immediately.
+        Set 'cache' for fixed phrases so their audio is rendered once and replayed."""
         print(text)
-        self.__engine.runAndWait()
+        pending = getattr(self.__batch, "texts", None)
+        if pending is not None:
+            pending.append((text, cache))
+        else:
+            self.__speech_engine.enqueue([(text, cache)])
+
+    def speak_many(self, texts: list[str]) -> None:
+        """Queues several utterances to be spoken in a single engine run"""
+        with self.batch():
+            for text in texts:
+                self.speak(text)
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """Collects everything spoken by the current thread inside the block into one engine run"""
+        outer = getattr(self.__batch, "texts", None)
+        if outer is not None:  # already batching, let the outermost block flush
+            yield
+            return
+        self.__batch.texts = []
+        try:
+            yield
+        finally:
+            self.flush()
+            self.__batch.texts = None
+
+    def flush(self) -> None:
+        """Hands the utterances batched so far by the current thread to the speech thread"""
+        pending = getattr(self.__batch, "texts", None)
+        if pending:
+            self.__speech_engine.enqueue(list(pending))
+            pending.clear()
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """Blocks until everything queued before this call has been spoken
+
+        Args:
+            timeout (float | None, optional): maximum seconds to wait. Defaults to no limit.
+
+        Returns:
+            bool: True if the speech queue drained within the timeout
+        """
+        self.flush()
+        return self.__speech_engine.wait(timeout)
 
     def listen(self, print_statement: bool = False) -> Any | None:
         """
         Listens for Microphone input, converts to string using
         google recognitions engine,and returns the string on success.
         """
-        with sr.Microphone() as source:
-            if print_statement:
-                print("\nListening...")
-            audio = self.__recognizer.listen(source)
-        try:
-            # language = English(en)-India(in)
-            if print_statement:
-                print("Recognizing...\n")
-            query = self.__recognizer.recognize_google(
-                audio_data=audio, language="en-in"
-            )
-            return query
-        except sr.UnknownValueError:
-            print("Sorry, I did not get that.")
-            return None
-        except sr.RequestError:
-            print("Sorry, My speech service is down.")
-            return None
+        self.wait()  # finish speaking the prompt so it is not recorded
+        while True:
+            query = self.recognize(self.capture(print_statement), print_statement)
+            if query != "":
+                return query
+            # only the wake phrase was said, ask for the actual command
+            self.speak("Yes?", cache=True)
+            self.wait()
+
+    def capture(
+        self, print_statement: bool = False, timeout: float | None = None
+    ) -> sr.AudioData | None:
+        """Returns the next phrase segmented from the always open Microphone stream.
+        With a wake word gate, phrases are skipped until the wake phrase is heard.
+        Returns None if no phrase was admitted within the timeout (default no limit)."""
+        if print_statement:
+            print("\nListening...")
+        gate = self.__speech_engine.wake_gate
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with TRACER.span("listen") as span:
+            while True:
+                remaining = None
+                if deadline is not None:
+                    remaining = max(0.0, deadline - time.monotonic())
+                audio = self.__speech_engine.microphone().next_utterance(remaining)
+                if audio is None:
+                    span.outcome = "timeout"
+                    return None
+                span.set("audio_seconds", __audio_duration__(audio))
+                if gate is None:
+                    return audio
+                if gate.admit(audio):
+                    return audio
+
+    def recognize(
+        self, audio: sr.AudioData, print_statement: bool = False
+    ) -> Any | None:
+        """Converts the recorded audio to string using the configured recognition backend.
+        Returns an empty string if only the wake phrase was said."""
+        backend = self.__speech_engine.recognition_backend
+        with TRACER.span("recognize", backend=backend.name) as span:
+            try:
+                if print_statement:
+                    print("Recognizing...\n")
+                result = backend.recognize(audio)
+                span.set("winner", result.backend)
+                span.set("confidence", result.confidence)
+                gate = self.__speech_engine.wake_gate
+                return gate.strip(result.text) if gate is not None else result.text
+            except sr.UnknownValueError:
+                span.outcome, span.error = "unrecognized", "UnknownValueError"
+                print("Sorry, I did not get that.")
+                return None
+            except sr.RequestError:
+                span.outcome, span.error = "error", "RequestError"
+                print("Sorry, My speech service is down.")
+                return None
 
     def set_properties(
         self,
@@ -90,7 +174,8 @@ class VoiceInterface:
 
         Args:
             energy_threshold (int | None, optional):
-                            Min audio energy for recording. Default value is 150.
+                            Min audio energy for recording. Default value is 150, adapted to
+                            the ambient noise; a threshold set here is pinned instead.
             pause_threshold (float | None, optional):
                             Silence after a phrase to conclude recording. Default value is 1.
             phrase_threshold (float | None, optional):
@@ -99,25 +184,83 @@ class VoiceInterface:
                             Empty Audio buffer on start and end of audio. Default value is 0.5.
         """
         if energy_threshold:
-            self.__recognizer.energy_threshold = energy_threshold
+            self.__speech_engine.recognizer.dynamic_energy_threshold = False
+            self.__speech_engine.recognizer.energy_threshold = energy_threshold
         if pause_threshold:
-            self.__recognizer.pause_threshold = pause_threshold
+            self.__speech_engine.recognizer.pause_threshold = pause_threshold
         if phrase_threshold:
-            self.__recognizer.phrase_threshold = phrase_threshold
+            self.__speech_engine.recognizer.phrase_threshold = phrase_threshold
         if non_speaking_duration:
-            self.__recognizer.non_speaking_duration = non_speaking_duration
+            self.__speech_engine.recognizer.non_speaking_duration = (
+                non_speaking_duration
+            )
+
+    def set_wake_gate(self, gate: WakeWordGate | None) -> None:
+        """Replaces the wake word gate in front of the recognizer, None disables it"""
+        self.__speech_engine.wake_gate = gate
+
+    def set_recognition_backend(self, backend: RecognizerBackend) -> None:
+        """Replaces the backend used to transcribe speech, e.g. with a RacingRecognizer"""
+        self.__speech_engine.recognition_backend = backend
 
     def get_available_voices(self) -> list[voice.Voice]:
         """Returns a list of available voices for the pyttsx3 engine"""
-        return self.__engine.getProperty("voices")
+        return self.__speech_engine.voices()
 
     def set_voice(self, voice_instance: voice.Voice) -> None:
         """Sets the voice of the pyttsx3 engine to the given voice instance"""
         if isinstance(voice_instance, voice.Voice):
-            self.__engine.setProperty("voice", voice_instance.id)
+            self.__speech_engine.set_voice(voice_instance.id)
 
     def close(self) -> None:
-        """Deletes the Voice Engine and Recognizer instances"""
-        self.speak("Have a Good Day !!!")
-        del self.__engine
-        del self.__recognizer
+        """Says goodbye and waits for pending speech. The shared engine stays alive for reuse."""
+        self.speak("Have a Good Day !!!", cache=True)
+        self.wait()
+
+    def reset(self) -> None:
+        """Drops unspoken utterances and restores the default recognizer settings"""
+        self.__batch.texts = None
+        self.__speech_engine.reset()
+
+
+class TextVoiceInterface(VoiceInterface):
+    """
+    VoiceInterface for headless runs without audio hardware. Spoken text is recorded
+    (and optionally printed) instead of synthesized, and listening reads the next line
+    of the text input, so dialogs of commands consume the following input lines.
+    """
+
+    def __init__(self, replies: Iterator[str] | None = None, echo: bool = True) -> None:
+        """
+        Args:
+            replies (Iterator[str] | None, optional): lines returned by listen(). Defaults to none.
+            echo (bool, optional): print spoken text on the console. Defaults to True.
+        """
+        super().__init__(SpeechEngine(tts_engine=NullTTSEngine()))
+        self.replies = replies if replies is not None else iter(())
+        self.echo = echo
+        self.spoken = list[str]()
+
+    def speak(self, text: str, cache: bool = False) -> None:
+        """Records the text instead of speaking it"""
+        self.spoken.append(text)
+        if self.echo:
+            print(text)
+
+    def prerender(self, phrases: list[str]) -> None:
+        """Nothing is ever rendered"""
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """Recorded speech is never pending"""
+        return True
+
+    def listen(self, print_statement: bool = False) -> Any | None:
+        """Returns the next line of the text input
+
+        Raises:
+            EOFError: If the text input is exhausted
+        """
+        try:
+            return next(self.replies).strip()
+        except StopIteration as error:
+            raise EOFError("no more text input") from error
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Wake Word
+===============
+
+This module contains the WakeWordGate class which keeps background chatter away from the
+full speech recognizer. Utterances are only forwarded once a local keyword spotter heard
+the configured wake phrase, and for a short window after that.
+
+"""
+
+import importlib
+import re
+import threading
+import time
+
+import speech_recognition as sr
+from dotenv import dotenv_values
+
+__ENV__ = dotenv_values(".env")
+
+# Sample rate of the audio decoded by pocketsphinx
+SAMPLE_RATE = 16000
+
+
+class KeywordSpotter:
+    """
+    Offline wake phrase detector built on the pocketsphinx keyword search. One decoder is
+    loaded for the lifetime of the spotter and fed the start of every utterance frame by
+    frame, stopping at the first frame completing the wake phrase, so the cost per utterance
+    stays bounded no matter how long the captured phrase is.
+    """
+
+    def __init__(
+        self,
+        wake_phrase: str,
+        sensitivity: float = 0.8,
+        head_seconds: float = 2.0,
+        frame_seconds: float = 0.1,
+        decoder=None,
+    ) -> None:
+        """
+        Args:
+            wake_phrase (str): phrase which wakes the Assistant up.
+            sensitivity (float, optional): 0 (fewest false alarms) to 1 (fewest misses). Defaults to 0.8.
+            head_seconds (float, optional): seconds at the start of an utterance searched. Defaults to 2.
+            frame_seconds (float, optional): seconds of audio fed to the decoder at once. Defaults to 0.1.
+            decoder (optional): pocketsphinx Decoder in keyword search mode.
+                            Defaults to one searching the wake phrase.
+
+        Raises:
+            RuntimeError: If pocketsphinx is not installed.
+        """
+        self.wake_phrase = wake_phrase.lower()
+        self.sensitivity = sensitivity
+        self.head_seconds = head_seconds
+        self.frame_seconds = frame_seconds
+        if decoder is None:
+            try:
+                pocketsphinx = importlib.import_module("pocketsphinx")
+            except ImportError as error:
+                raise RuntimeError(
+                    "The wake phrase is spotted with pocketsphinx, "
+                    "install it or leave WAKE_PHRASE empty"
+                ) from error
+            # same sensitivity to threshold mapping as recognize_sphinx(keyword_entries=...)
+            decoder = pocketsphinx.Decoder(
+                samprate=SAMPLE_RATE,
+                keyphrase=self.wake_phrase,
+                kws_threshold=10 ** (100 * sensitivity - 110),
+            )
+        self.__decoder = decoder
+        self.__lock = threading.Lock()
+
+    def spot(self, audio: sr.AudioData) -> bool:
+        """Returns True if the wake phrase is spoken at the start of the audio"""
+        head = audio.get_segment(end_ms=self.head_seconds * 1000).get_raw_data(
+            convert_rate=SAMPLE_RATE, convert_width=2
+        )
+        frame_bytes = int(self.frame_seconds * SAMPLE_RATE) * 2
+        with self.__lock:
+            self.__decoder.start_utt()
+            try:
+                for offset in range(0, len(head), frame_bytes):
+                    self.__decoder.process_raw(
+                        head[offset : offset + frame_bytes], False, False
+                    )
+                    if self.__decoder.hyp() is not None:
+                        return True
+                return False
+            finally:
+                self.__decoder.end_utt()
+
+
+class WakeWordGate:
+    """
+    Admits audio to the full recognizer only after the wake phrase was spotted. Every
+    admitted utterance keeps the gate open for awake_seconds, so follow-up answers of a
+    dialog do not need the wake phrase again.
+    """
+
+    def __init__(self, spotter: KeywordSpotter, awake_seconds: float = 8.0) -> None:
+        self.spotter = spotter
+        self.awake_seconds = awake_seconds
+        self.__awake_until = 0.0
+        self.__pattern = re.compile(
+            rf"^\W*{re.escape(spotter.wake_phrase)}\W*", re.IGNORECASE
+        )
+
+    def is_awake(self) -> bool:
+        """Returns True while utterances are forwarded without the wake phrase"""
+        return time.monotonic() < self.__awake_until
+
+    def admit(self, audio: sr.AudioData) -> bool:
+        """
+        Decides whether the utterance is forwarded to the full recognizer.
+
+        Args:
+            audio (sr.AudioData): the captured utterance.
+
+        Returns:
+            bool: True if the gate was awake or the utterance starts with the wake phrase.
+        """
+        if not self.is_awake() and not self.spotter.spot(audio):
+            return False
+        self.__awake_until = time.monotonic() + self.awake_seconds
+        return True
+
+    def sleep(self) -> None:
+        """Closes the gate until the wake phrase is heard again"""
+        self.__awake_until = 0.0
+
+    def strip(self, query: str | None) -> str | None:
+        """Removes a leading wake phrase from a transcript"""
+        if not query:
+            return query
+        return self.__pattern.sub("", query, count=1)
+
+
+def wake_word_gate_from_env() -> WakeWordGate | None:
+    """
+    Creates the wake word gate configured in the .env file, None if WAKE_PHRASE is empty.
+    WAKE_SENSITIVITY tunes the spotter and WAKE_WINDOW_SECONDS how long the gate stays open.
+    """
+    wake_phrase = (__ENV__.get("WAKE_PHRASE") or "").strip()
+    if not wake_phrase:
+        return None
+    spotter = KeywordSpotter(wake_phrase, float(__ENV__.get("WAKE_SENSITIVITY") or 0.8))
+    return WakeWordGate(spotter, float(__ENV__.get("WAKE_WINDOW_SECONDS") or 8.0))
@@ -0,0 +1,14 @@
+import os
+import sys
+import types
+
+# the modules of the assistant import each other as top level modules from src
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "src"))
+
+try:
+    import dotenv  # pylint: disable=unused-import
+except ImportError:
+    # modules only read their settings from .env, the tests run with the defaults
+    dotenv = types.ModuleType("dotenv")
+    dotenv.dotenv_values = lambda *args, **kwargs: {}
+    sys.modules["dotenv"] = dotenv
@@ -0,0 +1,152 @@
+import threading
+
+import pytest
+
+import brightness
+
+
+def make_backlight(root, name, kind=None, value=100, max_value=200):
+    """Creates a fake /sys/class/backlight device under root"""
+    device = root / name
+    device.mkdir()
+    if kind is not None:
+        (device / "type").write_text(f"{kind}\n")
+    (device / "brightness").write_text(f"{value}\n")
+    (device / "max_brightness").write_text(f"{max_value}\n")
+    return device
+
+
+class RecordingBackend(brightness.BrightnessBackend):
+    """Backend keeping the brightness in memory and recording every write"""
+
+    def __init__(self, percent=50):
+        self.percent = percent
+        self.writes = []
+        self.closed = False
+
+    def get(self):
+        return self.percent
+
+    def set(self, percent):
+        self.writes.append(percent)
+        self.percent = percent
+
+    def close(self):
+        self.closed = True
+
+
+class BlockingBackend(RecordingBackend):
+    """Backend whose writes wait until released"""
+
+    def __init__(self, percent=50):
+        super().__init__(percent)
+        self.writing = threading.Event()
+        self.release = threading.Event()
+
+    def set(self, percent):
+        self.writing.set()
+        self.release.wait(5)
+        super().set(percent)
+
+
+def test_backend_is_abstract():
+    with pytest.raises(TypeError):
+        brightness.BrightnessBackend()  # pylint: disable=abstract-class-instantiated
+
+
+def test_find_backlight_prefers_firmware_then_platform_then_raw(tmp_path):
+    make_backlight(tmp_path, "acpi_video0", "raw")
+    make_backlight(tmp_path, "unknown0")
+    make_backlight(tmp_path, "intel_backlight", "platform")
+    assert brightness.find_backlight(str(tmp_path)) == str(tmp_path / "intel_backlight")
+
+    make_backlight(tmp_path, "nvidia_0", "firmware")
+    assert brightness.find_backlight(str(tmp_path)) == str(tmp_path / "nvidia_0")
+
+
+def test_find_backlight_without_devices(tmp_path):
+    with pytest.raises(brightness.BrightnessUnavailable):
+        brightness.find_backlight(str(tmp_path))
+    with pytest.raises(brightness.BrightnessUnavailable):
+        brightness.find_backlight(str(tmp_path / "missing"))
+
+
+def test_sysfs_backlight_scales_and_clamps(tmp_path):
+    device = make_backlight(tmp_path, "intel_backlight", "raw", 100, 200)
+    backlight = brightness.SysfsBacklight("intel_backlight", root=str(tmp_path))
+    try:
+        assert backlight.get() == 50
+
+        backlight.set(25)
+        assert (device / "brightness").read_text().split()[0] == "50"
+        assert backlight.get() == 25
+
+        backlight.set(150)
+        assert (device / "brightness").read_text().split()[0] == "200"
+        backlight.set(-5)
+        assert (device / "brightness").read_text().split()[0] == "0"
+        assert backlight.get() == 0
+    finally:
+        backlight.close()
+
+
+def test_sysfs_backlight_rejects_zero_max_brightness(tmp_path):
+    make_backlight(tmp_path, "broken", "raw", 0, 0)
+    with pytest.raises(brightness.BrightnessUnavailable):
+        brightness.SysfsBacklight("broken", root=str(tmp_path))
+
+
+def test_controller_coalesces_adjustments_into_one_write():
+    backend = RecordingBackend(50)
+    controller = brightness.BrightnessController(lambda: backend, coalesce_seconds=0.1)
+    try:
+        assert [controller.adjust(10) for _ in range(3)] == [60, 70, 80]
+        assert controller.flush(5)
+        assert backend.writes == [80]
+
+        controller.set(30)
+        assert controller.adjust(-5) == 25
+        assert controller.flush(5)
+        assert backend.writes == [80, 25]
+    finally:
+        controller.close()
+    assert backend.closed
+
+
+def test_controller_clamps_targets():
+    backend = RecordingBackend(50)
+    controller = brightness.BrightnessController(lambda: backend, coalesce_seconds=0.05)
+    try:
+        assert controller.set(150) == 100
+        assert controller.flush(5)
+        assert controller.adjust(-90) == 10
+        assert controller.adjust(-90) == 0
+        assert controller.adjust(10) == 10
+        assert controller.flush(5)
+        assert backend.writes == [100, 10]
+    finally:
+        controller.close()
+
+
+def test_controller_adjusts_from_the_target_being_written():
+    backend = BlockingBackend(50)
+    controller = brightness.BrightnessController(lambda: backend, coalesce_seconds=0.0)
+    try:
+        controller.set(80)
+        assert backend.writing.wait(5)
+        # the backend still reports 50 while 80 is being written
+        assert controller.get() == 80
+        assert controller.adjust(10) == 90
+        backend.release.set()
+        assert controller.flush(5)
+        assert backend.writes == [80, 90]
+    finally:
+        backend.release.set()
+        controller.close()
+
+
+def test_controller_reports_unavailable_backend(tmp_path):
+    with pytest.raises(brightness.BrightnessUnavailable):
+        brightness.BrightnessController(
+            lambda: brightness.SysfsBacklight(root=str(tmp_path))
+        )
@@ -0,0 +1,71 @@
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+import http_client
+
+
+class OkHandler(BaseHTTPRequestHandler):
+    """Answers every GET with a short body and closes the connection"""
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(name="server_port")
+def fixture_server_port():
+    server = HTTPServer(("127.0.0.1", 0), OkHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server.server_address[1]
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(name="lookups")
+def fixture_lookups(monkeypatch):
+    """Records the hosts resolved through socket.getaddrinfo"""
+    lookups = []
+    getaddrinfo = socket.getaddrinfo
+
+    def recording_getaddrinfo(host, *args, **kwargs):
+        lookups.append(host)
+        return getaddrinfo(host, *args, **kwargs)
+
+    monkeypatch.setattr(socket, "getaddrinfo", recording_getaddrinfo)
+    return lookups
+
+
+def test_client_resolves_each_host_once(server_port, lookups):
+    getaddrinfo = socket.getaddrinfo
+    client = http_client.HttpClient()
+    for _ in range(3):
+        response = client.get(f"http://localhost:{server_port}/")
+        assert response.text == "ok"
+
+    assert lookups.count("localhost") == 1
+    # the cache belongs to the client, the resolver of the process is untouched
+    assert socket.getaddrinfo is getaddrinfo
+
+
+def test_dns_cache_evicts_expired_and_oldest_entries(lookups):
+    cache = http_client.DnsCache(ttl=300.0, max_entries=2)
+    for port in (1, 2, 3):
+        assert cache.resolve("127.0.0.1", port) == "127.0.0.1"
+    cache.resolve("127.0.0.1", 3)
+    cache.resolve("127.0.0.1", 1)
+    assert len(lookups) == 4  # port 1 was evicted to make room for port 3
+
+    cache = http_client.DnsCache(ttl=0.0)
+    cache.resolve("127.0.0.1", 1)
+    cache.resolve("127.0.0.1", 1)
+    assert len(lookups) == 6
@@ -0,0 +1,34 @@
+import pytest
+
+from command_manifest import MANIFEST
+from intent_index import IntentIndex
+
+
+@pytest.fixture(name="index")
+def fixture_index():
+    """Index over the triggers of the shipped commands"""
+    index = IntentIndex()
+    for spec in MANIFEST:
+        index.add(spec.name, spec.triggers, spec.priority)
+    return index
+
+
+@pytest.mark.parametrize(
+    "query, command",
+    [
+        ("send an email to john", "SendEmail"),
+        ("send emails to john", "SendEmail"),
+        ("searching for pizza places", "GoogleSearch"),
+        ("restart the computer", "RestartSystem"),
+        ("what's the weather like?", "WeatherReporter"),
+        ("turn the volume up", "VolumeControl"),
+    ],
+)
+def test_routes_triggers_and_their_inflections(index, query, command):
+    assert index.match(query)[0] == command
+
+
+def test_triggers_glued_to_other_words_do_not_match(index):
+    assert "SendEmail" not in index.match("open gmail")
+    assert "SendEmail" not in index.match("call the emailer")
+    assert "FetchNews" not in index.match("renews my subscription")
@@ -0,0 +1,35 @@
+import speech_recognition as sr
+
+import noise_calibration
+
+
+def make_calibrator(tmp_path, recognizer):
+    return noise_calibration.NoiseCalibrator(
+        recognizer, "test device", store_path=str(tmp_path / "calibration.json")
+    )
+
+
+def test_threshold_follows_the_noise_floor(tmp_path):
+    recognizer = sr.Recognizer()
+    calibrator = make_calibrator(tmp_path, recognizer)
+    for _ in range(4):
+        calibrator.observe(100.0, 0.25)
+    assert calibrator.calibrated
+    assert recognizer.energy_threshold == 150.0
+
+    calibrator.observe(200.0, 1.0)
+    assert 150.0 < recognizer.energy_threshold < 300.0
+
+
+def test_pinned_threshold_is_kept(tmp_path):
+    recognizer = sr.Recognizer()
+    recognizer.dynamic_energy_threshold = False
+    recognizer.energy_threshold = 400
+    calibrator = make_calibrator(tmp_path, recognizer)
+    for _ in range(8):
+        calibrator.observe(100.0, 0.25)
+    assert calibrator.calibrated
+    assert recognizer.energy_threshold == 400
+
+    assert make_calibrator(tmp_path, recognizer).load()
+    assert recognizer.energy_threshold == 400
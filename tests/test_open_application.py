@@ -0,0 +1,57 @@
+import importlib
+import subprocess
+import sys
+import types
+
+import pytest
+
+import app_index
+
+
+@pytest.fixture(name="open_application")
+def fixture_open_application(monkeypatch, tmp_path):
+    """Imports commands.open_application on Linux, next to an AppOpener which, like the real
+    one outside of Windows, exits the process when imported"""
+    (tmp_path / "AppOpener.py").write_text(
+        'print("AppOpener only works on windows")\nraise SystemExit\n'
+    )
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.setattr(sys, "platform", "linux")
+    voice_interface = types.ModuleType("voice_interface")
+    voice_interface.VoiceInterface = object
+    monkeypatch.setitem(sys.modules, "voice_interface", voice_interface)
+    monkeypatch.delitem(sys.modules, "AppOpener", raising=False)
+    monkeypatch.delitem(sys.modules, "commands.open_application", raising=False)
+    return importlib.import_module("commands.open_application")
+
+
+class FakeVoiceInterface:
+    """Voice interface recording what was said"""
+
+    def __init__(self):
+        self.spoken = []
+
+    def speak(self, text, *_, **__):
+        self.spoken.append(text)
+
+
+def test_import_does_not_load_appopener_outside_windows(open_application):
+    assert open_application.OpenApplication.validate_query("open firefox")
+    assert "AppOpener" not in sys.modules
+
+
+def test_opens_indexed_application_on_linux(open_application, monkeypatch):
+    entry = app_index.AppEntry("firefox", ["firefox"], "firefox.desktop")
+    index = types.SimpleNamespace(lookup=lambda name: entry)
+    monkeypatch.setattr(app_index.ApplicationIndex, "instance", lambda: index)
+    launched = []
+    monkeypatch.setattr(
+        subprocess, "Popen", lambda command, **kwargs: launched.append(command)
+    )
+
+    vi = FakeVoiceInterface()
+    open_application.OpenApplication.execute_query("open firefox", vi)
+
+    assert launched == [["firefox"]]
+    assert vi.spoken == ["Attempting to open firefox..."]
+    assert "AppOpener" not in sys.modules
@@ -0,0 +1,54 @@
+import threading
+
+from prefetch import PrefetchScheduler
+
+
+def prefetch_threads():
+    return [thread for thread in threading.enumerate() if thread.name == "prefetch"]
+
+
+def test_restart_after_timed_out_stop_keeps_one_thread():
+    scheduler = PrefetchScheduler(interval=0.01, min_gap=0.0)
+    running = threading.Event()
+    release = threading.Event()
+    runs = []
+
+    def slow_refresh():
+        runs.append(len(runs))
+        running.set()
+        release.wait(5)
+
+    scheduler.add("slow", slow_refresh)
+    scheduler.start()
+    try:
+        assert running.wait(5)
+        scheduler.stop(timeout=0.05)
+        assert len(prefetch_threads()) == 1  # still busy with its job
+
+        scheduler.start()
+        running.clear()
+        release.set()
+        assert running.wait(5)  # the resumed thread keeps refreshing
+        assert len(prefetch_threads()) == 1
+    finally:
+        release.set()
+        scheduler.stop()
+    assert not prefetch_threads()
+
+
+def test_stop_then_start_runs_again():
+    scheduler = PrefetchScheduler(interval=60.0, min_gap=0.0)
+    ran = threading.Semaphore(0)
+    scheduler.add("job", ran.release)
+    scheduler.start()
+    try:
+        assert ran.acquire(timeout=5)
+        scheduler.stop()
+        assert not prefetch_threads()
+
+        scheduler.start()
+        scheduler.run_soon("job")
+        assert ran.acquire(timeout=5)
+        assert len(prefetch_threads()) == 1
+    finally:
+        scheduler.stop()
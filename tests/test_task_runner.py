@@ -0,0 +1,128 @@
+import importlib
+import sys
+import threading
+import types
+from contextlib import contextmanager
+
+import pytest
+
+
+class RecordingVoiceInterface:
+    """Voice interface recording what was said, batches included, in order"""
+
+    def __init__(self):
+        self.spoken = []
+        self.lock = threading.Lock()
+
+    def speak(self, text, cache=False):
+        with self.lock:
+            self.spoken.append(text)
+
+    def speak_many(self, texts):
+        for text in texts:
+            self.speak(text)
+
+    @contextmanager
+    def batch(self):
+        yield
+
+    def flush(self):
+        pass
+
+    def wait(self, timeout=None):
+        return True
+
+    def listen(self, print_statement=False):
+        return "yes"
+
+
+@pytest.fixture(name="task_runner")
+def fixture_task_runner(monkeypatch):
+    """Imports task_runner without the audio stack behind the real VoiceInterface"""
+    voice_interface = types.ModuleType("voice_interface")
+    voice_interface.VoiceInterface = RecordingVoiceInterface
+    monkeypatch.setitem(sys.modules, "voice_interface", voice_interface)
+    monkeypatch.delitem(sys.modules, "task_runner", raising=False)
+    return importlib.import_module("task_runner")
+
+
+def test_output_of_concurrent_tasks_keeps_submission_order(task_runner):
+    vi = RecordingVoiceInterface()
+    runner = task_runner.TaskRunner(vi, max_workers=2)
+    first_may_finish = threading.Event()
+    second_done = threading.Event()
+
+    def first(query, task_vi):
+        task_vi.speak(f"{query} 1")
+        first_may_finish.wait(5)
+        task_vi.speak(f"{query} 2")
+
+    def second(query, task_vi):
+        task_vi.speak_many([f"{query} 1", f"{query} 2"])
+        with task_vi.batch():
+            task_vi.speak(f"{query} 3")
+        second_done.set()
+
+    runner.submit("First", first, "first")
+    runner.submit("Second", second, "second")
+    assert second_done.wait(5)
+    assert vi.spoken == ["first 1"]  # the second task waits for its turn
+
+    first_may_finish.set()
+    assert runner.wait_all(5)
+    assert vi.spoken == ["first 1", "first 2", "second 1", "second 2", "second 3"]
+    runner.shutdown()
+
+
+def test_cancelled_task_stops_talking(task_runner):
+    vi = RecordingVoiceInterface()
+    runner = task_runner.TaskRunner(vi, max_workers=2)
+    started = threading.Event()
+    cancelled = threading.Event()
+    reached = []
+
+    def chatty(query, task_vi):
+        task_vi.speak(query)
+        started.set()
+        cancelled.wait(5)
+        for use in (
+            lambda: task_vi.speak_many(["more"]),
+            task_vi.batch().__enter__,
+            task_vi.flush,
+            lambda: task_vi.set_voice(None),
+        ):
+            with pytest.raises(task_runner.TaskCancelled):
+                use()
+            reached.append(use)
+
+    task = runner.submit("Chatty", chatty, "hello")
+    assert started.wait(5)
+    task.cancel()
+    cancelled.set()
+    assert runner.wait_all(5)
+    assert len(reached) == 4
+    assert vi.spoken == ["hello", "Chatty was cancelled."]
+    runner.shutdown()
+
+
+def test_listening_waits_for_the_turn_of_the_task(task_runner):
+    vi = RecordingVoiceInterface()
+    runner = task_runner.TaskRunner(vi, max_workers=2)
+    first_may_finish = threading.Event()
+    answers = []
+
+    def first(query, task_vi):
+        first_may_finish.wait(5)
+        task_vi.speak(query)
+
+    def asking(query, task_vi):
+        task_vi.speak(query)
+        answers.append(task_vi.listen())
+        answers.append(list(vi.spoken))
+
+    runner.submit("First", first, "first")
+    runner.submit("Asking", asking, "which one?")
+    first_may_finish.set()
+    assert runner.wait_all(5)
+    assert answers == ["yes", ["first", "which one?"]]
+    runner.shutdown()